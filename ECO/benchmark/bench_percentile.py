@@ -0,0 +1,65 @@
+"""
+network 模式下截尾加权均值的基准测试：groupby().apply() + weighted_percentile vs grouped_weighted_percentile
+
+在 ECO 目录下运行：
+    python -m benchmark.bench_percentile --rows 1000000 --groups 720
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from callbacks.percentile import grouped_weighted_percentile, weighted_percentile
+from config.granularity_config import granularity_options
+
+METRICS = [opt['value'] for opt in granularity_options['controller']['options']]
+
+
+def make_data(rows, groups, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({col: rng.normal(100, 30, rows) for col in METRICS})
+    data['collection_time_agg'] = pd.Timestamp('2024-09-01') + pd.to_timedelta(rng.integers(0, groups, rows), unit='h')
+    return data
+
+
+def apply_baseline(data, sort_indicator, percents):
+    def get_percentile_row(group):
+        sorter = np.argsort(group[sort_indicator].values)
+        if len(sorter) <= 2:
+            return pd.Series({col: np.nan for col in METRICS})
+        return pd.Series({col: weighted_percentile(group[col].values, percents, sorter) for col in METRICS})
+
+    data = data.sort_values(by=sort_indicator).set_index('collection_time_agg')
+    return data.groupby('collection_time_agg').apply(get_percentile_row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--groups', type=int, default=720, help='时间桶个数，720 即 30 天小时粒度')
+    parser.add_argument('--percents', type=float, nargs=2, default=[50, 60])
+    parser.add_argument('--log-level', default='WARNING', help='原实现每次调用都会打 INFO 日志，线上为 INFO')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level)
+
+    data = make_data(args.rows, args.groups)
+    sort_indicator = METRICS[0]
+
+    t0 = time.perf_counter()
+    expected = apply_baseline(data, sort_indicator, args.percents)
+    baseline = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    result = grouped_weighted_percentile(data, 'collection_time_agg', sort_indicator, METRICS, args.percents)
+    vectorized = time.perf_counter() - t0
+
+    np.testing.assert_allclose(result.to_numpy(), expected[METRICS].to_numpy(dtype=float), rtol=1e-9)
+    print(f"rows={args.rows} metrics={len(METRICS)} groups={args.groups}")
+    print(f"groupby.apply : {baseline:8.3f}s")
+    print(f"vectorized    : {vectorized:8.3f}s  ({baseline / vectorized:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
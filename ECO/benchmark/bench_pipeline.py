@@ -0,0 +1,230 @@
+"""
+ECO 数据管线的端到端基准测试
+
+用 benchmark.synthetic 按线上目录结构生成 networks × days × bands 规模的分区，上传到 moto 模拟的 S3，
+依次计时：
+- get_s3_data：冷读（无磁盘缓存、清空列表缓存）和磁盘缓存命中后的热读
+- load_dataset：列裁剪、频段下推、时间过滤和压缩
+- network 模式：百分位前缀和索引的构建和查询，--reference 时加上 groupby.apply + weighted_percentile 的原实现
+- time 模式：percentile_histograms
+每个阶段记录耗时、行数、吞吐和峰值 RSS，结果以 JSON 输出，便于长期跟踪。
+
+在 ECO 目录下运行：
+    python -m benchmark.bench_pipeline --networks 2000 --days 7 --output bench_pipeline.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow
+from moto import mock_aws
+
+from benchmark.synthetic import START_DATE, upload_dataset
+from data.metrics import BANDS
+
+BUCKET = 'eco-bench'
+FIRST_LEVEL_PREFIX = 'eco/'
+THIRD_LEVEL_PREFIX = 'controller_id/controller'
+METRIC_GRANULARITY = 'controller'
+
+
+def _read_status(field):
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """
+    重置进程的峰值 RSS（Linux 的 /proc/self/clear_refs），不支持时返回 False，此后的峰值为进程启动以来的峰值
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes():
+    peak = _read_status('VmHWM:')
+    if peak is None:
+        # ru_maxrss 在 Linux 上以 KiB 为单位，在 macOS 上以字节为单位
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak *= 1 if sys.platform == 'darwin' else 1024
+    return peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StageTimer:
+    """
+    记录每个阶段的耗时、行数和峰值 RSS
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, **extra):
+        result = {'name': name, **extra}
+        reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            seconds = time.perf_counter() - start
+            result['seconds'] = round(seconds, 6)
+            if result.get('rows'):
+                result['rows_per_s'] = round(result['rows'] / seconds, 1) if seconds > 0 else None
+            result['peak_rss_mb'] = round(peak_rss_bytes() / 1024 ** 2, 1)
+            self.stages.append(result)
+            logging.warning(f"{name:<28} {seconds:8.3f}s  rows={result.get('rows', '-')}  "
+                            f"peak_rss={result['peak_rss_mb']} MiB")
+
+
+def run(args, timer):
+    # 需要在 mock 启动后再导入，保证模块级的 s3_client 被 moto 接管
+    from benchmark.bench_percentile import apply_baseline
+    from callbacks.histogram import percentile_histograms
+    from data.percentile_index import PercentileIndex
+    from config.granularity_config import granularity_options
+    from data import datasets, s3_utils
+
+    metric_cols = [opt['value'] for opt in granularity_options[METRIC_GRANULARITY]['options']]
+    sort_indicator = granularity_options[METRIC_GRANULARITY]['default']
+    client = s3_utils.s3_client
+    client.create_bucket(Bucket=BUCKET)
+
+    with timer.stage('generate_upload') as result:
+        result.update(upload_dataset(client, BUCKET, FIRST_LEVEL_PREFIX, args.networks, args.days,
+                                     bands=BANDS[:args.bands], files_per_day=args.files_per_day, seed=args.seed))
+
+    if args.latency_ms:
+        def inject_latency(**kwargs):
+            time.sleep(args.latency_ms / 1000.0)
+
+        client.meta.events.register_first('before-send.s3', inject_latency)
+
+    start = pd.Timestamp(START_DATE)
+    end = start + pd.Timedelta(days=args.days) - pd.Timedelta(seconds=1)
+    disk_cache = s3_utils.parquet_cache
+
+    # 冷读：不经过磁盘缓存，列表也重新获取
+    s3_utils.parquet_cache = None
+    s3_utils._listing_cache.clear()
+    with timer.stage('get_s3_data_cold') as result:
+        result['rows'] = len(s3_utils.get_s3_data(start, end, '1h', THIRD_LEVEL_PREFIX))
+
+    # 热读：先填充磁盘缓存，再计时第二次读取
+    s3_utils.parquet_cache = disk_cache
+    s3_utils.get_s3_data(start, end, '1h', THIRD_LEVEL_PREFIX)
+    with timer.stage('get_s3_data_warm') as result:
+        result['rows'] = len(s3_utils.get_s3_data(start, end, '1h', THIRD_LEVEL_PREFIX))
+
+    query = datasets.build_query(start.date(), end.date(), '1h', METRIC_GRANULARITY, BANDS[0])
+    with timer.stage('load_dataset') as result:
+        data = datasets.load_dataset(query)
+        result['rows'] = len(data)
+        result['dataset_mb'] = round(data.memory_usage(deep=True).sum() / 1024 ** 2, 1)
+
+    percents = list(args.percents)
+    with timer.stage('network_index_build') as result:
+        index = PercentileIndex(data, 'collection_time_agg', metric_cols)
+        index.build(sort_indicator)
+        result['rows'] = len(data)
+    with timer.stage('network_index_query') as result:
+        grouped = index.query(sort_indicator, percents)
+        result['rows'] = len(data)
+        result['groups'] = len(grouped)
+
+    if args.reference:
+        reference_data = data.astype({col: np.float64 for col in metric_cols})
+        reference_data['collection_time_agg'] = reference_data['collection_time_agg'].astype(object)
+        with timer.stage('network_reference_apply') as result:
+            expected = apply_baseline(reference_data, sort_indicator, percents)
+            result['rows'] = len(data)
+        np.testing.assert_allclose(grouped[metric_cols].to_numpy(dtype=float),
+                                   expected[metric_cols].to_numpy(dtype=float), rtol=1e-5)
+
+    with timer.stage('time_histograms') as result:
+        histograms = percentile_histograms([data], sort_indicator, metric_cols, percents)
+        result['rows'] = len(data)
+        result['metrics'] = len(histograms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--networks', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--bands', type=int, default=3, choices=[1, 2, 3])
+    parser.add_argument('--files-per-day', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='每个 S3 请求注入的延迟')
+    parser.add_argument('--percents', type=float, nargs=2, default=[50, 60])
+    parser.add_argument('--reference', action='store_true', help='同时计时 groupby.apply 的原实现并校验结果')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='-', help='JSON 结果文件，- 表示标准输出')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
+    cache_dir = tempfile.TemporaryDirectory(prefix='eco-bench-')
+    os.environ.update({
+        'S3_BUCKET': BUCKET,
+        'S3_FIRST_LEVEL_PREFIX': FIRST_LEVEL_PREFIX,
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'PARQUET_CACHE_DIR': os.path.join(cache_dir.name, 'parquet'),
+        # 只计时加载本身，不经过服务端结果存储
+        'RESULT_STORE_DIR': '',
+    })
+
+    timer = StageTimer()
+    with mock_aws(), cache_dir:
+        run(args, timer)
+
+    report = {
+        'benchmark': 'pipeline',
+        'started_at': pd.Timestamp.now(tz='UTC').isoformat(),
+        'params': vars(args),
+        'environment': {
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'pyarrow': pyarrow.__version__,
+        },
+        'stages': timer.stages,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+get_s3_data 串行 vs 并发拉取的基准测试
+
+使用 moto 在本地模拟 S3，并通过 botocore 事件给每个请求注入固定延迟来模拟跨区网络往返。
+在 ECO 目录下运行：
+    python -m benchmark.bench_s3_fetch --days 1 7 30 --files-per-day 8 --latency-ms 30
+"""
+import argparse
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from moto import mock_aws
+
+BUCKET = 'eco-bench'
+FIRST_LEVEL_PREFIX = 'eco/'
+THIRD_LEVEL_PREFIX = 'controller_id/controller'
+START_DATE = datetime(2024, 9, 1)
+
+
+def make_partition_frame(day, rows, seed):
+    """
+    生成一个小时粒度分区文件的数据
+    """
+    rng = np.random.default_rng(seed)
+    hours = rng.integers(0, 24, rows)
+    collection_time = (pd.Timestamp(day).value // 10 ** 9 + hours * 3600).astype(np.int64)
+    return pd.DataFrame({
+        'controller_id': [f'c{i}' for i in rng.integers(0, rows, rows)],
+        'band': rng.choice(['2.4GHz', '5GHz', '6GHz'], rows),
+        'collection_time': collection_time,
+        'collection_time_agg': pd.to_datetime(collection_time, unit='s').strftime('%Y-%m-%d %H:00:00'),
+        'average_rx_rate': rng.uniform(0, 1000, rows),
+        'average_tx_rate': rng.uniform(0, 1000, rows),
+        'congestion_score': rng.uniform(0, 100, rows),
+        'wifi_coverage_score': rng.uniform(0, 100, rows),
+        'noise': rng.uniform(-100, 0, rows),
+        'errors_rate': rng.uniform(0, 1, rows),
+        'wan_bandwidth': rng.uniform(0, 1000, rows),
+    })
+
+
+def upload_partitions(client, days, files_per_day, rows_per_file):
+    for day_idx in range(days):
+        day = START_DATE + timedelta(days=day_idx)
+        prefix = f"{FIRST_LEVEL_PREFIX}hourly/{THIRD_LEVEL_PREFIX}/dt={day:%Y-%m-%d}/"
+        for part in range(files_per_day):
+            buffer = io.BytesIO()
+            make_partition_frame(day, rows_per_file, day_idx * 1000 + part).to_parquet(buffer, index=False)
+            client.put_object(Bucket=BUCKET, Key=f"{prefix}part-{part:05d}.snappy.parquet", Body=buffer.getvalue())
+        client.put_object(Bucket=BUCKET, Key=f"{prefix}_SUCCESS", Body=b'')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 7, 30])
+    parser.add_argument('--files-per-day', type=int, default=8)
+    parser.add_argument('--rows-per-file', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=30.0, help='每个 S3 请求注入的延迟')
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'S3_BUCKET': BUCKET,
+        'S3_FIRST_LEVEL_PREFIX': FIRST_LEVEL_PREFIX,
+        'AWS_ACCESS_KEY_ID': 'testing',
+        'AWS_SECRET_ACCESS_KEY': 'testing',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        # 只比较网络拉取，关闭本地磁盘缓存
+        'PARQUET_CACHE_DIR': '',
+        'S3_ASYNC': '1',
+    })
+
+    with mock_aws():
+        # 需要在 mock 启动后再导入，保证模块级的 s3_client 被 moto 接管
+        from data import s3_utils
+
+        client = s3_utils.s3_client
+        client.create_bucket(Bucket=BUCKET)
+        upload_partitions(client, max(args.days), args.files_per_day, args.rows_per_file)
+
+        def inject_latency(**kwargs):
+            time.sleep(args.latency_ms / 1000.0)
+
+        client.meta.events.register_first('before-send.s3', inject_latency)
+
+        # 串行和线程池两种方式不经过异步层
+        async_s3 = s3_utils.async_s3
+        s3_utils.async_s3 = None
+
+        print(f"{'days':>6} {'files':>6} {'serial(s)':>10} {'parallel(s)':>12} {'async(s)':>9} {'speedup':>8}")
+        for days in args.days:
+            start = pd.Timestamp(START_DATE)
+            end = start + pd.Timedelta(days=days) - pd.Timedelta(seconds=1)
+
+            s3_utils._listing_cache.clear()
+            t0 = time.perf_counter()
+            serial_df = s3_utils.get_s3_data(start, end, '1h', THIRD_LEVEL_PREFIX, max_workers=1)
+            serial = time.perf_counter() - t0
+
+            s3_utils._listing_cache.clear()
+            t0 = time.perf_counter()
+            parallel_df = s3_utils.get_s3_data(start, end, '1h', THIRD_LEVEL_PREFIX, max_workers=args.workers)
+            parallel = time.perf_counter() - t0
+
+            s3_utils._listing_cache.clear()
+            s3_utils.async_s3 = async_s3
+            t0 = time.perf_counter()
+            async_df = s3_utils.get_s3_data(start, end, '1h', THIRD_LEVEL_PREFIX)
+            async_elapsed = time.perf_counter() - t0
+            s3_utils.async_s3 = None
+
+            assert len(serial_df) == len(parallel_df) == len(async_df)
+            print(f"{days:>6} {days * args.files_per_day:>6} {serial:>10.2f} {parallel:>12.2f} {async_elapsed:>9.2f} "
+                  f"{serial / parallel:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+按线上目录结构生成合成的 ECO 分区数据并上传到 S3
+
+    {S3_FIRST_LEVEL_PREFIX}hourly/controller_id/controller/dt=2024-09-01/part-00000.snappy.parquet
+    {S3_FIRST_LEVEL_PREFIX}daily/controller_id/controller/dt=2024-09-01/part-00000.snappy.parquet
+
+数据由 mock15 生成（每个网络有固定的基线，15 分钟采样在基线附近波动，汇总为小时和天的均值），
+这里只负责把每块网络写成一个 part 文件上传。同样的参数和种子生成的数据完全相同。
+"""
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import mock15
+from data.metrics import BANDS
+
+START_DATE = datetime(2024, 9, 1)
+
+
+def _put_parquet(client, bucket, key, df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    client.put_object(Bucket=bucket, Key=key, Body=buffer.getvalue())
+    return buffer.tell()
+
+
+def upload_dataset(client, bucket, first_level_prefix, networks, days, bands=BANDS, files_per_day=4, paths=None,
+                   seed=0):
+    """
+    生成并上传 hourly/ 和 daily/ 分区
+    :param files_per_day: 每天每个粒度的文件数，按网络切分，模拟 Spark 的输出
+    :param paths: 要生成的路径，默认只生成 controller_id/controller
+    :return: {'rows': hourly 行数, 'bytes': 上传的字节数, 'files': 文件数}
+    """
+    stats = {'rows': 0, 'bytes': 0, 'files': 0}
+    chunk_networks = max(1, int(np.ceil(networks / files_per_day)))
+    end_date = START_DATE + timedelta(days=days - 1)
+    prefixes = set()
+
+    for path, day, part, _, hourly, daily in mock15.iter_partitions(networks, START_DATE, end_date, paths, bands,
+                                                                    chunk_networks, seed):
+        stats['rows'] += len(hourly)
+        for granularity, frame in [('hourly', hourly), ('daily', daily)]:
+            prefix = f"{first_level_prefix}{granularity}/{path}/dt={day:%Y-%m-%d}/"
+            stats['bytes'] += _put_parquet(client, bucket, f"{prefix}part-{part:05d}.snappy.parquet", frame)
+            stats['files'] += 1
+            prefixes.add(prefix)
+
+    for prefix in sorted(prefixes):
+        client.put_object(Bucket=bucket, Key=f"{prefix}_SUCCESS", Body=b'')
+    return stats
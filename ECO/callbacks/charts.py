@@ -0,0 +1,190 @@
+import logging
+import os
+
+from dash import html
+
+from callbacks.compute_pool import COMPUTE_BACKEND, ComputePool, check_cancelled
+from callbacks.downsample import downsample_series
+from callbacks.histogram import percentile_histograms
+from config.granularity_config import granularity_options
+from data import datasets
+from data.result_store import make_handle
+from data.sketch import query_sketch
+from data.ttl_cache import TTLCache
+from instrumentation import record, stage
+
+# 首次渲染时默认展开的指标面板数，其余面板折叠，展开时才计算对应的图表
+GRAPHS_OPEN_COUNT = int(os.getenv("GRAPHS_OPEN_COUNT", "2"))
+
+# 单个指标图表的服务端缓存，与数据集使用相同的有效期
+METRIC_CHART_CACHE_MAX_ENTRIES = int(os.getenv("METRIC_CHART_CACHE_MAX_ENTRIES", "256"))
+_metric_charts = TTLCache(ttl=datasets.RESULT_STORE_TTL, maxsize=METRIC_CHART_CACHE_MAX_ENTRIES)
+
+# 单条折线返回给浏览器的最大点数，超过时在服务端降采样，缩放后按可见窗口重新取点
+FIGURE_MAX_POINTS = int(os.getenv("FIGURE_MAX_POINTS", "2000"))
+
+# 图表计算的执行后端：计算进程通过共享目录中的 Arrow IPC 文件读取数据集，没有共享目录时只能在回调线程中计算
+compute_pool = ComputePool(COMPUTE_BACKEND if datasets.RESULT_STORE_DIR else 'inline')
+
+
+def metric_label(metric_granularity, metric):
+    """
+    从 granularity_options 中找到指标对应的 label
+    """
+    options = granularity_options.get(metric_granularity, {'options': []})['options']
+    return next((opt['label'] for opt in options if opt['value'] == metric), metric)
+
+
+def is_panel_open(initially_open, n_clicks):
+    """
+    点击 Summary 会切换 Details 的展开状态，但 layout 中的 open 属性不会随之更新，
+    因此由初始状态和点击次数的奇偶推算当前是否展开
+    """
+    return bool(initially_open) != bool((n_clicks or 0) % 2)
+
+
+def open_panel_metrics(panel_ids, initially_open, n_clicks):
+    """
+    重新渲染前已展开的指标；之前没有面板时返回 None
+    """
+    if not panel_ids:
+        return None
+    return [panel_id['metric'] for panel_id, opened, clicks in zip(panel_ids, initially_open, n_clicks)
+            if is_panel_open(opened, clicks)]
+
+
+def metric_panels(metric_granularity, open_metrics=None):
+    """
+    每个指标一个可折叠面板，图表由 update_metric_graph 在面板展开时按需填充
+    :param open_metrics: 需要展开的指标，None 表示展开前 GRAPHS_OPEN_COUNT 个
+    """
+    metrics = [opt['value'] for opt in granularity_options[metric_granularity]['options']]
+    if open_metrics is None:
+        open_metrics = metrics[:GRAPHS_OPEN_COUNT]
+
+    return [
+        html.Details([
+            html.Summary(metric_label(metric_granularity, metric),
+                         id={'type': 'metric-summary', 'metric': metric}, style={'cursor': 'pointer'}),
+            html.Div(id={'type': 'metric-graph', 'metric': metric})
+        ], id={'type': 'metric-panel', 'metric': metric}, open=metric in open_metrics)
+        for metric in metrics
+    ]
+
+
+def network_figure(data, handle, params, metric):
+    """
+    按网络分组的折线图：组内按排序指标取百分位区间的截尾加权均值
+    """
+    sort_indicator = params['sort_indicator']
+    percentile_start, percentile_end = params['percents']
+    if datasets.is_sketch(data):
+        # 使用预聚合的百分位草图，整数百分位时与原始数据计算结果一致
+        with stage('sketch_query'):
+            grouped = query_sketch(data, sort_indicator, [metric], params['percents'], params['query']['band'])
+    else:
+        # 使用预先排好序的前缀和索引，拖动百分位滑块时只做 O(分组数 × 指标数) 的计算
+        with stage('percentile_query'):
+            percentile_index = datasets.get_percentile_index(handle, data, params['metric_granularity'])
+            percentile_index.build(sort_indicator)
+            # 排序是最耗时的阶段，排序后再检查一次是否已被取代
+            check_cancelled()
+            grouped = percentile_index.query(sort_indicator, params['percents'])
+
+    label = metric_label(params['metric_granularity'], metric)
+    sort_indicator_label = metric_label(params['metric_granularity'], sort_indicator)
+    return {
+        'data': [{'x': grouped.index, 'y': grouped[metric], 'type': 'line', 'name': metric}],
+        'layout': {
+            'title': f'{label} for ({sort_indicator_label}) In {percentile_start:.2f}% - {percentile_end:.2f}%',
+            # 按缩放窗口替换数据时保留用户的缩放状态
+            'uirevision': metric
+        }
+    }
+
+
+def time_figure(data, params, metric):
+    """
+    按时间维度的柱状图：按排序指标取百分位区间内的行，对该指标做分箱计数
+    """
+    sort_indicator = params['sort_indicator']
+    percentile_start, percentile_end = params['percents']
+    with stage('histogram'):
+        histograms = percentile_histograms([data], sort_indicator, [metric], params['percents'])
+    if metric not in histograms:
+        return None
+
+    formatted_intervals, interval_counts = histograms[metric]
+    label = metric_label(params['metric_granularity'], metric)
+    return {
+        'data': [
+            {'x': formatted_intervals, 'y': interval_counts, 'type': 'bar', 'name': label}
+        ],
+        'layout': {
+            'title': f'{label} Distribution for {sort_indicator.capitalize()} Percentile {percentile_start}% - {percentile_end}%',
+            'xaxis': {'title': 'Interval'},
+            'yaxis': {'title': 'Count'}
+        }
+    }
+
+
+def downsample_figure(figure, x_range=None, max_points=FIGURE_MAX_POINTS):
+    """
+    返回折线降采样到 max_points 以内的 figure 副本，x_range 为缩放窗口
+    """
+    data = []
+    for trace in figure['data']:
+        if trace.get('type') == 'line':
+            x, y = downsample_series(trace['x'], trace['y'], max_points, x_range)
+            trace = {**trace, 'x': x, 'y': y}
+        data.append(trace)
+    return {**figure, 'data': data}
+
+
+def metric_figure(params, metric, x_range=None, task_key=None):
+    """
+    计算单个指标的图表，全分辨率的结果按 (数据集, 压缩维度, 排序指标, 百分位区间, 指标) 缓存在服务端，
+    返回时降采样到 FIGURE_MAX_POINTS 以内
+    :param params: update_graphs 写入 graph-params 的绘图参数
+    :param x_range: 缩放窗口，只返回窗口内的点
+    :param task_key: 计算任务的键，同一个键的新请求会取消还未完成的旧计算
+    :return: figure 字典，没有数据时返回 None
+    :raises Cancelled: 计算被同一个 task_key 的新请求取代
+    """
+    key = (make_handle(params['query']), params['agg_dimension'], params['sort_indicator'],
+           tuple(params['percents']), metric)
+    figure = _metric_charts.get(key)
+    record(metric_chart_hit=figure is not None)
+    if figure is None:
+        figure = compute_pool.run(task_key, compute_metric_figure, params, metric,
+                                  session=params.get('session'), generation=params.get('generation'))
+        if figure is None:
+            return None
+        _metric_charts.set(key, figure)
+    with stage('downsample'):
+        return downsample_figure(figure, x_range)
+
+
+def compute_metric_figure(params, metric):
+    """
+    全分辨率的单个指标图表，可能在计算进程中执行
+    """
+
+    # 按句柄取回服务端数据集，缓存过期或在其他 worker 上时按查询参数重新加载
+    with stage('get_dataset'):
+        handle, data = datasets.get_dataset(params['query'])
+        # 草图只能回答 network 模式、且排序指标预先计算过的百分位带，其他情况需要原始数据
+        if datasets.is_sketch(data) and (params['agg_dimension'] != 'network'
+                                         or not datasets.sketch_has_sort_indicator(data, params['sort_indicator'])):
+            handle, data = datasets.get_dataset({**params['query'], 'mode': 'exact'})
+    record(rows=len(data))
+    if data.empty:
+        return None
+
+    check_cancelled()
+    if params['agg_dimension'] == 'network':
+        figure = network_figure(data, handle, params, metric)
+    else:
+        figure = time_figure(data, params, metric)
+    logging.info(f"Computed {params['agg_dimension']} chart for {metric}.")
+    return figure
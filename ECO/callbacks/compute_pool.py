@@ -0,0 +1,210 @@
+"""
+CPU 密集的图表计算（百分位带、直方图）的执行后端
+
+COMPUTE_BACKEND=inline（默认）时在回调线程中直接计算；COMPUTE_BACKEND=process 时提交到进程池，
+计算期间不持有 Dash worker 的 GIL，同一 worker 上其他用户的回调不受影响：
+- 只向计算进程传递查询参数，数据集由计算进程按句柄从 ResultStore 共享目录中的 Arrow IPC 文件内存映射读取，
+  不序列化 DataFrame；返回的图表只包含每个分组一个点，序列化的开销很小
+- 每个在途任务在进程间共享的字节数组中占一个取消标记。同一个 key 提交新任务，或者同一会话开始了更新的代数
+  （见 callbacks.generations）时取消旧任务：还在排队的直接从队列中移除，已经开始的在下一个检查点
+  （check_cancelled）抛出 Cancelled
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from instrumentation import capture, merge, record, stage
+
+COMPUTE_BACKEND = os.getenv("COMPUTE_BACKEND", "inline")
+# 每个 Dash worker 的计算进程数
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(os.cpu_count() or 1)))
+COMPUTE_START_METHOD = os.getenv("COMPUTE_START_METHOD", "spawn")
+# 取消标记的个数，在途任务超过该数量时新任务不能被取消
+COMPUTE_MAX_TASKS = int(os.getenv("COMPUTE_MAX_TASKS", "1024"))
+
+
+class Cancelled(Exception):
+    """
+    任务已被同一个 key 的新任务取代
+    """
+
+
+# 当前线程正在执行的任务：(取消标记数组, 位置)
+_current = threading.local()
+# 计算进程在初始化时继承的取消标记数组
+_worker_flags = None
+
+
+def check_cancelled():
+    """
+    检查点：当前任务已被取代时抛出 Cancelled，不在任务中时什么也不做
+    """
+    task = getattr(_current, 'task', None)
+    if task is not None and task[0][task[1]]:
+        raise Cancelled()
+
+
+def _init_worker(flags):
+    global _worker_flags
+    _worker_flags = flags
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def _run_task(slot, fn, args):
+    """
+    在计算进程中执行任务
+    :return: (结果, 阶段耗时, 计数)，阶段耗时和计数由调用方合并到回调的 trace
+    """
+    _current.task = (_worker_flags, slot) if slot is not None else None
+    try:
+        with capture() as trace:
+            check_cancelled()
+            result = fn(*args)
+        return result, trace.stages, trace.values
+    finally:
+        _current.task = None
+
+
+class _Task:
+    def __init__(self, slot, session=None, generation=None):
+        self.slot = slot
+        self.session = session
+        self.generation = generation
+        self.future = None
+        self.cancelled = False
+
+
+class ComputePool:
+    """
+    按 key 取代旧任务的计算后端，backend 为 'inline' 或 'process'
+    """
+
+    def __init__(self, backend=COMPUTE_BACKEND, workers=COMPUTE_WORKERS, start_method=COMPUTE_START_METHOD,
+                 max_tasks=COMPUTE_MAX_TASKS):
+        self.backend = backend
+        self.workers = workers
+        self._context = multiprocessing.get_context(start_method)
+        self._flags = self._context.RawArray('b', max_tasks)
+        self._free_slots = list(range(max_tasks))
+        self._inflight = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # 计算进程在第一次提交任务时才启动
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context,
+                                                     initializer=_init_worker, initargs=(self._flags,))
+                logging.info(f"Started compute pool with {self.workers} processes.")
+            return self._executor
+
+    def _reset_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _cancel(self, task):
+        task.cancelled = True
+        if task.slot is not None:
+            self._flags[task.slot] = 1
+        if task.future is not None:
+            task.future.cancel()
+
+    def _acquire(self, key, session, generation):
+        with self._lock:
+            previous = self._inflight.get(key) if key is not None else None
+            if previous is not None:
+                self._cancel(previous)
+                record(compute_superseded=1)
+            slot = self._free_slots.pop() if self._free_slots else None
+            if slot is None:
+                logging.warning("No free cancellation slot, running the task without cancellation.")
+            else:
+                self._flags[slot] = 0
+            task = _Task(slot, session, generation)
+            self._tasks.add(task)
+            if key is not None:
+                self._inflight[key] = task
+            return task
+
+    def _release(self, key, task):
+        with self._lock:
+            self._tasks.discard(task)
+            if key is not None and self._inflight.get(key) is task:
+                del self._inflight[key]
+            if task.slot is not None:
+                self._free_slots.append(task.slot)
+
+    def cancel(self, key):
+        """
+        取消 key 对应的在途任务
+        """
+        with self._lock:
+            task = self._inflight.get(key)
+            if task is not None:
+                self._cancel(task)
+
+    def supersede(self, session, generation):
+        """
+        取消该会话中代数早于 generation 的所有在途任务
+        """
+        with self._lock:
+            stale = [task for task in self._tasks
+                     if task.session == session and task.generation is not None and task.generation < generation]
+            for task in stale:
+                self._cancel(task)
+        if stale:
+            record(compute_superseded=len(stale))
+
+    def run(self, key, fn, *args, session=None, generation=None):
+        """
+        执行 fn(*args) 并等待结果，进程池中执行时 fn 和参数需要能被 pickle
+        :param key: 取代关系的键，例如 (会话, 指标)；None 表示不参与取代
+        :param session/generation: 任务所属的会话和代数，由 supersede 按代数取消
+        :raises Cancelled: 任务在完成前被取代
+        """
+        task = self._acquire(key, session, generation)
+        try:
+            with stage('compute'):
+                if self.backend == 'process':
+                    return self._run_process(task, fn, args)
+                return self._run_inline(task, fn, args)
+        finally:
+            self._release(key, task)
+
+    def _run_inline(self, task, fn, args):
+        _current.task = (self._flags, task.slot) if task.slot is not None else None
+        try:
+            check_cancelled()
+            return fn(*args)
+        finally:
+            _current.task = None
+
+    def _run_process(self, task, fn, args):
+        executor = self._get_executor()
+        with self._lock:
+            if task.cancelled:
+                raise Cancelled()
+            task.future = executor.submit(_run_task, task.slot, fn, args)
+        try:
+            result, stages, values = task.future.result()
+        except CancelledError:
+            raise Cancelled()
+        except BrokenProcessPool:
+            logging.error("Compute pool is broken, restarting it on the next task.")
+            self._reset_executor(executor)
+            raise
+        merge(stages, values)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+EPOCH = pd.Timestamp('1970-01-01')
+
+
+def x_positions(x):
+    """
+    把横轴取值转为数值：能解析为时间的按秒级时间戳，否则按位置
+    """
+    if len(x) and not pd.api.types.is_numeric_dtype(np.asarray(x).dtype):
+        times = pd.to_datetime(pd.Index(x).astype(str), errors='coerce')
+        if not times.isna().any():
+            return np.asarray((times - EPOCH).total_seconds(), dtype=np.float64)
+        return np.arange(len(x), dtype=np.float64)
+    return np.asarray(x, dtype=np.float64)
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样：保留首尾两点，其余点均分到 threshold - 2 个桶中，
+    每个桶选出与上一个选中点、下一个桶均值构成的三角形面积最大的点，保持折线的形状和峰谷
+    :param x/y: 数值数组，不含 NaN，x 递增
+    :return: 选中的点的下标
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    bounds = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    # 用前缀和一次求出所有桶的均值，作为下一个桶的代表点
+    x_sums = np.concatenate([[0.0], np.cumsum(x)])
+    y_sums = np.concatenate([[0.0], np.cumsum(y)])
+    next_lo = bounds[1:]
+    next_hi = np.append(bounds[2:], n)
+    next_counts = next_hi - next_lo
+    x_means = (x_sums[next_hi] - x_sums[next_lo]) / next_counts
+    y_means = (y_sums[next_hi] - y_sums[next_lo]) / next_counts
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        area = np.abs((x[a] - x_means[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (y_means[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def window_indices(positions, x_range):
+    """
+    横轴落在 x_range 内的点，两侧各多保留一个点，使折线延伸到可见区域的边缘
+    """
+    lo, hi = np.searchsorted(positions, x_range[0], side='left'), np.searchsorted(positions, x_range[1], side='right')
+    return np.arange(max(lo - 1, 0), min(hi + 1, len(positions)))
+
+
+def downsample_series(x, y, max_points, x_range=None):
+    """
+    折线的服务端降采样：先按 x_range 截取缩放窗口，窗口内的点数超过 max_points 时用 LTTB 降采样，否则保留全部点
+    NaN 点不参与降采样，只保留每段空缺的第一个点，折线在空缺处仍然断开
+    :param x_range: 横轴的可见范围，取值与 x_positions 的结果可比；None 表示全部
+    :return: (x, y)，类型与输入一致
+    """
+    y_values = np.asarray(y, dtype=np.float64)
+    if x_range is None and len(y_values) <= max_points:
+        return x, y
+
+    positions = x_positions(x)
+    indices = np.arange(len(positions)) if x_range is None else window_indices(positions, x_range)
+    if len(indices) > max_points:
+        finite = np.isfinite(y_values[indices])
+        valid = indices[finite]
+        keep = valid[lttb(positions[valid], y_values[valid], max_points)]
+        gap_starts = indices[~finite & np.concatenate([[True], finite[:-1]])]
+        indices = np.union1d(keep, gap_starts)
+
+    return _take(x, indices), _take(y, indices)
+
+
+def _take(values, indices):
+    if isinstance(values, pd.Series):
+        return values.iloc[indices]
+    if isinstance(values, pd.Index):
+        return values[indices]
+    return np.asarray(values)[indices]
+
+
+def relayout_x_range(relayout_data):
+    """
+    从 Graph 的 relayoutData 中解析横轴范围
+    :return: (是否涉及横轴, 横轴范围)，范围为 None 表示恢复显示全部
+    """
+    if not relayout_data:
+        return False, None
+    if relayout_data.get('xaxis.autorange'):
+        return True, None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        bounds = [relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']]
+    elif 'xaxis.range' in relayout_data:
+        bounds = relayout_data['xaxis.range']
+    else:
+        return False, None
+
+    # 时间轴上的范围是时间文本，类别轴或数值轴上是数值
+    if isinstance(bounds[0], str):
+        # plotly 会省略末尾为零的时间部分，两端的格式可能不同，需要分别解析
+        times = [pd.to_datetime(bound, errors='coerce') for bound in bounds]
+        if any(pd.isna(time) for time in times):
+            return False, None
+        bounds = [(time - EPOCH).total_seconds() for time in times]
+    return True, (float(min(bounds)), float(max(bounds)))
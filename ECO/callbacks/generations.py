@@ -0,0 +1,61 @@
+"""
+按会话的代数丢弃被取代的回调计算
+
+输入变化时回调为会话分配新的代数（纳秒时间戳，同一主机上不同 worker 分配的代数也可以比较先后），
+代数随绘图参数传给后续回调。每个进程记录各 (会话, 范围) 见到的最新代数：
+旧代数的计算在阶段边界（读取数据后、排序后、每个指标开始前）发现有更新的代数时放弃，
+服务端的负载因此只与用户最终看到的结果成正比
+"""
+import threading
+import time
+
+from callbacks.compute_pool import Cancelled
+from data.ttl_cache import TTLCache
+from instrumentation import record
+
+
+class Generations:
+    """
+    每个 (会话, 范围) 的最新代数，范围区分互不取代的计算，例如读取数据源和绘图
+    会话为空时不参与取代
+    """
+
+    def __init__(self, ttl, maxsize=4096):
+        self._latest = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def start(self, session, scope):
+        """
+        为一次新的计算分配代数，并记为该会话的最新代数
+        """
+        generation = time.time_ns()
+        self.observe(session, scope, generation)
+        return generation
+
+    def observe(self, session, scope, generation):
+        """
+        记录其他回调分配的代数
+        :return: generation 是否仍是最新代数
+        """
+        if session is None or generation is None:
+            return True
+        with self._lock:
+            latest = self._latest.get((session, scope))
+            if latest is None or generation > latest:
+                self._latest.set((session, scope), generation)
+                return True
+            return generation == latest
+
+    def is_current(self, session, scope, generation):
+        if session is None or generation is None:
+            return True
+        latest = self._latest.get((session, scope))
+        return latest is None or generation >= latest
+
+    def check(self, session, scope, generation):
+        """
+        阶段边界的检查点：记录 generation，已有更新的代数时抛出 Cancelled
+        """
+        if not self.observe(session, scope, generation):
+            record(superseded=1)
+            raise Cancelled()
@@ -0,0 +1,194 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+
+def percentile_bounds(num_points, percents):
+    """
+    与原实现一致：按排序后的位置取 [floor(n * p0), ceil(n * p1)) 的行
+    """
+    lower_idx = int(np.floor(num_points * (percents[0] / 100.0)))
+    upper_idx = int(np.ceil(num_points * (percents[1] / 100.0)))
+    return lower_idx, upper_idx
+
+
+def select_percentile_rows(sort_values, percents):
+    """
+    用 argpartition 选出排序后位于百分位区间内的行号，不做全量排序
+    NaN 与 sort_values 一致排在最后
+    """
+    sort_values = np.asarray(sort_values, dtype=np.float64)
+    lower_idx, upper_idx = percentile_bounds(len(sort_values), percents)
+    if upper_idx <= lower_idx:
+        return np.empty(0, dtype=np.int64)
+
+    kth = sorted({lower_idx, upper_idx - 1})
+    return np.argpartition(sort_values, kth)[lower_idx:upper_idx]
+
+
+def default_edges(values):
+    """
+    与原实现一致的分箱边界：[floor(min), ceil(max)] 等分为 10 个区间，最小值和最大值相同时退化为两个单位区间
+    """
+    min_val = np.floor(np.nanmin(values))
+    max_val = np.ceil(np.nanmax(values))
+    if min_val + 10e-8 > max_val:
+        return np.array([min_val - 1, min_val, min_val + 1])
+    edges = np.linspace(min_val, max_val, num=11)
+    edges[0] = min_val
+    edges[-1] = max_val
+    return edges
+
+
+def bin_indices(values, edges):
+    """
+    等价于 pd.cut(right=True, include_lowest=True)：第一个区间为 [e0, e1]，其余为 (ei, ei+1]
+    区间之外的值和 NaN 返回 -1
+    """
+    idx = np.searchsorted(edges, values, side='left') - 1
+    idx[values == edges[0]] = 0
+    idx[(idx >= len(edges) - 1) | np.isnan(values)] = -1
+    return idx
+
+
+def interval_labels(edges):
+    """
+    生成与原实现相同的区间文本：最左侧区间为 [a, b]，其余为 (a, b]
+    区间端点沿用 pd.cut 的精度处理，只对边界数组本身调用一次
+    """
+    categories = pd.cut(edges, bins=edges, right=True, include_lowest=True).categories
+    labels = []
+    for idx, interval in enumerate(categories):
+        if idx == 0:
+            labels.append(f"[{int(interval.left)}, {int(interval.right)}]")
+        else:
+            labels.append(f"({int(interval.left)}, {int(interval.right)}]")
+    return labels
+
+
+class PartialHistograms:
+    """
+    可增量累加的多指标直方图，所有指标共享一次 bincount
+    edges 需事先确定，各分块的计数直接相加即可合并
+    """
+
+    def __init__(self, edges_by_col):
+        self.cols = list(edges_by_col)
+        self.edges = [edges_by_col[col] for col in self.cols]
+        self.offsets = np.concatenate(([0], np.cumsum([len(edges) - 1 for edges in self.edges])))
+        self.counts = np.zeros(self.offsets[-1], dtype=np.int64)
+
+    def add(self, values_by_col):
+        flat = []
+        for i, col in enumerate(self.cols):
+            idx = bin_indices(values_by_col[col], self.edges[i])
+            flat.append(idx[idx >= 0] + self.offsets[i])
+        if flat:
+            self.counts += np.bincount(np.concatenate(flat), minlength=len(self.counts))
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def result(self):
+        """
+        :return: {col: (区间文本列表, 计数列表)}
+        """
+        return {
+            col: (interval_labels(self.edges[i]), self.counts[self.offsets[i]:self.offsets[i + 1]].tolist())
+            for i, col in enumerate(self.cols)
+        }
+
+
+def _numeric_columns(chunk, value_cols):
+    """
+    把各指标转换为 float64，无法转换的列记录错误并跳过
+    """
+    values = {}
+    for col in value_cols:
+        try:
+            values[col] = chunk[col].to_numpy(dtype=np.float64)
+        except (ValueError, TypeError):
+            logging.error(f"Column {col} cannot be converted to float.")
+    return values
+
+
+def _take_quota(mask_equal, quota):
+    """
+    在相等值中按出现顺序取前 quota 个，返回选中的掩码和剩余配额
+    """
+    positions = np.flatnonzero(mask_equal)[:max(quota, 0)]
+    selected = np.zeros(len(mask_equal), dtype=bool)
+    selected[positions] = True
+    return selected, quota - len(positions)
+
+
+def percentile_histograms(chunks, sort_indicator, value_cols, percents):
+    """
+    time 模式的分布直方图：按 sort_indicator 取 [p0, p1] 百分位的行，对每个指标做 10 等分直方图
+
+    chunks 为若干 DataFrame（例如每个分区一份），不需要先拼接或整体排序：
+    1. 只在排序指标这一列上用 np.partition 找到区间上下界的取值，以及边界上相等值需要取多少行
+    2. 逐块选出区间内的行，计算各指标的最小最大值，确定分箱边界
+    3. 逐块计算部分直方图并累加
+    :return: {col: (区间文本列表, 计数列表)}，列顺序与 value_cols 一致，无法转换为数值的列被跳过
+    """
+    chunks = [chunk for chunk in chunks if len(chunk)]
+    sort_arrays = [chunk[sort_indicator].to_numpy(dtype=np.float64) for chunk in chunks]
+    sort_values = np.concatenate(sort_arrays) if sort_arrays else np.empty(0)
+    num_points = len(sort_values)
+    logging.info(f"len of data is {num_points}")
+
+    lower_idx, upper_idx = percentile_bounds(num_points, percents)
+    if upper_idx <= lower_idx:
+        return {}
+
+    # 第 1 步：区间边界上的取值，以及边界上相等的值中需要保留几个
+    kth = sorted({lower_idx, upper_idx - 1})
+    partitioned = np.partition(sort_values, kth)
+    low_value, high_value = partitioned[lower_idx], partitioned[upper_idx - 1]
+    if np.isnan(low_value) or np.isnan(high_value):
+        # 区间落在 NaN 上时直接使用整体的行选择
+        selected = select_percentile_rows(sort_values, percents)
+        mask = np.zeros(num_points, dtype=bool)
+        mask[selected] = True
+        split_points = np.cumsum([len(arr) for arr in sort_arrays])[:-1]
+        masks = np.split(mask, split_points)
+    else:
+        if low_value == high_value:
+            quota_low = upper_idx - lower_idx
+            quota_high = 0
+        else:
+            quota_low = int(np.count_nonzero(sort_values <= low_value)) - lower_idx
+            quota_high = upper_idx - int(np.count_nonzero(sort_values < high_value))
+
+        masks = []
+        for arr in sort_arrays:
+            mask = (arr > low_value) & (arr < high_value)
+            take_low, quota_low = _take_quota(arr == low_value, quota_low)
+            mask |= take_low
+            if high_value != low_value:
+                take_high, quota_high = _take_quota(arr == high_value, quota_high)
+                mask |= take_high
+            masks.append(mask)
+
+    # 第 2 步：区间内各指标的范围，确定共享的分箱边界
+    selected_chunks = [_numeric_columns(chunk[mask], value_cols) for chunk, mask in zip(chunks, masks)]
+    edges_by_col = {}
+    for col in value_cols:
+        parts = [values[col] for values in selected_chunks if col in values]
+        if len(parts) != len(selected_chunks):
+            continue
+        values = np.concatenate(parts)
+        if np.isnan(values).all():
+            logging.error(f"Column {col} has no numeric values in the selected range.")
+            continue
+        edges_by_col[col] = default_edges(values)
+
+    # 第 3 步：逐块累加部分直方图
+    histograms = PartialHistograms(edges_by_col)
+    for values in selected_chunks:
+        histograms.add(values)
+    return histograms.result()
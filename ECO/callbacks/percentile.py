@@ -0,0 +1,13 @@
+# 截尾加权均值与 inspect、inspect-psql 共用 percentile-lib 中的实现；前缀和索引属于数据层，见 data.percentile_index
+from eco_percentile import weighted_percentile
+
+from data.percentile_index import PercentileIndex
+
+
+def grouped_weighted_percentile(data, group_col, sort_indicator, value_cols, percents):
+    """
+    按 group_col 分组，组内按 sort_indicator 排序后，一次性计算所有指标在 [p0, p1] 区间的截尾加权均值
+    等价于 groupby(group_col).apply(...) 中对每列调用 weighted_percentile，行数不超过 2 的分组为 NaN
+    :return: 以分组键为索引、value_cols 为列的 DataFrame
+    """
+    return PercentileIndex(data, group_col, value_cols).query(sort_indicator, percents)
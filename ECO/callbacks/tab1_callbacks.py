@@ -1,13 +1,20 @@
 from app import app
-from data import s3_utils
-import pandas as pd
-from dash import dcc, html
-from dash.dependencies import Input, Output, State
-import numpy as np
+from data import datasets
+from dash import dcc, html, no_update
+from dash.dependencies import ALL, MATCH, Input, Output, State
 import logging
+import uuid
 from config.granularity_config import granularity_options
+from callbacks.charts import compute_pool, is_panel_open, metric_figure, metric_panels, open_panel_metrics
+from callbacks.compute_pool import Cancelled
+from callbacks.downsample import relayout_x_range
+from callbacks.generations import Generations
+from instrumentation import ECO_DEBUG_PANEL, format_recent_traces, record, stage, traced
 import dash_bootstrap_components as dbc
 
+# 每个会话最新的数据源和绘图代数，旧代数的计算在阶段边界放弃
+generations = Generations(ttl=datasets.RESULT_STORE_TTL)
+
 
 # 回调函数，用于跳转到不同的子域名
 @app.callback(
@@ -27,92 +34,80 @@ def update_link(region):
 # 需要更新数据源的控件
 @app.callback(
     [Output('filtered-data', 'data'),
-     Output('param-store', 'data')],  # 更新保存的参数到 store
+     Output('param-store', 'data'),  # 更新保存的参数到 store
+     Output('session-id', 'data')],
     [Input('date-picker-range', 'start_date'),
      Input('date-picker-range', 'end_date'),
      Input('time-granularity-dropdown', 'value'),
      Input('metric-granularity-dropdown', 'value'),
-     Input('band-dropdown', 'value')],
-    [State('param-store', 'data')]  # 读取存储的参数
+     Input('band-dropdown', 'value'),
+     Input('compute-mode-radio', 'value')],
+    [State('param-store', 'data'),  # 读取存储的参数
+     State('session-id', 'data')]
 )
-def update_data_source(start_date, end_date, time_granularity, metric_granularity, connection_type, stored_params):
-    # 初始化 stored_params 如果为空
-    if stored_params is None:
-        stored_params = {
-            'start_date': None,
-            'end_date': None,
-            'time_granularity': None,
-            'metric_granularity': None,
-            'connection_type_path': None
-        }
-
-    # 解析起止日期，确保 start_datetime 和 end_datetime 包括完整的时间范围
-    start_datetime = pd.to_datetime(f"{start_date}").replace(hour=0, minute=0, second=0)  # 设置为当天 00:00:00
-    end_datetime = pd.to_datetime(f"{end_date}").replace(hour=23, minute=59, second=59)  # 设置为当天 23:59:59
-
-    # 映射 2.4GHz、5GHz、6GHz 为 "wireless"
-    if connection_type in ['2.4GHz', '5GHz', '6GHz']:
-        mapped_connection_type = 'wireless'
-    else:
-        mapped_connection_type = connection_type
-
-    # 根据 metric_granularity 获取配置
-    selected_option = granularity_options.get(metric_granularity, None)
-    if not selected_option:
-        logging.error(f"Invalid metric_granularity: {metric_granularity}")
-        return [], stored_params
-
-    # 根据 mapped_connection_type 获取路径
-    path = selected_option['path'].get(mapped_connection_type, None)
-    if not path:
-        logging.error(f"Invalid path for connection_type: {connection_type} (mapped as {mapped_connection_type})")
-        return [], stored_params
-
-        # 检查是否需要更新数据源
-    if (stored_params['start_date'] == start_date and
-            stored_params['end_date'] == end_date and
-            stored_params['time_granularity'] == time_granularity and
-            stored_params['metric_granularity'] == metric_granularity and
-            stored_params['connection_type_path'] == path):
+@traced('update_data_source')
+def update_data_source(start_date, end_date, time_granularity, metric_granularity, connection_type, compute_mode,
+                       stored_params, session_id):
+    # 页面首次加载时分配会话 ID，同一会话的新计算会取消还未完成的旧计算
+    session_output = no_update if session_id else uuid.uuid4().hex
+    session = session_id or session_output
+    generation = generations.start(session, 'data')
+
+    query = datasets.build_query(start_date, end_date, time_granularity, metric_granularity, connection_type,
+                                 compute_mode)
+    if query is None:
+        return None, stored_params, session_output
+
+    # 检查是否需要更新数据源
+    if stored_params == query:
         logging.info("Parameters unchanged. No need to reload data.")
-        return [], stored_params  # 如果参数没有变化，则跳过数据更新
-
-    # 从 S3 获取数据，使用动态路径
-    data = s3_utils.get_s3_data(start_datetime, end_datetime, time_granularity, path)
-
-    # 将 10 位时间戳（Unix 时间）转换为 datetime 格式
-    data['collection_time'] = pd.to_datetime(data['collection_time'], unit='s')
-
-    # 过滤数据，确保过滤日期和时间
-    filtered_data = data[(data['collection_time'] >= start_datetime) & (data['collection_time'] <= end_datetime)]
-    logging.info(f"Filtered data has {len(filtered_data)} rows.")
-
-    # 更新存储的参数
-    new_stored_params = {
-        'start_date': start_date,
-        'end_date': end_date,
-        'time_granularity': time_granularity,
-        'metric_granularity': metric_granularity,
-        'connection_type_path': connection_type
-    }
-
-    # 将过滤后的数据和更新后的参数存储在 dcc.Store 中
-    return filtered_data.to_dict('records'), new_stored_params
-
-
-# 保存图表绘制结果
+        return no_update, no_update, session_output  # 如果参数没有变化，则跳过数据更新
+
+    # 数据集保存在服务端，dcc.Store 中只保存句柄和查询参数
+    with stage('get_dataset'):
+        handle, data = datasets.get_dataset(query)
+    record(rows=len(data))
+    # 读取期间用户又修改了数据源，结果仍留在服务端缓存中，但不再触发绘图
+    if not generations.is_current(session, 'data', generation):
+        record(superseded=1)
+        return no_update, no_update, session_output
+
+    # 预先为默认排序指标构建百分位索引，其他排序指标在首次使用时构建；
+    # 使用进程池时索引建在计算进程中，这里不需要预先构建
+    default_sort_indicator = granularity_options[metric_granularity]['default']
+    if not data.empty and not datasets.is_sketch(data) and compute_pool.backend == 'inline':
+        with stage('index_build'):
+            datasets.get_percentile_index(handle, data, metric_granularity).build(default_sort_indicator)
+        if not generations.is_current(session, 'data', generation):
+            record(superseded=1)
+            return no_update, no_update, session_output
+    return {'handle': handle, 'query': query, 'rows': len(data)}, query, session_output
+
+
+# 图表面板：只生成每个指标的折叠面板和绘图参数，图表在面板展开时由 update_metric_graph 按需计算
 @app.callback(
     [Output('graphs-container', 'children'),
-     Output('percentile-output', 'children')],  # 把图表数据存储到 Store
+     Output('percentile-output', 'children'),
+     Output('graph-params', 'data')],  # 把绘图参数存储到 Store
     [Input('band-dropdown', 'value'),
      Input('filtered-data', 'data'),
      Input('metric-granularity-dropdown', 'value'),
      Input('sort-indicator-dropdown', 'value'),
      Input('percentile-slider', 'value'),
      Input('agg-dimension-dropdown', 'value')],  # 增加压缩维度的输入
+    [State({'type': 'metric-panel', 'metric': ALL}, 'id'),
+     State({'type': 'metric-panel', 'metric': ALL}, 'open'),
+     State({'type': 'metric-summary', 'metric': ALL}, 'n_clicks'),  # 保留用户已展开的面板
+     State('session-id', 'data')],
     prevent_initial_call=True
 )
-def update_graphs(connection_type, filtered_data, metric_granularity, sort_indicator, percentile_slider, agg_dimension):
+@traced('update_graphs')
+def update_graphs(connection_type, filtered_data, metric_granularity, sort_indicator, percentile_slider, agg_dimension,
+                  panel_ids, panels_open, panel_clicks, session_id):
+    # 新的绘图代数：该会话还在计算的旧图表不再需要
+    generation = generations.start(session_id, 'graphs')
+    compute_pool.supersede(session_id, generation)
+
     # 检查是否选择了 'in-ap' 和 'ethernet'
     if connection_type == 'ethernet':
         if metric_granularity == 'in-ap':
@@ -120,7 +115,7 @@ def update_graphs(connection_type, filtered_data, metric_granularity, sort_indic
                 "The combination of 'in-ap' and 'Ethernet' is not supported at this time.",
                 color="warning"
             )
-            return notification_message, []
+            return notification_message, [], None
     #     elif metric_granularity == 'controller':
     #         return notification_message, []
     # elif connection_type == 'all':
@@ -130,129 +125,87 @@ def update_graphs(connection_type, filtered_data, metric_granularity, sort_indic
 
     percentile_start, percentile_end = percentile_slider
 
-    # 将传入的字典格式的 filtered_data 转为 DataFrame
-    data = pd.DataFrame(filtered_data)
-    logging.info(f"Original data has {len(data)} rows")  # 确认数据行数
-
-    # 如果 band 被选择，则进行过滤
-    if connection_type in ['2.4GHz', '5GHz', '6GHz']:
-        data = data[data['band'] == connection_type]
-
-    # 获取当前的 granularity 数据
-    granularity_data = granularity_options.get(metric_granularity, {'options': [], 'default': None})
-
-    # 提取所有数值列的 'value' 字段作为 numeric_cols
-    numeric_cols = [opt['value'] for opt in granularity_data['options']]
-
-    # 检查是否需要重新排序
-    if 'sorted_data' not in data or sort_indicator != data.get('sorted_by', None):
-        # 按照 sort_indicator 对数据进行排序
-        data = data.sort_values(by=sort_indicator)
-        data['sorted_by'] = sort_indicator
-        data['sorted_data'] = True  # 标记已经排序
-
-    data = data.set_index('collection_time_agg')
-
-    # 定义每个分组的处理函数
-    def get_percentile_row(group, sort_indicator, percentiles):
-        sorter = np.argsort(group[sort_indicator].values)
-        if len(sorter) <= 2:
-            return pd.Series({col: np.nan for col in numeric_cols})
-
-        # 对每一列应用加权百分位排序
-        weighted_values = {col: weighted_percentile(group[col].values, percentiles, sorter) for col in numeric_cols}
-        return pd.Series(weighted_values)
-
-    # 根据选择的压缩维度来决定处理方式
-    if agg_dimension == 'network':
-        # 按网络分组绘制折线图
-        grouped = data.groupby('collection_time_agg').apply(
-            lambda x: get_percentile_row(x, sort_indicator, [percentile_start, percentile_end])
-        )
-
-        # 找到排序指标 sort_indicator 对应的 label
-        sort_indicator_label = next((opt['label'] for opt in granularity_data['options'] if opt['value'] == sort_indicator), sort_indicator)
-
-        # 创建多个图表（按网络分组）
-        graphs = []
-        for col in numeric_cols:
-            # 从 granularity_data['options'] 中找到与 col 对应的 label
-            label = next((opt['label'] for opt in granularity_data['options'] if opt['value'] == col), col)
+    if not filtered_data:
+        return [], "", None
 
-            # 创建折线图
-            figure = {
-                'data': [{'x': grouped.index, 'y': grouped[col], 'type': 'line', 'name': col}],
-                'layout': {'title': f'{label} for ({sort_indicator_label}) In {percentile_start:.2f}% - {percentile_end:.2f}%'}
-            }
-            graphs.append(dcc.Graph(figure=figure))
-    elif agg_dimension == 'time':
-        # 按时间维度绘制柱状图
-        data = data.sort_values(by=sort_indicator)
+    # 数据集行数已由 update_data_source 写入句柄，这里不再取回数据集
+    record(rows=filtered_data['rows'])
+    if not filtered_data['rows']:
+        return [], "No data found for the selected range.", None
 
-        # 计算百分位
-        num_points = len(data)
-        logging.info(f"len of data is {num_points}")
-        lower_idx = int(np.floor(num_points * (percentile_start / 100.0)))
-        upper_idx = int(np.ceil(num_points * (percentile_end / 100.0)))
-        sliced_data = data.iloc[lower_idx:upper_idx]
+    # 频段过滤已在读取时下推，这里只需确认数据集与当前选择一致；
+    # 切换频段或指标粒度后，新的数据集写入之前旧数据集不再用于绘图
+    query = filtered_data['query']
+    if (query['band'] != (connection_type if connection_type in datasets.BANDS else None)
+            or query['metric_granularity'] != metric_granularity):
+        return no_update, no_update, no_update
 
-        graphs = []
-        for col in numeric_cols:
-            try:
-                # 确保列数据可以转换为float，否则跳过
-                sliced_data[col] = sliced_data[col].astype(float)
-                min_val = np.floor(sliced_data[col].min())
-                max_val = np.ceil(sliced_data[col].max())
-
-                # 检查最小值和最大值是否相同，避免生成重复区间
-                if min_val+ 10e-8>max_val:
-                    # 如果相等，手动创建一个简单区间范围
-                    default_intervals = [min_val - 1, min_val, min_val + 1]
-                else:
-                    # 手动构建区间，确保区间显示为 [min_val, max_val]
-                    default_intervals = np.linspace(min_val, max_val, num=11)
-                    default_intervals[0] = min_val  # 确保最小值区间左闭
-                    default_intervals[-1] = max_val  # 确保最大值区间右闭
-            except ValueError:
-                # 如果列不能转换为float，记录错误并继续处理下一列
-                logging.error(f"Column {col} cannot be converted to float.")
-                continue
-
-            # 统计区间数据
-            interval_counts = pd.cut(sliced_data[col], bins=default_intervals, right=True, include_lowest=True).value_counts().sort_index()
-
-            # 格式化区间：最左侧区间为 [a, b]；其他区间为 (a, b]
-            formatted_intervals = []
-            for idx, interval in enumerate(interval_counts.index):
-                if idx == 0:
-                    # 最左侧区间，显示为 [a, b]
-                    formatted_intervals.append(f"[{int(interval.left)}, {int(interval.right)}]")
-                else:
-                    # 其他区间，保持 (a, b] 格式
-                    formatted_intervals.append(f"({int(interval.left)}, {int(interval.right)}]")
-
-            # 从 granularity_data['options'] 中找到与 col 对应的 label
-            label = next((opt['label'] for opt in granularity_data['options'] if opt['value'] == col), col)
-
-            # 创建柱状图
-            figure = {
-                'data': [
-                    {'x': formatted_intervals, 'y': list(interval_counts.values), 'type': 'bar', 'name': label}
-                ],
-                'layout': {
-                    'title': f'{label} Distribution for {sort_indicator.capitalize()} Percentile {percentile_start}% - {percentile_end}%',
-                    'xaxis': {'title': 'Interval'},
-                    'yaxis': {'title': 'Count'}
-                }
-            }
-
-            graphs.append(dcc.Graph(figure=figure))
+    params = {
+        'query': query,
+        'metric_granularity': metric_granularity,
+        'sort_indicator': sort_indicator,
+        'percents': [percentile_start, percentile_end],
+        'agg_dimension': agg_dimension,
+        'session': session_id,
+        'generation': generation,
+    }
+    graphs = metric_panels(metric_granularity, open_panel_metrics(panel_ids, panels_open, panel_clicks))
 
     # 计算选取的用户数据百分比
     percentage_selected = (percentile_end - percentile_start)
     percentage_text = f'Selected Data Percentage: {percentage_selected:.2f}%'
 
-    return graphs, percentage_text
+    return graphs, percentage_text, params
+
+
+# 单个指标的图表：面板插入页面或被点击展开时计算，折叠的面板不计算
+@app.callback(
+    Output({'type': 'metric-graph', 'metric': MATCH}, 'children'),
+    [Input({'type': 'metric-summary', 'metric': MATCH}, 'n_clicks')],
+    [State({'type': 'metric-panel', 'metric': MATCH}, 'open'),
+     State({'type': 'metric-panel', 'metric': MATCH}, 'id'),
+     State('graph-params', 'data')]
+)
+@traced('update_metric_graph')
+def update_metric_graph(n_clicks, initially_open, panel_id, params):
+    # 折叠时保留已绘制的图表，再次展开不需要重新请求
+    if not params or not is_panel_open(initially_open, n_clicks):
+        return no_update
+
+    try:
+        # 每个指标开始前检查绘图参数是否已被更新的代数取代
+        generations.check(params['session'], 'graphs', params['generation'])
+        figure = metric_figure(params, panel_id['metric'], task_key=('graph', params['session'], panel_id['metric']))
+    except Cancelled:
+        # 参数已经变化，新的请求会填充图表
+        return no_update
+    if figure is None:
+        return html.Div("No data found for the selected range.")
+    return dcc.Graph(id={'type': 'metric-figure', 'metric': panel_id['metric']}, figure=figure)
+
+
+# 缩放图表时只重新取可见窗口内的点，窗口内点数不超过 FIGURE_MAX_POINTS 时为全分辨率
+@app.callback(
+    Output({'type': 'metric-figure', 'metric': MATCH}, 'figure'),
+    [Input({'type': 'metric-figure', 'metric': MATCH}, 'relayoutData')],
+    [State({'type': 'metric-figure', 'metric': MATCH}, 'id'),
+     State('graph-params', 'data')],
+    prevent_initial_call=True
+)
+@traced('update_metric_zoom')
+def update_metric_zoom(relayout_data, graph_id, params):
+    changed, x_range = relayout_x_range(relayout_data)
+    # 只有折线需要按窗口取点，time 模式的柱状图只有 10 个区间
+    if not changed or not params or params['agg_dimension'] != 'network':
+        return no_update
+
+    try:
+        generations.check(params['session'], 'graphs', params['generation'])
+        figure = metric_figure(params, graph_id['metric'], x_range,
+                               task_key=('zoom', params['session'], graph_id['metric']))
+    except Cancelled:
+        return no_update
+    return figure if figure is not None else no_update
 
 @app.callback(
     [Output('sort-indicator-dropdown', 'options'),
@@ -265,43 +218,12 @@ def update_sort_indicator_options(selected_granularity):
     return granularity_data['options'], granularity_data['default']
 
 
-# 定义加权百分位函数并添加日志
-def weighted_percentile(data, percents, sorter):
-    logging.info(f"Percents: {percents}, Sorter: {sorter}")
-
-    num_points = len(data)
-    pad_data = np.pad(data[sorter], pad_width=(1, 1), mode='edge')
-
-    lower_percentile = percents[0] / 100 * num_points
-    upper_percentile = percents[1] / 100 * num_points
-
-    lower_floor = int(np.floor(lower_percentile))
-    upper_floor = int(np.floor(upper_percentile))
-    lower_ceil = int(np.ceil(lower_percentile))
-    upper_ceil = int(np.ceil(upper_percentile))
-    logging.info(f"Lower floor: {lower_floor}, Upper floor: {upper_floor}, Lower ceil: {lower_ceil}, Upper ceil: {upper_ceil}")
-
-    # 确保数据类型为浮点数
-    pad_data = np.array(pad_data, dtype=np.float64)
-
-    if lower_floor == upper_floor:
-        if upper_percentile - lower_percentile < 10e-8:
-            result = (pad_data[lower_floor] + pad_data[lower_floor + 1]) / 2
-            return result
-        return pad_data[lower_ceil]
-
-    lower_weight = lower_ceil - lower_percentile
-    upper_weight = upper_percentile - upper_floor
-
-    all_value = lower_weight * pad_data[lower_ceil] + upper_weight * pad_data[upper_floor + 1]
-
-    logging.info(f"All value after initial calculation: {all_value}")
-
-    for index in range(lower_ceil + 1, upper_floor + 1):
-        all_value = all_value + pad_data[index]
-
-    logging.info(f"All value after adding in range: {all_value}")
-
-    weighted_data = all_value / (upper_percentile - lower_percentile)
-
-    return weighted_data
+if ECO_DEBUG_PANEL:
+    # 图表更新后刷新调试面板，显示本进程最近的 trace
+    @app.callback(
+        Output('debug-panel', 'children'),
+        [Input('graphs-container', 'children'),
+         Input({'type': 'metric-graph', 'metric': ALL}, 'children')]
+    )
+    def update_debug_panel(*_):
+        return format_recent_traces()
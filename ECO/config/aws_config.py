@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 import boto3
+from botocore.config import Config
 
 # 加载环境变量
 env = os.getenv("ENV", "uat")  # 环境参数，例如 'uat' 或 'prd'
@@ -10,11 +11,15 @@ region = os.getenv("REGION", "aps1")  # 区域参数，例如 'aps1' 或 'use1'
 env_file = os.path.join(os.path.dirname(__file__), f'../config/.env.{env}.{region}')
 load_dotenv(env_file)
 
+# S3 连接池大小，同步 client 和异步 client 共用；需不小于并发拉取的线程数，否则请求会排队等待连接
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "64"))
+
 # 初始化 S3 客户端
 def get_s3_client():
     return boto3.client(
         's3',
         aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
         aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        region_name=os.getenv("AWS_DEFAULT_REGION")
+        region_name=os.getenv("AWS_DEFAULT_REGION"),
+        config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS)
     )
@@ -0,0 +1,14 @@
+import os
+
+# 本地缓存的根目录，默认为 ECO 目录下的 cache/，与启动时的工作目录无关
+ECO_CACHE_DIR = os.path.abspath(os.getenv("ECO_CACHE_DIR", os.path.join(os.path.dirname(__file__), '..', 'cache')))
+
+
+def cache_dir(env_name, default):
+    """
+    读取缓存目录的环境变量，相对路径按 ECO_CACHE_DIR 解析；目录在第一次写入时才创建
+    :param default: 未设置时使用的子目录
+    :return: 绝对路径，环境变量置空时返回空字符串表示关闭该缓存
+    """
+    value = os.getenv(env_name, default)
+    return os.path.join(ECO_CACHE_DIR, value) if value else ''
@@ -18,7 +18,9 @@ granularity_options = {
             {'label': 'Error Rate', 'value': 'errors_rate'},
             {'label': 'WAN Bandwidth', 'value': 'wan_bandwidth'}
         ],
-        'default': 'average_rx_rate'
+        'default': 'average_rx_rate',
+        # 百分位草图预先计算的排序指标，其他排序指标在 Sketch 模式下读取原始数据
+        'sketch_sort_indicators': ['average_rx_rate']
     },
     'in-ap': {
         'label': 'Between Controller & Agent',
@@ -33,6 +35,7 @@ granularity_options = {
             {'label': 'RSSI', 'value': 'backhaul_sta_rssi'},
             {'label': 'Link Rate', 'value': 'backhaul_sta_link_rate'}
         ],
-        'default': 'backhaul_sta_rssi'
+        'default': 'backhaul_sta_rssi',
+        'sketch_sort_indicators': ['backhaul_sta_rssi']
     }
 }
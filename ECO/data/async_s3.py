@@ -0,0 +1,246 @@
+"""
+S3 异步访问层
+
+分区列表、Range GET 和整对象下载在一个后台事件循环线程上并发执行，Parquet 解码放到线程池里。
+回调仍然是同步代码，通过 AsyncS3 的同步方法调用：一次加载只占用调用线程等待结果，
+S3 往返期间不再各自占用一个工作线程，少量 worker 就能同时服务多个日期范围的加载。
+安装了 aiobotocore 时使用原生异步 client，否则退回到线程池中执行同步 boto3 client。
+"""
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+
+from config.aws_config import S3_MAX_POOL_CONNECTIONS
+from data.parquet_reader import SparseFile, plan_column_ranges, read_parquet
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # aiobotocore 为可选依赖
+    get_session = None
+
+# 解析 footer 和解码 Parquet 的线程数，pyarrow 解码时释放 GIL；默认值与 ThreadPoolExecutor 相同
+S3_DECODE_WORKERS = int(os.getenv("S3_DECODE_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+
+# 第一次 Range GET 读取的对象尾部字节数，通常足以包含 footer
+S3_FOOTER_BYTES = int(os.getenv("S3_FOOTER_BYTES", str(64 * 1024)))
+
+# 间隔小于该值的列块合并为一次 Range GET；不能小于 pyarrow 读取时合并区间的间隔（8 KiB），否则解码时会补取
+S3_RANGE_HOLE_BYTES = int(os.getenv("S3_RANGE_HOLE_BYTES", str(64 * 1024)))
+
+
+def _object_info(content):
+    return {'Key': content['Key'], 'ETag': content.get('ETag'), 'Size': content.get('Size')}
+
+
+def _aiobotocore_client(max_pool_connections):
+    return get_session().create_client(
+        's3',
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name=os.getenv("AWS_DEFAULT_REGION"),
+        config=AioConfig(max_pool_connections=max_pool_connections)
+    )
+
+
+class AsyncS3:
+    """
+    后台事件循环上的 S3 client，连接数由 max_pool_connections 限制
+    :param sync_client: 同步 boto3 client，未安装 aiobotocore 时实际发起请求，
+                        以及在解码线程里补取 footer 之外的少量字节
+    :param native: 是否使用原生异步 client，默认在安装了 aiobotocore 时使用
+    :param aio_client_factory: 原生异步 client 的工厂，参数为 max_pool_connections，返回异步上下文管理器；
+                               默认使用 aiobotocore 的 session
+    """
+
+    def __init__(self, sync_client, max_pool_connections=S3_MAX_POOL_CONNECTIONS, decode_workers=S3_DECODE_WORKERS,
+                 native=None, aio_client_factory=None):
+        self.sync_client = sync_client
+        self.max_pool_connections = max_pool_connections
+        self.decode_workers = decode_workers
+        self.native = get_session is not None if native is None else native
+        self._aio_client_factory = aio_client_factory or _aiobotocore_client
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._exit_stack = None
+        self._semaphore = None
+        self._io_executor = None
+        self._decode_executor = None
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='s3-event-loop', daemon=True).start()
+                asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+                self._loop = loop
+        return self._loop
+
+    async def _open(self):
+        self._semaphore = asyncio.Semaphore(self.max_pool_connections)
+        self._decode_executor = ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix='parquet-decode')
+        if not self.native:
+            logging.info("aiobotocore is not installed, running the sync S3 client in a thread pool.")
+            self._io_executor = ThreadPoolExecutor(max_workers=self.max_pool_connections, thread_name_prefix='s3-io')
+            return
+        self._exit_stack = contextlib.AsyncExitStack()
+        self._client = await self._exit_stack.enter_async_context(
+            self._aio_client_factory(self.max_pool_connections))
+
+    async def _close(self):
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        for executor in (self._io_executor, self._decode_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def close(self):
+        """
+        关闭连接池并停止后台事件循环
+        """
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    def run(self, coro):
+        """
+        在后台事件循环上执行协程并等待结果，供同步代码调用
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    async def _in_thread(self, executor, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    async def list_objects(self, bucket, prefix):
+        """
+        分页列出前缀下的所有对象
+        :return: [{'Key', 'ETag', 'Size'}, ...]
+        """
+        async with self._semaphore:
+            if not self.native:
+                def list_sync():
+                    paginator = self.sync_client.get_paginator('list_objects_v2')
+                    return [_object_info(content)
+                            for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+                            for content in page.get('Contents', [])]
+                return await self._in_thread(self._io_executor, list_sync)
+
+            objects = []
+            async for page in self._client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+                objects.extend(_object_info(content) for content in page.get('Contents', []))
+            return objects
+
+    async def get_bytes(self, bucket, key, start=None, end=None):
+        """
+        读取整个对象，或读取 [start, end) 区间
+        :return: (bytes, ETag)
+        """
+        kwargs = {'Bucket': bucket, 'Key': key}
+        if start is not None:
+            kwargs['Range'] = f"bytes={start}-{end - 1}"
+
+        async with self._semaphore:
+            if not self.native:
+                def get_sync():
+                    response = self.sync_client.get_object(**kwargs)
+                    return response['Body'].read(), response['ETag']
+                return await self._in_thread(self._io_executor, get_sync)
+
+            response = await self._client.get_object(**kwargs)
+            async with response['Body'] as stream:
+                return await stream.read(), response['ETag']
+
+    async def head(self, bucket, key):
+        async with self._semaphore:
+            if not self.native:
+                return await self._in_thread(self._io_executor, lambda: self.sync_client.head_object(Bucket=bucket, Key=key))
+            return await self._client.head_object(Bucket=bucket, Key=key)
+
+    def _fetch_sync(self, bucket, key, start, end):
+        response = self.sync_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end - 1}")
+        return response['Body'].read()
+
+    async def read_parquet_ranges(self, bucket, key, size=None, columns=None, filters=None):
+        """
+        先读取对象尾部解析 footer，再并发 Range GET 所需的列块，最后在解码线程池里解码
+        :return: DataFrame
+        """
+        if size is None:
+            size = (await self.head(bucket, key))['ContentLength']
+
+        tail_start = max(0, size - S3_FOOTER_BYTES)
+        tail, _ = await self.get_bytes(bucket, key, tail_start, size)
+        sparse = SparseFile(size, lambda start, end: self._fetch_sync(bucket, key, start, end))
+        sparse.add(tail_start, tail)
+
+        source = pa.PythonFile(sparse, mode='r')
+        ranges = await self._in_thread(self._decode_executor, plan_column_ranges, source, columns, filters,
+                                       S3_RANGE_HOLE_BYTES)
+        # footer 所在的尾部已经读取，只补取其之前的部分
+        ranges = [(start, min(end, tail_start)) for start, end in ranges if start < tail_start]
+        chunks = await asyncio.gather(*(self.get_bytes(bucket, key, start, end) for start, end in ranges))
+        for (start, _), (data, _) in zip(ranges, chunks):
+            sparse.add(start, data)
+
+        table = await self._in_thread(self._decode_executor, read_parquet, source, columns, filters)
+        logging.debug(f"Fetched {sparse.bytes_fetched} of {size} bytes for {key}.")
+        return await self._in_thread(self._decode_executor, table.to_pandas)
+
+    async def read_parquet_cached(self, bucket, key, cache, etag=None, columns=None, filters=None):
+        """
+        经本地磁盘缓存读取：未命中时下载整个对象写入缓存，再以内存映射方式解码
+        :return: DataFrame
+        """
+        if etag is None:
+            etag = (await self.head(bucket, key))['ETag']
+
+        path = await self._in_thread(self._decode_executor, cache.get, bucket, key, etag)
+        if path is None:
+            data, etag = await self.get_bytes(bucket, key)
+            # 以实际下载到的版本为准，避免列表之后对象被覆盖时写错缓存
+            path = await self._in_thread(self._decode_executor, cache.put, bucket, key, etag, io.BytesIO(data))
+
+        table = await self._in_thread(self._decode_executor, cache.read_table, path, columns, filters)
+        return await self._in_thread(self._decode_executor, table.to_pandas)
+
+    async def _read_logged(self, bucket, obj, cache, columns, filters):
+        key = obj['Key']
+        try:
+            if cache is None:
+                df = await self.read_parquet_ranges(bucket, key, obj.get('Size'), columns, filters)
+            else:
+                df = await self.read_parquet_cached(bucket, key, cache, obj.get('ETag'), columns, filters)
+            logging.info(f"Successfully read file {key}.")
+            return df
+        except Exception as e:
+            logging.error(f"Failed to read file {key}: {e}")
+            return None
+
+    async def _gather(self, coros):
+        return await asyncio.gather(*coros)
+
+    def list_objects_many(self, bucket, prefixes):
+        """
+        同步接口：并发列出多个前缀
+        :return: 与 prefixes 顺序一致的对象列表
+        """
+        return self.run(self._gather([self.list_objects(bucket, prefix) for prefix in prefixes]))
+
+    def read_parquet_many(self, bucket, objects, cache=None, columns=None, filters=None):
+        """
+        同步接口：并发读取多个 Parquet 对象
+        :param objects: [{'Key', 'ETag', 'Size'}, ...]
+        :param cache: ParquetDiskCache，None 表示只拉取需要的列块
+        :return: 与 objects 顺序一致的 DataFrame 列表，读取失败的为 None
+        """
+        return self.run(self._gather([self._read_logged(bucket, obj, cache, columns, filters) for obj in objects]))
@@ -0,0 +1,175 @@
+import logging
+import os
+
+import pandas as pd
+
+from config.cache_config import cache_dir
+from config.granularity_config import granularity_options
+from data import s3_utils
+from data.compact import compact_frame, compact_numeric
+from data.metrics import BANDS
+from data.percentile_index import PercentileIndex
+from data.range_cache import RangeCache
+from data.result_store import ResultStore, make_handle
+from data.rollup import period_start
+from data.single_flight import SingleFlight
+from data.sketch import ALL_BANDS, SKETCH_PREFIX
+from data.ttl_cache import TTLCache
+from instrumentation import record, stage
+
+# 服务端数据集缓存配置，RESULT_STORE_DIR 置空则只使用进程内缓存，相对路径按 ECO_CACHE_DIR 解析
+RESULT_STORE_TTL = float(os.getenv("RESULT_STORE_TTL", "1800"))
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "8"))
+RESULT_STORE_DIR = cache_dir("RESULT_STORE_DIR", "results")
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+result_store = ResultStore(RESULT_STORE_TTL, RESULT_STORE_MAX_ENTRIES, RESULT_STORE_DIR, RESULT_STORE_MAX_BYTES)
+
+# 相同查询的并发加载只执行一次；共享目录存在时，同一主机上的 worker 通过其中的锁文件协调
+_single_flight = SingleFlight(os.path.join(RESULT_STORE_DIR, 'locks') if RESULT_STORE_DIR else None)
+
+# 按路径缓存已加载的分区，调整日期范围时只读取缺少的分区
+RANGE_CACHE_MAX_ENTRIES = int(os.getenv("RANGE_CACHE_MAX_ENTRIES", "4"))
+_range_cache = RangeCache(RESULT_STORE_TTL, RANGE_CACHE_MAX_ENTRIES)
+
+# 百分位前缀和索引只保存在进程内，与数据集使用相同的有效期
+_percentile_indexes = TTLCache(ttl=RESULT_STORE_TTL, maxsize=RESULT_STORE_MAX_ENTRIES)
+
+
+def build_query(start_date, end_date, time_granularity, metric_granularity, connection_type, mode='exact'):
+    """
+    把控件取值规范化为数据集查询参数，参数非法时返回 None
+    :param mode: 'exact' 读取原始数据，'sketch' 读取预聚合的百分位草图
+    """
+    # 映射 2.4GHz、5GHz、6GHz 为 "wireless"
+    if connection_type in BANDS:
+        mapped_connection_type = 'wireless'
+    else:
+        mapped_connection_type = connection_type
+
+    # 根据 metric_granularity 获取配置
+    selected_option = granularity_options.get(metric_granularity, None)
+    if not selected_option:
+        logging.error(f"Invalid metric_granularity: {metric_granularity}")
+        return None
+
+    # 根据 mapped_connection_type 获取路径
+    path = selected_option['path'].get(mapped_connection_type, None)
+    if not path:
+        logging.error(f"Invalid path for connection_type: {connection_type} (mapped as {mapped_connection_type})")
+        return None
+
+    return {
+        'start_date': str(start_date),
+        'end_date': str(end_date),
+        'time_granularity': time_granularity,
+        'metric_granularity': metric_granularity,
+        'connection_type_path': path,
+        'band': connection_type if mapped_connection_type == 'wireless' else None,
+        'mode': mode
+    }
+
+
+def is_sketch(data):
+    """
+    数据集是否为百分位草图
+    """
+    return 'sums' in data.columns
+
+
+def sketch_has_sort_indicator(sketch, sort_indicator):
+    """
+    草图是否预先计算了该排序指标，见 granularity_options 的 sketch_sort_indicators
+    """
+    return bool((sketch['sort_indicator'] == sort_indicator).any())
+
+
+def load_sketch(query, start_datetime, end_datetime):
+    """
+    读取预聚合的百分位草图，只包含所选频段（或全部频段汇总）的行
+    """
+    filters = [('band', '=', query['band'] or ALL_BANDS)]
+    return s3_utils.get_s3_data(start_datetime, end_datetime, query['time_granularity'],
+                                f"{SKETCH_PREFIX}{query['connection_type_path']}", filters=filters, rollup=False)
+
+
+def load_dataset(query):
+    """
+    按查询参数从 S3 读取数据
+    """
+    # 解析起止日期，确保 start_datetime 和 end_datetime 包括完整的时间范围
+    start_datetime = pd.to_datetime(query['start_date']).replace(hour=0, minute=0, second=0)  # 设置为当天 00:00:00
+    end_datetime = pd.to_datetime(query['end_date']).replace(hour=23, minute=59, second=59)  # 设置为当天 23:59:59
+    # 周、月、季度、年尺度的数据以周期起点为时间，起始时间对齐到所在周期的起点
+    start_datetime = period_start(start_datetime, query['time_granularity'])
+
+    if query.get('mode') == 'sketch':
+        sketch = load_sketch(query, start_datetime, end_datetime)
+        if not sketch.empty:
+            logging.info(f"Loaded {len(sketch)} sketch rows.")
+            return sketch
+        logging.warning("No sketch found for the selected range, falling back to raw rows.")
+
+    # 只读取绘图需要的列，并把频段过滤下推到 Parquet 读取；
+    # 时间范围在合并后再过滤，这样缓存的分区与查询的起止时间无关
+    metric_cols = [opt['value'] for opt in granularity_options[query['metric_granularity']]['options']]
+    columns = ['collection_time', 'collection_time_agg', 'band'] + metric_cols
+    filters = s3_utils.build_row_filters(band=query['band'])
+
+    def load_partitions(date_strs):
+        frames = s3_utils.get_s3_partitions(date_strs, query['time_granularity'], query['connection_type_path'],
+                                            columns=columns, filters=filters)
+        # 缓存的分区先压缩数值列，字符串列在拼接后统一转为 categorical
+        return {date_str: compact_numeric(df) for date_str, df in frames.items()}
+
+    # 从 S3 获取数据，使用动态路径，已缓存的分区不再重复读取
+    date_strs = s3_utils.partition_date_strs(start_datetime, end_datetime, query['time_granularity'])
+    range_key = (query['connection_type_path'], query['time_granularity'], query['metric_granularity'], query['band'])
+    data = _range_cache.load(range_key, date_strs, load_partitions)
+    if data.empty:
+        logging.warning(f"No data found between {start_datetime} and {end_datetime}.")
+        return data
+
+    # 过滤数据，确保过滤日期和时间；collection_time 保持 10 位时间戳（Unix 时间），不转换为 datetime
+    start_ts = int(start_datetime.timestamp())
+    end_ts = int(end_datetime.timestamp())
+    with stage('filter'):
+        filtered_data = data[(data['collection_time'] >= start_ts) & (data['collection_time'] <= end_ts)]
+    logging.info(f"Filtered data has {len(filtered_data)} rows.")
+    with stage('compact'):
+        filtered_data, saved = compact_frame(filtered_data.reset_index(drop=True))
+    record(bytes_saved=saved, dataset_bytes=int(filtered_data.memory_usage(deep=True).sum()))
+    return filtered_data
+
+
+def get_dataset(query):
+    """
+    返回查询对应的数据集，优先使用服务端缓存，并发的相同查询共享同一次加载
+    :return: (handle, DataFrame)
+    """
+    handle = make_handle(query)
+    with stage('result_store_get'):
+        data = result_store.get(handle)
+    record(result_store_hit=data is not None)
+    if data is None:
+        def load():
+            loaded = load_dataset(query)
+            with stage('result_store_put'):
+                result_store.put(handle, loaded)
+            return loaded
+
+        with stage('load'):
+            data = _single_flight.do(handle, load, check=lambda: result_store.get(handle))
+    return handle, data
+
+
+def get_percentile_index(handle, data, metric_granularity):
+    """
+    返回数据集的百分位前缀和索引，同一个句柄只创建一次
+    """
+    index = _percentile_indexes.get(handle)
+    if index is None or index.data is not data:
+        metric_cols = [opt['value'] for opt in granularity_options[metric_granularity]['options']]
+        index = PercentileIndex(data, 'collection_time_agg', metric_cols)
+        _percentile_indexes.set(handle, index)
+    return index
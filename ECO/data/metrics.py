@@ -0,0 +1,42 @@
+"""
+指标维度的分区路径、频段和指标的取值范围
+
+由 config.granularity_config 推导，供数据加载、离线任务（汇总、草图）、模拟数据和基准测试共用
+"""
+from config.granularity_config import granularity_options
+
+BANDS = ['2.4GHz', '5GHz', '6GHz']
+
+# 分区中标识网络和维度的列，汇总时作为分组键，不参与求均值
+KEY_COLUMNS = ['controller_id', 'band']
+
+# 各指标的 (均值, 网络间标准差, 小时间标准差, 下限, 上限)，模拟数据按此生成
+METRIC_SHAPES = {
+    'average_rx_rate': (400, 150, 60, 0, None),
+    'average_tx_rate': (300, 120, 50, 0, None),
+    'congestion_score': (40, 15, 10, 0, 100),
+    'wifi_coverage_score': (70, 15, 8, 0, 100),
+    'noise': (-85, 6, 3, -110, 0),
+    'errors_rate': (0.02, 0.02, 0.01, 0, 1),
+    'wan_bandwidth': (500, 250, 40, 0, None),
+    'backhaul_sta_rssi': (-60, 10, 4, -100, 0),
+    'backhaul_sta_link_rate': (600, 250, 80, 0, None),
+}
+
+
+def path_options():
+    """
+    :return: {路径: 指标维度的配置}，多个连接类型共用同一路径时取第一个指标维度
+    """
+    paths = {}
+    for option in granularity_options.values():
+        for path in option['path'].values():
+            paths.setdefault(path, option)
+    return paths
+
+
+def metric_paths():
+    """
+    :return: {路径: 指标列}
+    """
+    return {path: [opt['value'] for opt in option['options']] for path, option in path_options().items()}
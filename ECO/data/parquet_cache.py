@@ -0,0 +1,154 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+
+import pyarrow as pa
+
+from data.parquet_reader import read_parquet
+
+
+def evict_lru_files(cache_dir, max_bytes, suffix):
+    """
+    目录下 suffix 结尾的文件总大小超过 max_bytes 时，按 mtime 从旧到新删除
+    持有目录级 flock，多个进程同时淘汰时不会重复计算
+    :return: (删除的文件数, 剩余字节数)
+    """
+    if not os.path.isdir(cache_dir):  # 还没有写入过
+        return 0, 0
+    with open(os.path.join(cache_dir, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            entries = []
+            total = 0
+            for root, _, files in os.walk(cache_dir):
+                for name in files:
+                    if not name.endswith(suffix):
+                        continue
+                    file_path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(file_path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, file_path))
+                    total += stat.st_size
+
+            entries.sort()
+            removed = 0
+            for _, size, file_path in entries:
+                if total <= max_bytes:
+                    break
+                try:
+                    # 已被其他进程 mmap 的文件在 unlink 后依然可读
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    continue
+                total -= size
+                removed += 1
+            return removed, total
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class ParquetDiskCache:
+    """
+    S3 Parquet 文件的本地磁盘缓存
+
+    - 以 (bucket, key, ETag) 的哈希作为文件名，对象内容变化后 ETag 不同，自然落到新的缓存文件
+    - 命中时刷新文件 mtime，超过 max_bytes 时按 mtime 从旧到新淘汰（近似 LRU）
+    - 写入先落到临时文件再 os.replace，淘汰时持有目录级 flock，多个 gunicorn worker 共享同一目录是安全的
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._stats_lock = threading.Lock()
+        self._bytes_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_downloaded = 0
+
+    def _path(self, bucket, key, etag):
+        digest = hashlib.sha256(f"{bucket}\0{key}\0{etag}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.parquet")
+
+    def _count(self, hit, nbytes):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+                self.bytes_read += nbytes
+            else:
+                self.misses += 1
+                self.bytes_downloaded += nbytes
+                self._bytes_since_evict += nbytes
+
+    def get(self, bucket, key, etag):
+        """
+        返回缓存文件路径，未命中时返回 None
+        """
+        path = self._path(bucket, key, etag)
+        try:
+            os.utime(path)  # 刷新 mtime，作为 LRU 的访问时间
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return None
+        self._count(True, size)
+        return path
+
+    def put(self, bucket, key, etag, body):
+        """
+        将可读的文件对象 body 写入缓存，返回缓存文件路径
+        """
+        path = self._path(bucket, key, etag)
+        os.makedirs(os.path.dirname(path), exist_ok=True)  # 缓存目录在第一次写入时才创建
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(body, f, length=1024 * 1024)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)  # 原子替换，其他进程要么看不到，要么看到完整文件
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._count(False, size)
+
+        if self._bytes_since_evict > self.max_bytes // 10:
+            self.evict()
+        return path
+
+    def read_table(self, path, columns=None, filters=None):
+        """
+        以内存映射方式读取缓存文件，支持列裁剪和谓词下推
+        """
+        with pa.memory_map(path) as source:
+            return read_parquet(source, columns=columns, filters=filters)
+
+    def evict(self):
+        """
+        总大小超过 max_bytes 时，淘汰最久未访问的文件
+        """
+        with self._stats_lock:
+            self._bytes_since_evict = 0
+        removed, remaining = evict_lru_files(self.cache_dir, self.max_bytes, '.parquet')
+        if removed:
+            logging.info(f"Parquet cache evicted {removed} files, {remaining} bytes remain.")
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes_read': self.bytes_read,
+                'bytes_downloaded': self.bytes_downloaded,
+            }
+
+    def log_stats(self):
+        stats = self.stats()
+        logging.info(
+            f"Parquet cache: hits={stats['hits']} misses={stats['misses']} "
+            f"bytes_read={stats['bytes_read']} bytes_downloaded={stats['bytes_downloaded']}"
+        )
@@ -0,0 +1,184 @@
+import io
+
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+class S3RangeFile(io.RawIOBase):
+    """
+    只读的 S3 对象文件句柄，每次 read 转换为一次 Range GET
+    交给 pyarrow 时只会读取 footer 和被选中的列块，而不是整个对象
+    """
+
+    def __init__(self, client, bucket, key, size):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.pos = 0
+        self.bytes_fetched = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        elif whence == io.SEEK_END:
+            self.pos = self.size + offset
+        return self.pos
+
+    def readinto(self, buffer):
+        end = min(self.pos + len(buffer), self.size)
+        if end <= self.pos:
+            return 0
+        response = self.client.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={self.pos}-{end - 1}")
+        data = response['Body'].read()
+        buffer[:len(data)] = data
+        self.pos += len(data)
+        self.bytes_fetched += len(data)
+        return len(data)
+
+
+def read_parquet(source, columns=None, filters=None):
+    """
+    通过 pyarrow dataset 扫描单个 Parquet 文件，支持列裁剪和谓词下推
+    :param source: 本地路径、内存映射或文件对象
+    :param columns: 需要读取的列，文件中不存在的列会被忽略
+    :param filters: [(column, op, value), ...]，按行组统计信息跳过不满足条件的行组
+    :return: pyarrow.Table
+    """
+    fragment = ds.ParquetFileFormat().make_fragment(source)
+    return _scan(fragment, fragment.physical_schema.names, columns, filters)
+
+
+def project_table(table, columns=None, filters=None):
+    """
+    对内存中的 pyarrow.Table 做与 read_parquet 相同的列裁剪和行过滤
+    """
+    return _scan(ds.dataset(table), table.schema.names, columns, filters)
+
+
+def _projection(names, columns=None, filters=None):
+    """
+    去掉文件中不存在的列和过滤条件
+    :return: (columns, pyarrow 过滤表达式或 None)
+    """
+    names = set(names)
+
+    if columns is not None:
+        columns = [col for col in columns if col in names]
+
+    expression = None
+    if filters:
+        filters = [f for f in filters if f[0] in names]
+        if filters:
+            expression = pq.filters_to_expression(filters)
+
+    return columns, expression
+
+
+def _scan(source, names, columns=None, filters=None):
+    columns, expression = _projection(names, columns, filters)
+    return source.to_table(columns=columns, filter=expression)
+
+
+class SparseFile(io.RawIOBase):
+    """
+    只包含部分字节区间的只读文件，区间由调用方预先并发拉取
+    读取到未拉取的区间时调用 fetch(start, end) 补取（end 不含）
+    """
+
+    def __init__(self, size, fetch):
+        self.size = size
+        self.fetch = fetch
+        self.ranges = []
+        self.pos = 0
+        self.bytes_fetched = 0
+
+    def add(self, start, data):
+        self.ranges.append((start, data))
+        self.bytes_fetched += len(data)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        elif whence == io.SEEK_END:
+            self.pos = self.size + offset
+        return self.pos
+
+    def readinto(self, buffer):
+        end = min(self.pos + len(buffer), self.size)
+        if end <= self.pos:
+            return 0
+        n = 0
+        while self.pos < end:
+            # 一次读取可能跨越相邻的多个区间
+            piece = next(((start, data) for start, data in self.ranges if start <= self.pos < start + len(data)), None)
+            if piece is None:
+                data = self.fetch(self.pos, end)
+                if not data:
+                    break
+                self.add(self.pos, data)
+                piece = (self.pos, data)
+            start, data = piece
+            stop = min(end, start + len(data))
+            buffer[n:n + stop - self.pos] = data[self.pos - start:stop - start]
+            n += stop - self.pos
+            self.pos = stop
+        return n
+
+
+def plan_column_ranges(source, columns=None, filters=None, hole_bytes=64 * 1024):
+    """
+    只根据 footer 计算读取所需的列块字节区间
+    按行组统计信息去掉不满足 filters 的行组，间隔小于 hole_bytes 的区间合并为一次读取
+    :param source: 至少包含 footer 的文件对象
+    :return: [(start, end), ...]，end 不含
+    """
+    fragment = ds.ParquetFileFormat().make_fragment(source)
+    names = fragment.physical_schema.names
+    columns, expression = _projection(names, columns, filters)
+    wanted = set(names) if columns is None else set(columns) | {f[0] for f in filters or [] if f[0] in names}
+    if expression is not None:
+        fragment = fragment.subset(expression)
+
+    metadata = fragment.metadata
+    ranges = []
+    for row_group in fragment.row_groups:
+        row_group = metadata.row_group(row_group.id)
+        for i in range(row_group.num_columns):
+            chunk = row_group.column(i)
+            if chunk.path_in_schema.split('.')[0] not in wanted:
+                continue
+            start = chunk.data_page_offset
+            if chunk.has_dictionary_page and chunk.dictionary_page_offset:
+                start = min(start, chunk.dictionary_page_offset)
+            ranges.append((start, start + chunk.total_compressed_size))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start - merged[-1][1] <= hole_bytes:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
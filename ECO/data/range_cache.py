@@ -0,0 +1,54 @@
+import logging
+import time
+
+import pandas as pd
+
+from data.ttl_cache import TTLCache
+from instrumentation import record, stage
+
+
+class RangeCache:
+    """
+    按路径缓存最近一次加载的分区 DataFrame，并记录覆盖了哪些分区
+    日期范围变化（扩大、缩小或平移）时只加载缺少的分区，再把缓存修剪到新的范围
+    单个分区加载超过 ttl 秒后重新加载，保证当天仍在写入的分区能够刷新
+    """
+
+    def __init__(self, ttl, maxsize=8):
+        self.ttl = ttl
+        self._entries = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    def covered(self, key):
+        """
+        :return: 该路径当前缓存的分区
+        """
+        return sorted(self._entries.get(key, {}))
+
+    def load(self, key, date_strs, loader):
+        """
+        :param key: 路径级别的键，不包含日期范围
+        :param date_strs: 新范围覆盖的分区，按时间顺序
+        :param loader: loader(missing_date_strs) -> {date_str: DataFrame}，读取失败的分区可以不返回，下次重新加载
+        :return: 按 date_strs 顺序拼接的 DataFrame
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key, {})
+        partitions = {date_str: entry[date_str] for date_str in date_strs
+                      if date_str in entry and now - entry[date_str][0] < self.ttl}
+
+        missing = [date_str for date_str in date_strs if date_str not in partitions]
+        logging.info(f"Range cache for {key}: reusing {len(partitions)} partitions, loading {len(missing)}.")
+        record(partitions_reused=len(partitions), partitions_loaded=len(missing))
+        if missing:
+            for date_str, df in loader(missing).items():
+                partitions[date_str] = (now, df)
+
+        # 只保留新范围内的分区
+        self._entries.set(key, partitions)
+
+        frames = [partitions[date_str][1] for date_str in date_strs
+                  if date_str in partitions and not partitions[date_str][1].empty]
+        if not frames:
+            return pd.DataFrame()
+        with stage('concat'):
+            return pd.concat(frames, ignore_index=True)
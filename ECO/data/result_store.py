@@ -0,0 +1,74 @@
+import hashlib
+import json
+import logging
+import os
+import uuid
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from data.parquet_cache import evict_lru_files
+from data.ttl_cache import TTLCache
+
+
+def make_handle(query):
+    """
+    根据查询参数生成稳定的数据集句柄
+    """
+    payload = json.dumps(query, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ResultStore:
+    """
+    服务端数据集缓存，dcc.Store 中只保存句柄，DataFrame 留在服务端
+
+    - 进程内：TTLCache 保存 DataFrame 对象，命中时零拷贝
+    - 进程间：可选的共享目录，以 Arrow IPC (Feather) 文件保存，其他 gunicorn worker 通过内存映射读取
+    """
+
+    def __init__(self, ttl, maxsize, shared_dir=None, shared_max_bytes=0):
+        self._memory = TTLCache(ttl=ttl, maxsize=maxsize)
+        self.shared_dir = shared_dir
+        self.shared_max_bytes = shared_max_bytes
+
+    def _shared_path(self, handle):
+        return os.path.join(self.shared_dir, f"{handle}.arrow")
+
+    def put(self, handle, df):
+        self._memory.set(handle, df)
+        if not self.shared_dir:
+            return
+
+        os.makedirs(self.shared_dir, exist_ok=True)  # 第一次写入时才创建共享目录
+        path = self._shared_path(handle)
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        removed, _ = evict_lru_files(self.shared_dir, self.shared_max_bytes, '.arrow')
+        if removed:
+            logging.info(f"Result store evicted {removed} shared datasets.")
+
+    def get(self, handle):
+        """
+        返回句柄对应的 DataFrame，不存在时返回 None
+        """
+        df = self._memory.get(handle)
+        if df is not None or not self.shared_dir:
+            return df
+
+        path = self._shared_path(handle)
+        try:
+            os.utime(path)
+            with pa.memory_map(path) as source:
+                df = feather.read_table(source).to_pandas()
+        except FileNotFoundError:
+            return None
+        logging.info(f"Loaded dataset {handle} from shared result store.")
+        self._memory.set(handle, df)
+        return df
@@ -0,0 +1,61 @@
+"""
+粗粒度（周、月、季度、年）汇总
+
+汇总分区与 daily/ 分区结构相同，每个网络在每个周期内只保留一行，指标取该周期内每日值的均值，
+collection_time 为周期起点的时间戳，collection_time_agg 为周期起点日期，例如 '2024-07-01'
+"""
+import pandas as pd
+
+# 聚合尺度对应的 pandas 周期，周从周一开始
+ROLLUP_FREQS = {
+    '1w': 'W-SUN',
+    '1m': 'M',
+    '1q': 'Q',
+    '1y': 'Y',
+}
+
+
+def is_rollup(granularity):
+    return granularity in ROLLUP_FREQS
+
+
+def period_start(current_datetime, granularity):
+    """
+    返回所在周期的起点，非汇总尺度按天对齐
+    """
+    timestamp = pd.Timestamp(current_datetime)
+    if not is_rollup(granularity):
+        return timestamp.normalize()
+    return timestamp.to_period(ROLLUP_FREQS[granularity]).start_time
+
+
+def rollup_frame(data, granularity, key_cols):
+    """
+    把日粒度数据汇总到周期粒度
+    :param data: daily/ 分区的数据，collection_time 为 10 位时间戳
+    :param key_cols: 网络 ID、band 等分组键（见 data.metrics.KEY_COLUMNS），数据中没有的列忽略；
+        数值型的 ID 也只作为分组键，其余数值列在周期内取均值，其余非数值列丢弃
+    :return: 与 daily/ 分区列相同的 DataFrame（不含被丢弃的列）
+    """
+    if data.empty:
+        return data
+
+    if 'collection_time' in data:
+        times = pd.to_datetime(data['collection_time'], unit='s')
+    else:
+        times = pd.to_datetime(data['collection_time_agg'])
+    periods = times.dt.to_period(ROLLUP_FREQS[granularity]).dt.start_time.rename('collection_time')
+
+    exclude = {'collection_time', 'collection_time_agg'}
+    key_cols = [col for col in key_cols if col in data.columns and col not in exclude]
+    metric_cols = [col for col in data.columns
+                   if col not in exclude and col not in key_cols and pd.api.types.is_numeric_dtype(data[col])]
+
+    rolled = (data[key_cols + metric_cols]
+              .groupby([periods] + [data[col] for col in key_cols], dropna=False, sort=True)[metric_cols]
+              .mean()
+              .reset_index())
+    rolled['collection_time_agg'] = rolled['collection_time'].dt.strftime('%Y-%m-%d')
+    # 与 pandas 版本无关地换算为秒级时间戳（pandas 1.x 中 astype('datetime64[s]') 仍是纳秒）
+    rolled['collection_time'] = (rolled['collection_time'] - pd.Timestamp(0)) // pd.Timedelta('1s')
+    return rolled[[col for col in data.columns if col in rolled.columns]]
@@ -4,109 +4,440 @@ import pandas as pd
 import io
 from datetime import timedelta
 import os
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
 from config.aws_config import get_s3_client
+from config.cache_config import cache_dir
+from data.async_s3 import AsyncS3
+from data.metrics import KEY_COLUMNS
+from data.parquet_cache import ParquetDiskCache
+from data.parquet_reader import S3RangeFile, project_table, read_parquet
+from data.rollup import is_rollup, period_start, rollup_frame
+from data.ttl_cache import TTLCache
+from instrumentation import record, stage
 
 s3_client = get_s3_client()
 
-def list_s3_files_by_date(bucket, prefix, date_str):
+# 分区列表和 Parquet 读取走 data.async_s3 的后台事件循环，S3_ASYNC=0 时使用线程池
+S3_ASYNC = os.getenv("S3_ASYNC", "1") == "1"
+async_s3 = AsyncS3(s3_client) if S3_ASYNC else None
+
+# 并发拉取 S3 分区时的线程数，boto3 client 本身是线程安全的
+S3_MAX_WORKERS = int(os.getenv("S3_MAX_WORKERS", "16"))
+
+# 分区列表缓存的有效期（秒），切换仪表盘控件时不必重复列出未变化的分区
+S3_LIST_CACHE_TTL = float(os.getenv("S3_LIST_CACHE_TTL", "60"))
+_listing_cache = TTLCache(ttl=S3_LIST_CACHE_TTL)
+
+# 本地 Parquet 磁盘缓存，PARQUET_CACHE_DIR 置空则关闭，相对路径按 ECO_CACHE_DIR 解析
+PARQUET_CACHE_DIR = cache_dir("PARQUET_CACHE_DIR", "parquet")
+PARQUET_CACHE_MAX_BYTES = int(os.getenv("PARQUET_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+parquet_cache = ParquetDiskCache(PARQUET_CACHE_DIR, PARQUET_CACHE_MAX_BYTES) if PARQUET_CACHE_DIR else None
+
+# 缺少预先生成的汇总分区时，由日分区现场汇总，结果在进程内缓存 ROLLUP_CACHE_TTL 秒；
+# ROLLUP_WRITE_BACK=1 时把已结束周期的汇总结果写回 S3，之后直接读取
+ROLLUP_CACHE_TTL = float(os.getenv("ROLLUP_CACHE_TTL", "600"))
+ROLLUP_WRITE_BACK = os.getenv("ROLLUP_WRITE_BACK", "0") == "1"
+_rollup_cache = TTLCache(ttl=ROLLUP_CACHE_TTL, maxsize=256)
+
+# 各聚合尺度的分区目录和 dt= 格式，季度分区以季度首月命名，例如 dt=2024-07
+PARTITION_LAYOUT = {
+    '1h': ('hourly/', '%Y-%m-%d'),
+    '1d': ('daily/', '%Y-%m-%d'),
+    '1w': ('weekly/', '%Y-%m-%d'),
+    '1m': ('monthly/', '%Y-%m'),
+    '1q': ('quarterly/', '%Y-%m'),
+    '1y': ('yearly/', '%Y'),
+}
+
+def iter_s3_objects(bucket, prefix):
     """
-    列出S3中指定日期的所有文件
+    分页遍历 S3 前缀下的所有对象，跟随 ContinuationToken 直到列完
+    :return: 生成器，逐个产出 list_objects_v2 返回的 Contents 条目
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for content in page.get('Contents', []):
+            yield content
+
+def iter_s3_keys(bucket, prefix):
+    """
+    分页遍历 S3 前缀下的所有文件 key
+    """
+    for content in iter_s3_objects(bucket, prefix):
+        yield content['Key']
+
+def iter_s3_keys_by_dates(bucket, prefix, date_strs):
+    """
+    一次遍历多个日期分区下的文件
+    :return: 生成器，按 date_strs 的顺序产出 (date_str, file_key)
+    """
+    for date_str in date_strs:
+        for file_key in iter_s3_keys(bucket, f"{prefix}/dt={date_str}/"):
+            yield date_str, file_key
+
+def list_s3_objects_by_date(bucket, prefix, date_str):
+    """
+    列出S3中指定日期的所有对象（Key、ETag、Size），结果在短时间内缓存
     """
     date_prefix = f"{prefix}/dt={date_str}/"
-    response = s3_client.list_objects_v2(Bucket=bucket, Prefix=date_prefix)
+    cache_key = (bucket, date_prefix)
+    objects = _listing_cache.get(cache_key)
+    if objects is not None:
+        logging.debug(f"Listing cache hit for {date_prefix}.")
+        return objects
 
-    if 'Contents' in response:
-        files = [content['Key'] for content in response['Contents']]
-        logging.info(f"Found {len(files)} files for date {date_str} in S3.")
-        return files
+    objects = [
+        {'Key': content['Key'], 'ETag': content.get('ETag'), 'Size': content.get('Size')}
+        for content in iter_s3_objects(bucket, date_prefix)
+    ]
+    if objects:
+        logging.info(f"Found {len(objects)} files for date {date_str} in S3.")
     else:
         logging.warning(f"No files found for date {date_str} in S3.")
-        return []
+    _listing_cache.set(cache_key, objects)
+    return objects
 
-def read_s3_parquet(bucket, file_key):
+def list_s3_files_by_date(bucket, prefix, date_str):
+    """
+    列出S3中指定日期的所有文件
+    """
+    return [obj['Key'] for obj in list_s3_objects_by_date(bucket, prefix, date_str)]
+
+def read_s3_parquet(bucket, file_key, etag=None, columns=None, filters=None, size=None):
     """
     从 S3 读取 Parquet 文件并返回 DataFrame
+    启用磁盘缓存时，按 (bucket, key, ETag) 命中本地文件并以内存映射方式读取；
+    未启用时通过 Range GET 只拉取 footer 和需要的列块
+    :param columns: 只读取这些列
+    :param filters: 行过滤条件 [(column, op, value), ...]，下推到 pyarrow 按行组跳过
+    :param size: 对象大小，来自分区列表，未提供时会额外发起一次 HEAD
     """
-    response = s3_client.get_object(Bucket=bucket, Key=file_key)
-    return pd.read_parquet(io.BytesIO(response['Body'].read()))
-def get_s3_data(start_datetime, end_datetime, granularity, third_level_prefix):
+    if parquet_cache is None:
+        if size is None:
+            size = s3_client.head_object(Bucket=bucket, Key=file_key)['ContentLength']
+        source = pa.PythonFile(S3RangeFile(s3_client, bucket, file_key, size), mode='r')
+        return read_parquet(source, columns=columns, filters=filters).to_pandas()
+
+    if etag is None:
+        etag = s3_client.head_object(Bucket=bucket, Key=file_key)['ETag']
+
+    path = parquet_cache.get(bucket, file_key, etag)
+    if path is None:
+        response = s3_client.get_object(Bucket=bucket, Key=file_key)
+        # 以实际下载到的版本为准，避免列表之后对象被覆盖时写错缓存
+        path = parquet_cache.put(bucket, file_key, response['ETag'], response['Body'])
+    return parquet_cache.read_table(path, columns=columns, filters=filters).to_pandas()
+
+def build_row_filters(start_datetime=None, end_datetime=None, band=None):
     """
-    根据时间范围和聚合尺度从 S3 读取多个文件并合并为一个完整的 DataFrame
-    :param start_datetime: 起始时间 (datetime)
-    :param end_datetime: 结束时间 (datetime)
-    :param granularity: 时间聚合单位 ('1h', '1d', '1w', '1m', '1q', '1y')
-    :param third_level_prefix: S3 前缀的第二级，作为传入参数
-    :return: 合并的 DataFrame
+    构造下推到 Parquet 的行过滤条件
+    :param start_datetime: collection_time 下界（含）
+    :param end_datetime: collection_time 上界（含）
+    :param band: 只保留该频段的数据，例如 '2.4GHz'
     """
-    logging.info(f"Starting data retrieval from {start_datetime} to {end_datetime} with granularity {granularity}.")
+    filters = []
+    if start_datetime is not None:
+        filters.append(('collection_time', '>=', int(pd.Timestamp(start_datetime).timestamp())))
+    if end_datetime is not None:
+        filters.append(('collection_time', '<=', int(pd.Timestamp(end_datetime).timestamp())))
+    if band is not None:
+        filters.append(('band', '=', band))
+    return filters
 
-    # 从环境变量中读取 bucket 和第一级 prefix
-    bucket = os.getenv("S3_BUCKET")  # 从 .env 文件或环境变量中获取 S3 bucket
+def list_s3_objects_by_dates(bucket, prefix, date_strs, max_workers=None):
+    """
+    并发列出多个日期分区下的对象
+    :return: {date_str: [{'Key', 'ETag', 'Size'}, ...]}，顺序与 date_strs 一致
+    """
+    if async_s3 is not None:
+        return _list_s3_objects_by_dates_async(bucket, prefix, date_strs)
+
+    max_workers = max_workers or S3_MAX_WORKERS
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda date_str: list_s3_objects_by_date(bucket, prefix, date_str), date_strs)
+        return dict(zip(date_strs, results))
+
+def _list_s3_objects_by_dates_async(bucket, prefix, date_strs):
+    """
+    与 list_s3_objects_by_date 相同的缓存逻辑，未命中的日期一次性交给异步层并发列出
+    """
+    objects_by_date = {date_str: _listing_cache.get((bucket, f"{prefix}/dt={date_str}/")) for date_str in date_strs}
+    missing = [date_str for date_str, objects in objects_by_date.items() if objects is None]
+    if missing:
+        results = async_s3.list_objects_many(bucket, [f"{prefix}/dt={date_str}/" for date_str in missing])
+        for date_str, objects in zip(missing, results):
+            if objects:
+                logging.info(f"Found {len(objects)} files for date {date_str} in S3.")
+            else:
+                logging.warning(f"No files found for date {date_str} in S3.")
+            _listing_cache.set((bucket, f"{prefix}/dt={date_str}/"), objects)
+            objects_by_date[date_str] = objects
+    return objects_by_date
+
+def list_s3_files_by_dates(bucket, prefix, date_strs, max_workers=None):
+    """
+    并发列出多个日期分区下的文件
+    :return: {date_str: [file_key, ...]}，顺序与 date_strs 一致
+    """
+    objects_by_date = list_s3_objects_by_dates(bucket, prefix, date_strs, max_workers)
+    return {date_str: [obj['Key'] for obj in objects] for date_str, objects in objects_by_date.items()}
+
+def _read_s3_parquet_logged(bucket, file_key, obj=None, columns=None, filters=None):
+    """
+    读取单个文件，失败时记录日志并返回 None，避免单个文件拖垮整个批次
+    """
+    obj = obj or {}
+    try:
+        df = read_s3_parquet(bucket, file_key, obj.get('ETag'), columns, filters, obj.get('Size'))
+        logging.info(f"Successfully read file {file_key}.")
+        return df
+    except Exception as e:
+        logging.error(f"Failed to read file {file_key}: {e}")
+        return None
+
+def fetch_s3_parquet_frames(bucket, file_keys, max_workers=None, objects=None, columns=None, filters=None):
+    """
+    并发下载并解析 Parquet 文件，启用 S3_ASYNC 时由异步层完成，否则使用线程池
+    :param objects: 可选的 {file_key: {'ETag', 'Size'}}，来自分区列表，省去额外的 HEAD 请求
+    :param columns: 只读取这些列
+    :param filters: 下推到 Parquet 的行过滤条件
+    :return: {file_key: DataFrame}，顺序与 file_keys 一致，读取失败的文件值为 None，标志性文件不包含在内
+    """
+    data_keys = []
+    for file_key in file_keys:
+        # 跳过不需要处理的标志性文件，例如 _SUCCESS
+        if file_key.endswith('_SUCCESS') or file_key.endswith('.crc'):
+            logging.debug(f"Skipping non-data file {file_key}.")
+            continue
+        data_keys.append(file_key)
+
+    if not data_keys:
+        return {}
+
+    objects = objects or {}
+    if async_s3 is not None:
+        # 并发度由连接池大小决定，max_workers 不起作用
+        pending = [{'Key': file_key, **objects.get(file_key, {})} for file_key in data_keys]
+        results = async_s3.read_parquet_many(bucket, pending, parquet_cache, columns, filters)
+        return dict(zip(data_keys, results))
+
+    max_workers = max_workers or S3_MAX_WORKERS
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(data_keys))) as executor:
+        results = executor.map(
+            lambda file_key: _read_s3_parquet_logged(bucket, file_key, objects.get(file_key), columns, filters),
+            data_keys
+        )
+        return dict(zip(data_keys, results))
+
+def fetch_s3_parquet_files(bucket, file_keys, max_workers=None, objects=None, columns=None, filters=None):
+    """
+    并发下载并解析 Parquet 文件
+    :return: DataFrame 列表，顺序与 file_keys 一致，读取失败的文件被跳过
+    """
+    frames = fetch_s3_parquet_frames(bucket, file_keys, max_workers, objects, columns, filters)
+    return [df for df in frames.values() if df is not None]
+
+def get_partition_prefix(granularity, third_level_prefix):
+    """
+    根据聚合尺度确定分区前缀和 dt= 的日期格式
+    :return: (prefix, format_str)
+    """
     first_level_prefix = os.getenv("S3_FIRST_LEVEL_PREFIX")  # 获取第一级 prefix
 
     # 确定时间格式和前缀格式
-    if granularity == '1m':
-        format_str = '%Y-%m'
-    elif granularity == '1y':
-        format_str = '%Y'
-    elif granularity == '1h':
-        second_level_prefix = 'hourly/'
-        format_str = '%Y-%m-%d'  # 按天、小时、周处理
-    elif granularity == '1d':
-        second_level_prefix = 'daily/'
-        format_str = '%Y-%m-%d'  # 按天、小时、周处理
-
-    current_datetime = start_datetime
-    data_frames = []
+    if granularity not in PARTITION_LAYOUT:
+        raise ValueError(f"未知的聚合尺度: {granularity}")
+    second_level_prefix, format_str = PARTITION_LAYOUT[granularity]
 
-    while current_datetime <= end_datetime:
+    prefix = f"{first_level_prefix}{second_level_prefix}{third_level_prefix}"  # 拼接完整的前缀
+    return prefix, format_str
+
+def write_s3_parquet(bucket, file_key, df):
+    """
+    将 DataFrame 写为 Parquet 文件上传到 S3
+    """
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    s3_client.put_object(Bucket=bucket, Key=file_key, Body=buffer.getvalue())
+    logging.info(f"Uploaded {len(df)} rows to {file_key}.")
+
+class IncompletePeriodError(Exception):
+    """
+    汇总周期内有日分区读取失败，汇总结果不完整
+    """
 
-        date_str = current_datetime.strftime(format_str)  # 根据预先确定的格式化规则
 
-        prefix = f"{first_level_prefix}{second_level_prefix}{third_level_prefix}"  # 拼接完整的前缀
+def read_daily_period(start_datetime, end_datetime, third_level_prefix, max_workers=None):
+    """
+    读取一个汇总周期内的全部日分区
+    :return: (合并后的日数据, 今天之前没有数据的日期)
+    :raises IncompletePeriodError: 有日分区读取失败
+    """
+    date_strs = partition_date_strs(start_datetime, end_datetime, '1d')
+    frames_by_date = get_s3_partitions(date_strs, '1d', third_level_prefix, max_workers)
+    failed = [date_str for date_str in date_strs if date_str not in frames_by_date]
+    if failed:
+        raise IncompletePeriodError(f"Daily partitions {failed} of {third_level_prefix} failed to read.")
 
-        logging.info(f"Processing date {date_str} with prefix {prefix}.")
+    today = pd.Timestamp.now().normalize()
+    missing = [date_str for date_str, df in frames_by_date.items() if df.empty and pd.Timestamp(date_str) < today]
+    data_frames = [df for df in frames_by_date.values() if not df.empty]
+    daily = pd.concat(data_frames, ignore_index=True) if data_frames else pd.DataFrame()
+    return daily, missing
 
-        # 列出该日期下的所有文件
-        files = list_s3_files_by_date(bucket, prefix, date_str)
+def rollup_s3_period(bucket, granularity, third_level_prefix, date_str, max_workers=None):
+    """
+    由 daily/ 分区现场汇总一个周期，结果按 (前缀, 周期) 缓存
+    ROLLUP_WRITE_BACK 开启且周期已经结束时，把结果写成该周期的汇总分区
+    周期内今天之前有日期没有数据时，结果只返回、不缓存也不写回，下次重新汇总
+    :param date_str: 周期在 dt= 中的取值
+    :return: 汇总后的完整 DataFrame（全部列），没有日数据时为空
+    :raises IncompletePeriodError: 有日分区读取失败
+    """
+    cache_key = (bucket, granularity, third_level_prefix, date_str)
+    rolled = _rollup_cache.get(cache_key)
+    if rolled is not None:
+        logging.debug(f"Rollup cache hit for {third_level_prefix} {granularity} {date_str}.")
+        return rolled
 
-        # 如果没有文件，跳过这个日期
-        if not files:
-            logging.warning(f"No files found for date {date_str} in S3.")
-            current_datetime = increment_time(current_datetime, granularity)  # 跳过当前日期
-            continue
+    prefix, format_str = get_partition_prefix(granularity, third_level_prefix)
+    start_datetime = period_start(pd.to_datetime(date_str, format=format_str), granularity)
+    end_datetime = increment_time(start_datetime, granularity) - timedelta(seconds=1)
+    logging.info(f"Rolling up {third_level_prefix} {granularity} {date_str} from daily partitions.")
 
-        # 读取并合并文件
-        for file_key in files:
-            # 跳过不需要处理的标志性文件，例如 _SUCCESS
-            if file_key.endswith('_SUCCESS') or file_key.endswith('.crc'):
-                logging.debug(f"Skipping non-data file {file_key}.")
-                continue
+    # 汇总需要网络 ID 等分组列，因此读取日分区的全部列，不做下推
+    daily, missing = read_daily_period(start_datetime, end_datetime, third_level_prefix, max_workers)
+    rolled = rollup_frame(daily, granularity, KEY_COLUMNS)
+    if missing:
+        logging.warning(f"Rollup of {third_level_prefix} {granularity} {date_str} has no daily data for {missing}, "
+                        f"not caching it.")
+        return rolled
 
-            try:
-                df = read_s3_parquet(bucket, file_key)
-                data_frames.append(df)
-                logging.info(f"Successfully read file {file_key}.")
-            except Exception as e:
-                logging.error(f"Failed to read file {file_key}: {e}")
+    if ROLLUP_WRITE_BACK and not rolled.empty and end_datetime < pd.Timestamp.now().normalize():
+        write_s3_parquet(bucket, f"{prefix}/dt={date_str}/part-00000.parquet", rolled)
+        _listing_cache.pop((bucket, f"{prefix}/dt={date_str}/"))
 
-        # 正确递增时间
-        current_datetime = increment_time(current_datetime, granularity)
+    _rollup_cache.set(cache_key, rolled)
+    return rolled
+
+def get_s3_data(start_datetime, end_datetime, granularity, third_level_prefix, max_workers=None,
+                columns=None, filters=None, rollup=True):
+    """
+    根据时间范围和聚合尺度从 S3 读取多个文件并合并为一个完整的 DataFrame
+    :param start_datetime: 起始时间 (datetime)
+    :param end_datetime: 结束时间 (datetime)
+    :param granularity: 时间聚合单位 ('1h', '1d', '1w', '1m', '1q', '1y')
+    :param third_level_prefix: S3 前缀的第二级，作为传入参数
+    :param max_workers: 并发拉取的线程数，默认使用 S3_MAX_WORKERS
+    :param columns: 只读取这些列，默认读取全部列
+    :param filters: 下推到 Parquet 的行过滤条件，见 build_row_filters
+    :param rollup: 周、月、季度、年尺度缺少汇总分区时是否由日分区现场汇总
+    :return: 合并的 DataFrame
+    """
+    logging.info(f"Starting data retrieval from {start_datetime} to {end_datetime} with granularity {granularity}.")
+
+    # 先确定所有需要读取的日期分区
+    date_strs = partition_date_strs(start_datetime, end_datetime, granularity)
+    frames_by_date = get_s3_partitions(date_strs, granularity, third_level_prefix, max_workers, columns, filters, rollup)
 
     # 合并所有 DataFrame
+    data_frames = [df for df in frames_by_date.values() if not df.empty]
     if data_frames:
-        combined_df = pd.concat(data_frames, ignore_index=True)
+        with stage('concat'):
+            combined_df = pd.concat(data_frames, ignore_index=True)
         logging.info(f"Successfully combined {len(data_frames)} data frames.")
-        logging.info(f"Final DataFrame summary:\n{combined_df.describe()}")  # 记录 DataFrame 的摘要信息
+        with stage('describe'):
+            logging.info(f"Final DataFrame summary:\n{combined_df.describe()}")  # 记录 DataFrame 的摘要信息
         return combined_df
     else:
         logging.warning(f"No data found between {start_datetime} and {end_datetime}.")
         return pd.DataFrame()  # 如果没有数据，返回空的 DataFrame
 
+def partition_date_strs(start_datetime, end_datetime, granularity):
+    """
+    列出时间范围覆盖的分区在 dt= 中的取值，汇总尺度从所在周期的起点开始
+    """
+    _, format_str = PARTITION_LAYOUT[granularity]
+    date_strs = []
+    current_datetime = period_start(start_datetime, granularity) if is_rollup(granularity) else start_datetime
+    while current_datetime <= end_datetime:
+        date_strs.append(current_datetime.strftime(format_str))  # 根据预先确定的格式化规则
+        current_datetime = increment_time(current_datetime, granularity)  # 正确递增时间
+    return date_strs
+
+def get_s3_partitions(date_strs, granularity, third_level_prefix, max_workers=None, columns=None, filters=None,
+                      rollup=True):
+    """
+    按分区读取数据，参数含义同 get_s3_data
+    :param date_strs: 需要读取的分区，见 partition_date_strs
+    :return: {date_str: DataFrame}，没有数据的分区为空 DataFrame；有文件读取失败的分区不包含在结果中，
+             避免把不完整的分区当作已读取
+    """
+    # 从环境变量中读取 bucket
+    bucket = os.getenv("S3_BUCKET")  # 从 .env 文件或环境变量中获取 S3 bucket
+    prefix, format_str = get_partition_prefix(granularity, third_level_prefix)
+    logging.info(f"Processing {len(date_strs)} dates with prefix {prefix}.")
+
+    # 并发列出所有日期下的文件
+    with stage('list'):
+        objects_by_date = list_s3_objects_by_dates(bucket, prefix, date_strs, max_workers)
+
+    file_keys = []
+    objects = {}
+    for date_str in date_strs:
+        for obj in objects_by_date[date_str]:
+            file_keys.append(obj['Key'])
+            objects[obj['Key']] = obj
+
+    # 并发读取所有文件
+    cache_stats = parquet_cache.stats() if parquet_cache is not None else None
+    with stage('fetch'):
+        frames = fetch_s3_parquet_frames(bucket, file_keys, max_workers, objects, columns, filters)
+    record(files=len(frames), object_bytes=sum(objects[key].get('Size') or 0 for key in frames))
+    if parquet_cache is not None:
+        stats = parquet_cache.stats()
+        record(parquet_cache_hits=stats['hits'] - cache_stats['hits'],
+               parquet_cache_misses=stats['misses'] - cache_stats['misses'])
+        parquet_cache.log_stats()
+
+    frames_by_date = {}
+    for date_str in date_strs:
+        date_keys = [obj['Key'] for obj in objects_by_date[date_str] if obj['Key'] in frames]
+        if any(frames[key] is None for key in date_keys):
+            logging.warning(f"Partition {date_str} is incomplete and will be retried on the next load.")
+            continue
+
+        date_frames = [frames[key] for key in date_keys]
+        # 如果没有文件，跳过这个日期；汇总尺度由日分区现场汇总
+        if not date_keys and rollup and is_rollup(granularity):
+            try:
+                with stage('rollup'):
+                    rolled = rollup_s3_period(bucket, granularity, third_level_prefix, date_str, max_workers)
+            except IncompletePeriodError as e:
+                logging.warning(f"Partition {date_str} is incomplete and will be retried on the next load: {e}")
+                continue
+            if rolled.empty:
+                logging.warning(f"No daily data to roll up for {granularity} period {date_str}.")
+            else:
+                # 与读取汇总分区时一致地做列裁剪和行过滤
+                table = pa.Table.from_pandas(rolled, preserve_index=False)
+                date_frames = [project_table(table, columns=columns, filters=filters).to_pandas()]
+        elif not date_keys:
+            logging.warning(f"No files found for date {date_str} in S3.")
+
+        if len(date_frames) == 1:
+            frames_by_date[date_str] = date_frames[0]
+        else:
+            frames_by_date[date_str] = pd.concat(date_frames, ignore_index=True) if date_frames else pd.DataFrame()
+    return frames_by_date
+
 # 帮助函数，根据聚合尺度递增时间
 def increment_time(current_datetime, granularity):
     if granularity in ['1h', '1d']:
         return current_datetime + timedelta(days=1)
+    elif granularity == '1w':  # 按周递增
+        return current_datetime + timedelta(days=7)
     elif granularity == '1m':  # 按月递增
         return (current_datetime.replace(day=1) + timedelta(days=32)).replace(day=1)
     elif granularity == '1q':  # 按季度递增
@@ -0,0 +1,81 @@
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    合并相同键的并发加载，只执行一次，其余调用等待并共享结果
+
+    - 进程内：同一个键只有一个线程执行 fn，其他线程等待它的结果，拿到的是同一个对象
+    - 进程间：执行前持有 lock_dir 下的 flock，同一主机上的其他 gunicorn worker 在锁上等待；
+      拿到锁后先调用 check，前一个 worker 已经把结果写入共享存储时直接使用
+    锁文件按键的哈希分成固定数量的条带，避免锁文件无限增长
+    """
+
+    def __init__(self, lock_dir=None, stripes=256):
+        self.lock_dir = lock_dir
+        self.stripes = stripes
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, check=None):
+        """
+        :param key: 规范化后的查询键
+        :param fn: 实际的加载函数，结果需要由 fn 自己写入共享存储
+        :param check: 拿到进程间锁后查询共享存储，返回 None 表示仍需加载
+        :return: fn 或 check 的结果
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            logging.info(f"Waiting for in-flight load of {key}.")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_locked(key, fn, check)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _lock_path(self, key):
+        stripe = int(hashlib.sha1(str(key).encode('utf-8')).hexdigest(), 16) % self.stripes
+        return os.path.join(self.lock_dir, f"{stripe:03d}.lock")
+
+    def _run_locked(self, key, fn, check):
+        if not self.lock_dir:
+            return fn()
+
+        os.makedirs(self.lock_dir, exist_ok=True)  # 第一次加载时才创建锁目录
+        with open(self._lock_path(key), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if check is not None:
+                    result = check()
+                    if result is not None:
+                        logging.info(f"Load of {key} was completed by another worker.")
+                        return result
+                return fn()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
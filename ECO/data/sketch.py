@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pandas as pd
+from eco_percentile import sort_by_group
+
+# 每个分组保存的百分位节点数，默认 100 即每 1% 一个节点，与百分位滑块的步长一致
+SKETCH_KNOTS = int(os.getenv("SKETCH_KNOTS", "100"))
+
+# 不区分频段的汇总分组，供 all / ethernet 路径使用
+ALL_BANDS = '*'
+
+# 草图与原始分区放在同一级目录下，例如 hourly/sketch/controller_id/controller/dt=2024-09-07/
+SKETCH_PREFIX = 'sketch/'
+
+
+def _knot_ranks(counts, knots):
+    """
+    节点 k 对应的百分位为 k * 100 / knots，换算到组内位置的方式与 weighted_percentile 相同
+    """
+    percents = np.arange(knots + 1) * (100 / knots)
+    return (percents[:, None] / 100 * counts.astype(np.float64)).T
+
+
+def _cumulative_at(sorted_values, starts, counts, ranks):
+    """
+    计算排好序的数值在组内位置 r 处的累积和 C(r) = ∫_0^r f(t) dt，f 为按行展开的阶梯函数
+    截尾加权均值即 (C(up) - C(lp)) / (up - lp)，与 weighted_percentile 的一般情况一致
+    NaN 当作 0 累加，另返回累积的 NaN 行数
+    """
+    nan_mask = np.isnan(sorted_values)
+    values = np.where(nan_mask, 0.0, sorted_values)
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    nans = np.concatenate(([0], np.cumsum(nan_mask)))
+
+    floor = np.floor(ranks).astype(np.int64)
+    frac = ranks - floor
+    base = starts[:, None]
+    last = (starts + np.maximum(counts - 1, 0))[:, None]
+    partial = values[np.minimum(base + floor, last)]
+    cumulative = sums[base + floor] - sums[base] + np.where(floor < counts[:, None], frac * partial, 0.0)
+    nan_counts = nans[np.minimum(base + np.ceil(ranks).astype(np.int64), base + counts[:, None])] - nans[base]
+    return cumulative, nan_counts
+
+
+def build_sketch(data, sort_cols, metric_cols, knots=SKETCH_KNOTS):
+    """
+    为一个分区生成百分位草图：每个 (collection_time_agg, band, 排序指标, 指标) 一行，
+    保存行数 n 以及各百分位节点处的累积和，大小只与时间桶数、频段数和指标数有关，与网络数量无关
+    band 为 ALL_BANDS 的行汇总了所有频段
+    :return: 长表 DataFrame，列为 collection_time_agg, band, sort_indicator, metric, n, sums, nans
+    """
+    if data.empty:
+        return pd.DataFrame(columns=['collection_time_agg', 'band', 'sort_indicator', 'metric', 'n', 'sums', 'nans'])
+
+    agg_codes, agg_keys = pd.factorize(data['collection_time_agg'], sort=True)
+    rows = np.flatnonzero(agg_codes >= 0)
+
+    # 同一份数据按 (时间桶, 频段) 和 (时间桶, 全部频段) 各分组一次，没有 band 列时只生成汇总分组
+    if 'band' in data:
+        band_codes, band_keys = pd.factorize(data['band'].fillna('unknown'), sort=True)
+        band_keys = list(band_keys) + [ALL_BANDS]
+        groupings = [
+            agg_codes[rows] * len(band_keys) + band_codes[rows],
+            agg_codes[rows] * len(band_keys) + len(band_keys) - 1,
+        ]
+    else:
+        band_keys = [ALL_BANDS]
+        groupings = [agg_codes[rows]]
+
+    frames = []
+    for sort_indicator in sort_cols:
+        for group_codes in groupings:
+            order, keys, starts, counts = sort_by_group(group_codes, data[sort_indicator].to_numpy(dtype=np.float64)[rows])
+            order = rows[order]
+            ranks = _knot_ranks(counts, knots)
+            for metric in metric_cols:
+                sorted_values = data[metric].to_numpy(dtype=np.float64)[order]
+                cumulative, nan_counts = _cumulative_at(sorted_values, starts, counts, ranks)
+                frames.append(pd.DataFrame({
+                    'collection_time_agg': agg_keys[keys // len(band_keys)],
+                    'band': np.asarray(band_keys, dtype=object)[keys % len(band_keys)],
+                    'sort_indicator': sort_indicator,
+                    'metric': metric,
+                    'n': counts,
+                    'sums': list(cumulative),
+                    'nans': list(nan_counts),
+                }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _interpolate(knot_values, percent, knots):
+    """
+    在节点之间线性插值，百分位落在节点上时是精确值
+    """
+    position = np.clip(percent / 100 * knots, 0, knots)
+    lower = min(int(np.floor(position)), knots - 1)
+    frac = position - lower
+    return knot_values[:, lower] + frac * (knot_values[:, lower + 1] - knot_values[:, lower])
+
+
+def query_sketch(sketch, sort_indicator, metric_cols, percents, band=None, min_count=3):
+    """
+    用草图计算 network 模式的截尾加权均值
+    百分位落在节点上（默认即整数百分位）且区间覆盖至少一行时结果与原始数据计算一致，否则为插值近似
+    :param band: 频段，None 表示全部频段
+    :return: 以 collection_time_agg 为索引、metric_cols 为列的 DataFrame
+    """
+    rows = sketch[(sketch['sort_indicator'] == sort_indicator) & (sketch['band'] == (band or ALL_BANDS))]
+    result = {}
+    index = None
+    for metric in metric_cols:
+        metric_rows = rows[rows['metric'] == metric].sort_values('collection_time_agg')
+        if index is None:
+            index = pd.Index(metric_rows['collection_time_agg'].values, name='collection_time_agg')
+        if metric_rows.empty:
+            result[metric] = np.array([])
+            continue
+
+        sums = np.stack(metric_rows['sums'].values)
+        nans = np.stack(metric_rows['nans'].values)
+        knots = sums.shape[1] - 1
+        n = metric_rows['n'].to_numpy(dtype=np.float64)
+
+        width = (percents[1] / 100 * n) - (percents[0] / 100 * n)
+        numerator = _interpolate(sums, percents[1], knots) - _interpolate(sums, percents[0], knots)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = numerator / width
+            # 零宽区间：用相邻节点区间的均值近似该位置的取值
+            position = min(int(np.floor(percents[0] / 100 * knots)), knots - 1)
+            span = n / knots
+            point = (sums[:, position + 1] - sums[:, position]) / span
+        values = np.where(width < 10e-8, point, values)
+
+        nan_in_window = _interpolate(nans.astype(np.float64), percents[1], knots) - _interpolate(nans.astype(np.float64), percents[0], knots)
+        values[(nan_in_window > 0) | (n < min_count)] = np.nan
+        result[metric] = values
+
+    if index is None:
+        index = pd.Index([], name='collection_time_agg')
+    return pd.DataFrame(result, index=index, columns=metric_cols)
@@ -2,6 +2,7 @@ import logging
 from dash import dcc, html
 from dash.dependencies import Input, Output
 from app import app
+import instrumentation
 from layout import tab1_layout, tab2_layout
 import callbacks.tab1_callbacks
 import callbacks.tab2_callbacks
@@ -31,6 +32,9 @@ logger.setLevel(logging.INFO)
 logger.addHandler(log_handler)
 
 
+# 开启 ECO_INSTRUMENTATION 时注册 /metrics
+instrumentation.init_app(app)
+
 # 示例日志信息
 logging.info("Dash app is starting...")
 
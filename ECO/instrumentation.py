@@ -0,0 +1,227 @@
+"""
+回调热点路径的埋点
+
+ECO_INSTRUMENTATION=1 时：
+- 每次 update_data_source / update_graphs / update_metric_graph / update_metric_zoom 调用生成一条 trace，记录各阶段耗时、行数、字节数和缓存命中情况
+- trace 以一行 JSON 写入日志（logger 名为 eco.trace），并累加到进程内指标，由 /metrics 以 Prometheus 文本格式导出
+- Dash 请求的总耗时和响应字节数（包含输出的 JSON 序列化）在 Flask 的 after_request 中记录
+- ECO_DEBUG_PANEL=1 时在 Tab 1 布局中显示调试面板，展示本进程最近的 trace
+未开启时 traced 直接返回原函数，stage/record 只做一次 ContextVar 查询
+每个 gunicorn worker 导出各自进程内的指标
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+ECO_INSTRUMENTATION = os.getenv("ECO_INSTRUMENTATION", "0") == "1"
+ECO_DEBUG_PANEL = ECO_INSTRUMENTATION and os.getenv("ECO_DEBUG_PANEL", "0") == "1"
+
+# 调试面板保留的最近 trace 数量
+ECO_TRACE_HISTORY = int(os.getenv("ECO_TRACE_HISTORY", "20"))
+
+_current = contextvars.ContextVar('eco_trace', default=None)
+trace_logger = logging.getLogger('eco.trace')
+
+
+class Trace:
+    """
+    一次回调调用的阶段耗时和计数
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.started_at = time.time()
+        self.seconds = None
+        self.stages = {}
+        self.values = {}
+
+    def add_stage(self, name, seconds):
+        # 同名阶段（例如汇总时嵌套的分区读取）累加
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_values(self, values):
+        for name, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.values[name] = self.values.get(name, 0) + value
+            else:
+                self.values[name] = value
+
+    def as_dict(self):
+        return {
+            'callback': self.callback,
+            'started_at': self.started_at,
+            'seconds': round(self.seconds or 0.0, 6),
+            'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            **self.values,
+        }
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+class Metrics:
+    """
+    进程内累计指标，按 Prometheus 文本格式导出
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries = defaultdict(lambda: [0, 0.0])  # (metric, labels) -> [count, sum]
+        self._counters = defaultdict(float)  # (metric, labels) -> value
+
+    def observe(self, trace):
+        with self._lock:
+            self._add_summary('eco_callback_seconds', _labels(callback=trace.callback), trace.seconds)
+            for name, seconds in trace.stages.items():
+                self._add_summary('eco_stage_seconds', _labels(callback=trace.callback, stage=name), seconds)
+            for name, value in trace.values.items():
+                if isinstance(value, (int, float)):
+                    self._counters[(f'eco_{name}_total', _labels(callback=trace.callback))] += float(value)
+
+    def observe_request(self, output, seconds, nbytes):
+        with self._lock:
+            labels = _labels(output=output)
+            self._add_summary('eco_request_seconds', labels, seconds)
+            self._counters[('eco_response_bytes_total', labels)] += nbytes
+
+    def _add_summary(self, metric, labels, value):
+        summary = self._summaries[(metric, labels)]
+        summary[0] += 1
+        summary[1] += value
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in sorted({metric for metric, _ in self._summaries}):
+                lines.append(f'# TYPE {metric} summary')
+                for (name, labels), (count, total) in sorted(self._summaries.items()):
+                    if name == metric:
+                        lines.append(f'{metric}_count{{{labels}}} {count}')
+                        lines.append(f'{metric}_sum{{{labels}}} {total:.6f}')
+            for metric in sorted({metric for metric, _ in self._counters}):
+                lines.append(f'# TYPE {metric} counter')
+                for (name, labels), value in sorted(self._counters.items()):
+                    if name == metric:
+                        lines.append(f'{metric}{{{labels}}} {value:g}')
+            return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+recent_traces = deque(maxlen=ECO_TRACE_HISTORY)
+
+
+def traced(callback):
+    """
+    回调装饰器，放在 @app.callback 之下；未开启埋点时原样返回被装饰的函数
+    """
+    def decorator(func):
+        if not ECO_INSTRUMENTATION:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = Trace(callback)
+            token = _current.set(trace)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                trace.seconds = time.perf_counter() - start
+                _current.reset(token)
+                metrics.observe(trace)
+                recent_traces.append(trace)
+                trace_logger.info(json.dumps(trace.as_dict(), default=str))
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stage(name):
+    """
+    记录一个阶段的耗时，不在 trace 中时什么也不做
+    """
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, time.perf_counter() - start)
+
+
+def record(**values):
+    """
+    记录行数、字节数等计数（数值累加）以及缓存命中等标记（覆盖）
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.add_values(values)
+
+
+@contextmanager
+def capture():
+    """
+    在没有回调 trace 的地方（例如计算进程）收集阶段耗时和计数，结果由调用方交给 merge 合并
+    """
+    trace = Trace('capture')
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def merge(stages, values):
+    """
+    把其他进程中收集的阶段耗时和计数合并到当前 trace
+    """
+    trace = _current.get()
+    if trace is None:
+        return
+    for name, seconds in stages.items():
+        trace.add_stage(name, seconds)
+    trace.add_values(values)
+
+
+def format_recent_traces():
+    """
+    调试面板的文本：最近的 trace，新的在前
+    """
+    return '\n'.join(json.dumps(trace.as_dict(), default=str) for trace in reversed(recent_traces))
+
+
+def init_app(app):
+    """
+    在 Flask server 上注册 /metrics 和请求级的耗时、响应大小统计
+    """
+    if not ECO_INSTRUMENTATION:
+        return
+
+    import flask
+
+    server = app.server
+
+    @server.route('/metrics')
+    def prometheus_metrics():
+        return flask.Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    @server.before_request
+    def start_timer():
+        flask.g.eco_request_start = time.perf_counter()
+
+    @server.after_request
+    def observe_request(response):
+        if flask.request.path.endswith('_dash-update-component') and hasattr(flask.g, 'eco_request_start'):
+            body = flask.request.get_json(silent=True) or {}
+            seconds = time.perf_counter() - flask.g.eco_request_start
+            metrics.observe_request(body.get('output', ''), seconds, response.calculate_content_length() or 0)
+        return response
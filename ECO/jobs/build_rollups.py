@@ -0,0 +1,60 @@
+"""
+离线生成周、月、季度、年汇总分区
+
+读取某一天所在周期内 daily/ 下的全部分区，按 data.rollup.rollup_frame 汇总后写到对应的汇总目录：
+    {S3_FIRST_LEVEL_PREFIX}monthly/controller_id/controller/dt=2024-09/part-00000.parquet
+
+每天运行一次会覆盖包含该日期的周期，未结束的周期因此每天更新。在 ECO 目录下运行：
+    python -m jobs.build_rollups --date 2024-09-07 --time-granularity 1w 1m
+"""
+import argparse
+import logging
+import os
+from datetime import timedelta
+
+import pandas as pd
+
+from data import s3_utils
+from data.metrics import KEY_COLUMNS, metric_paths
+from data.rollup import ROLLUP_FREQS, period_start, rollup_frame
+
+
+def build_period(date_str, time_granularities=tuple(ROLLUP_FREQS), allow_missing=False):
+    """
+    :param allow_missing: 周期内今天之前有日期没有数据时是否仍然写入汇总分区，默认跳过该路径
+    :raises IncompletePeriodError: 有日分区读取失败，不写入不完整的汇总分区
+    """
+    bucket = os.getenv("S3_BUCKET")
+
+    for time_granularity in time_granularities:
+        start_datetime = period_start(pd.to_datetime(date_str), time_granularity)
+        end_datetime = s3_utils.increment_time(start_datetime, time_granularity) - timedelta(seconds=1)
+
+        for path in sorted(metric_paths()):
+            daily, missing = s3_utils.read_daily_period(start_datetime, end_datetime, path)
+            if daily.empty:
+                logging.warning(f"No daily data for {path} in {time_granularity} period from {start_datetime}, skipping.")
+                continue
+            if missing and not allow_missing:
+                logging.error(f"No daily data for {path} on {missing}, skipping the {time_granularity} rollup "
+                              f"(use --allow-missing to write it anyway).")
+                continue
+
+            rolled = rollup_frame(daily, time_granularity, KEY_COLUMNS)
+            prefix, format_str = s3_utils.get_partition_prefix(time_granularity, path)
+            file_key = f"{prefix}/dt={start_datetime.strftime(format_str)}/part-00000.parquet"
+            s3_utils.write_s3_parquet(bucket, file_key, rolled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--date', required=True, help='周期内的任意日期，例如 2024-09-07')
+    parser.add_argument('--time-granularity', nargs='+', default=list(ROLLUP_FREQS), choices=list(ROLLUP_FREQS))
+    parser.add_argument('--allow-missing', action='store_true', help='周期内有日期没有数据时仍然写入汇总分区')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    build_period(args.date, args.time_granularity, args.allow_missing)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+离线生成百分位草图
+
+读取某一天 hourly/ 和 daily/ 下每个指标维度路径的原始分区，生成 data.sketch.build_sketch 的草图，
+写到同级的 sketch/ 目录下：
+    {S3_FIRST_LEVEL_PREFIX}hourly/sketch/controller_id/controller/dt=2024-09-07/part-00000.parquet
+
+在 ECO 目录下运行：
+    python -m jobs.build_sketches --date 2024-09-07
+"""
+import argparse
+import logging
+import os
+
+import pandas as pd
+
+from data import s3_utils
+from data.metrics import metric_paths, path_options
+from data.sketch import SKETCH_PREFIX, build_sketch
+
+
+def sketch_paths():
+    """
+    :return: [(路径, 排序指标, 指标列)]，多个连接类型共用同一路径时只生成一次
+        排序指标只取 sketch_sort_indicators（默认为该维度的默认排序指标），草图的大小与排序指标数成正比
+    """
+    options = path_options()
+    return [(path, options[path].get('sketch_sort_indicators', [options[path]['default']]), metric_cols)
+            for path, metric_cols in metric_paths().items()]
+
+
+def build_day(date_str, time_granularities=('1h', '1d')):
+    bucket = os.getenv("S3_BUCKET")
+    start_datetime = pd.to_datetime(date_str)
+    end_datetime = start_datetime.replace(hour=23, minute=59, second=59)
+
+    for time_granularity in time_granularities:
+        for path, sort_cols, metric_cols in sketch_paths():
+            columns = ['collection_time_agg', 'band'] + metric_cols
+            data = s3_utils.get_s3_data(start_datetime, end_datetime, time_granularity, path, columns=columns)
+            if data.empty:
+                logging.warning(f"No raw data for {path} on {date_str} ({time_granularity}), skipping sketch.")
+                continue
+
+            sketch = build_sketch(data, sort_cols, metric_cols)
+            prefix, format_str = s3_utils.get_partition_prefix(time_granularity, f"{SKETCH_PREFIX}{path}")
+            file_key = f"{prefix}/dt={start_datetime.strftime(format_str)}/part-00000.parquet"
+            s3_utils.write_s3_parquet(bucket, file_key, sketch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--date', required=True, help='分区日期，例如 2024-09-07')
+    parser.add_argument('--time-granularity', nargs='+', default=['1h', '1d'])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    build_day(args.date, args.time_granularity)
+
+
+if __name__ == '__main__':
+    main()
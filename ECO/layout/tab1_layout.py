@@ -1,17 +1,22 @@
 import pandas as pd
 from dash import dcc, html
 from config.granularity_config import granularity_options
+from instrumentation import ECO_DEBUG_PANEL
 
 layout = html.Div([
     html.Div([
         html.Div([
-            dcc.Store(id='filtered-data'),  # 用于存储 Tab 1 中的过滤后的数据
+            dcc.Store(id='filtered-data'),  # 用于存储 Tab 1 中服务端数据集的句柄
+            dcc.Store(id='graph-params'),  # 用于存储当前的绘图参数，指标面板展开时按它计算图表
+            dcc.Store(id='session-id'),  # 页面的会话 ID，用于取消被取代的计算
             dcc.Store(id='param-store', data={
                 'start_date': None,
                 'end_date': None,
                 'time_granularity': None,
                 'metric_granularity': None,
-                'connection_type_path': None
+                'connection_type_path': None,
+                'band': None,
+                'mode': None
             }),
 
             # 选择数据分区
@@ -49,10 +54,10 @@ layout = html.Div([
                     # {'label': 'raw', 'value': 'raw'},
                     {'label': '1 hour', 'value': '1h'},
                     {'label': '1 day', 'value': '1d'},
-                    # {'label': '7 days', 'value': '7d'},
-                    # {'label': '1 month', 'value': '1m'},
-                    # {'label': '3 months', 'value': '1q'},
-                    # {'label': '1 year', 'value': '1y'}
+                    {'label': '1 week', 'value': '1w'},
+                    {'label': '1 month', 'value': '1m'},
+                    {'label': '3 months', 'value': '1q'},
+                    {'label': '1 year', 'value': '1y'}
                 ],
                 value='1h',
                 style={'width': '100%'}
@@ -98,6 +103,18 @@ layout = html.Div([
                 style={'width': '100%'}
             ),
 
+            html.Br(),  # 添加间距
+            html.Label("选择计算方式："),
+            dcc.RadioItems(
+                id='compute-mode-radio',
+                options=[
+                    {'label': 'Exact', 'value': 'exact'},
+                    {'label': 'Sketch (Network only)', 'value': 'sketch'}
+                ],
+                value='exact',  # 默认读取原始数据精确计算
+                labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+            ),
+
             html.Br(),  # 添加间距
             html.Label("选择排序指标："),
             dcc.Dropdown(
@@ -132,3 +149,10 @@ layout = html.Div([
         html.Div(id='graphs-container', style={'flex': '3', 'padding': '20px'})  # 右侧布局
     ], style={'display': 'flex', 'flexDirection': 'row'})  # 设置为左右布局
 ])
+
+# 调试面板：显示本进程最近回调的阶段耗时和计数，需要 ECO_INSTRUMENTATION=1 和 ECO_DEBUG_PANEL=1
+if ECO_DEBUG_PANEL:
+    layout.children.append(html.Details([
+        html.Summary("Debug"),
+        html.Pre(id='debug-panel', style={'fontSize': '11px', 'whiteSpace': 'pre-wrap'})
+    ], style={'padding': '20px'}))
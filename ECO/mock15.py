@@ -1,85 +1,179 @@
-import random
-import csv
-from datetime import datetime, timedelta
+"""
+生成 ECO 格式的模拟数据，目录结构与 S3 上的分区一致，生成后可以直接同步到测试桶：
+    {output}/hourly/controller_id/controller/dt=2024-09-01/part-00000.snappy.parquet
+    {output}/daily/controller_id/controller/dt=2024-09-01/part-00000.snappy.parquet
+
+每个网络、每个频段每 15 分钟生成一个采样，hourly/ 为每小时 4 个采样的均值，daily/ 为当天各小时的均值。
+按天、按网络分块生成，每块写一个 part 文件，内存占用只与 --chunk-networks 有关，与网络总数和天数无关。
+同样的参数和种子生成的数据完全相同。在 ECO 目录下运行：
+    python mock15.py --networks 1000000 --start-date 2024-09-01 --end-date 2024-09-30 --output mock_data
+    aws s3 sync mock_data s3://$S3_BUCKET/$S3_FIRST_LEVEL_PREFIX
+"""
+import argparse
+import logging
+import os
+
+import numpy as np
 import pandas as pd
 
-# 定义数据生成的范围和规律
-regions = ['aps1', 'use1', 'euw1']
-bands = ['2.4g', '5g', '6g']
-deviceids = [f'd{i}' for i in range(1, 11)]  # 生成d1到d10
-start_date = datetime.now() - timedelta(days=15)
-end_date = datetime.now()
-interval = timedelta(minutes=15)  # 每15分钟生成一条数据
-
-# 生成数据
-data_15min = []
-current_date = start_date
-while current_date <= end_date:
-    for deviceid in deviceids:
-        current_time = current_date
-        for _ in range(96):  # 每天生成96条数据
-            for band in bands:
-                region = regions[(int(deviceid[1]) - 1) % 3]  # 根据deviceid分配region
-                client_online = random.randint(1, 100)
-                wan_throughput = random.randint(50, 1000)
-                airtime_utilization = random.uniform(0, 1)
-                congestion_rate = random.uniform(0, 1)
-                noise = random.uniform(-100, 0)
-
-                data_15min.append([
-                    region, current_time.strftime('%Y-%m-%d %H:%M:%S'), deviceid, client_online, band,
-                    wan_throughput, airtime_utilization, congestion_rate, noise
-                ])
-            current_time += interval
-    current_date += timedelta(days=1)
-
-# 写入15分钟间隔数据的CSV文件
-with open('data_15min.csv', mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow([
-        "region", "utc_time", "deviceid", "client_online", "band", "wan_throughput",
-        "airtime_utilization", "congestion_rate", "noise"
-    ])
-    writer.writerows(data_15min)
-
-print("CSV file 'data_15min.csv' has been created with 15-minute interval data.")
-
-
-# 读取15分钟间隔数据的CSV文件
-df_15min = pd.read_csv('data_15min.csv')
-
-# 转换utc_time列为datetime类型
-df_15min['utc_time'] = pd.to_datetime(df_15min['utc_time'])
-
-# 定义聚合函数
-def aggregate_data(df, freq):
-    aggregation = {
-        'client_online': 'mean',
-        'wan_throughput': 'mean',
-        'airtime_utilization': 'mean',
-        'congestion_rate': 'mean',
-        'noise': 'mean'
-    }
-    df_resampled = df.resample(freq, on='utc_time').agg(aggregation)
-    df_resampled = df_resampled.dropna(how='all')  # 删除所有列均为NaN的行
-    df_resampled['region'] = df['region'].iloc[0]
-    df_resampled['deviceid'] = df['deviceid'].iloc[0]
-    df_resampled['band'] = df['band'].iloc[0]
-    return df_resampled.reset_index()
-
-# 计算每小时和每天的平均数据
-df_1h = df_15min.groupby(['region', 'deviceid', 'band']).apply(aggregate_data, 'H').reset_index(drop=True)
-df_1d = df_15min.groupby(['region', 'deviceid', 'band']).apply(aggregate_data, 'D').reset_index(drop=True)
-
-# 调整列顺序
-df_1h = df_1h[['region', 'utc_time', 'deviceid', 'client_online', 'band', 'wan_throughput',
-               'airtime_utilization', 'congestion_rate', 'noise']]
-df_1d = df_1d[['region', 'utc_time', 'deviceid', 'client_online', 'band', 'wan_throughput',
-               'airtime_utilization', 'congestion_rate', 'noise']]
-
-# 写入聚合数据的CSV文件
-df_1h.to_csv('data_1h_avg.csv', index=False)
-df_1d.to_csv('data_1d_avg.csv', index=False)
-
-print("CSV files 'data_1h_avg.csv' and 'data_1d_avg.csv' have been created with aggregated data.")
+from data.metrics import BANDS, METRIC_SHAPES, metric_paths
+
+# 每小时的采样数
+SAMPLES_PER_HOUR = 4
+
+# 每块生成的网络数，一块约 networks × 频段数 × 96 行
+CHUNK_NETWORKS = 2000
+
+
+def network_ids(first, count):
+    """
+    网络 ID：c0、c1、...
+    """
+    return np.char.add('c', np.arange(first, first + count).astype(str)).astype(object)
+
+
+def chunk_baselines(count, metric_cols, rng):
+    """
+    每个网络各指标的基线，各天共用
+    """
+    return {col: rng.normal(METRIC_SHAPES[col][0], METRIC_SHAPES[col][1], count) for col in metric_cols}
+
+
+def make_samples(count, bands, metric_cols, baselines, rng):
+    """
+    一块网络一天的 15 分钟采样：count × bands × 96 行
+    :return: 以整数编号表示网络、频段和小时的 DataFrame，便于后续分组
+    """
+    slots = 24 * SAMPLES_PER_HOUR
+    network = np.repeat(np.arange(count), len(bands) * slots)
+    band = np.tile(np.repeat(np.arange(len(bands)), slots), count)
+    hour = np.tile(np.arange(slots) // SAMPLES_PER_HOUR, count * len(bands))
+
+    data = {'network': network, 'band': band, 'hour': hour}
+    for col in metric_cols:
+        _, _, hourly_std, low, high = METRIC_SHAPES[col]
+        # 15 分钟采样的波动按 4 个采样取均值后与小时间的波动一致
+        values = baselines[col][network] + rng.normal(0, hourly_std * np.sqrt(SAMPLES_PER_HOUR), len(network))
+        data[col] = np.clip(values, low, high)
+    return pd.DataFrame(data)
+
+
+def to_partition_frame(grouped, day, ids, bands, metric_cols, hourly):
+    """
+    把按整数编号分组的结果转为线上的列：controller_id、band、collection_time、collection_time_agg 和指标列
+    """
+    day_start = int(pd.Timestamp(day).timestamp())
+    if hourly:
+        hours = grouped['hour'].to_numpy()
+        collection_time = day_start + hours * 3600
+        labels = pd.to_datetime(day_start + np.arange(24) * 3600, unit='s').strftime('%Y-%m-%d %H:00:00')
+        collection_time_agg = np.asarray(labels, dtype=object)[hours]
+    else:
+        collection_time = np.full(len(grouped), day_start)
+        collection_time_agg = pd.Timestamp(day).strftime('%Y-%m-%d')
+
+    frame = pd.DataFrame({
+        'controller_id': ids[grouped['network'].to_numpy()],
+        'band': np.asarray(bands, dtype=object)[grouped['band'].to_numpy()],
+        'collection_time': collection_time.astype(np.int64),
+        'collection_time_agg': collection_time_agg,
+    })
+    for col in metric_cols:
+        frame[col] = grouped[col].to_numpy()
+    return frame
+
+
+def rollup_chunk(samples, metric_cols):
+    """
+    向量化地汇总：15 分钟采样 -> 小时均值 -> 天均值
+    """
+    hourly = samples.groupby(['network', 'band', 'hour'], sort=True)[metric_cols].agg('mean').reset_index()
+    daily = hourly.groupby(['network', 'band'], sort=True)[metric_cols].agg('mean').reset_index()
+    return hourly, daily
+
+
+def write_partition(output, granularity, path, day, part, frame):
+    directory = os.path.join(output, granularity, path, f"dt={pd.Timestamp(day):%Y-%m-%d}")
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, f"part-{part:05d}.snappy.parquet")
+    frame.to_parquet(file_path, index=False, compression='snappy')
+    return os.path.getsize(file_path)
+
+
+def iter_partitions(networks, start_date, end_date, paths=None, bands=BANDS, chunk_networks=CHUNK_NETWORKS, seed=0):
+    """
+    按块生成 [start_date, end_date] 内每天的数据，写本地目录和上传 S3（benchmark.synthetic）共用
+    :param paths: 要生成的路径，默认只生成 controller_id/controller
+    :return: 依次产出 (path, day, part, samples 行数, hourly, daily)，hourly/daily 为线上列格式的 DataFrame
+    """
+    all_paths = metric_paths()
+    paths = paths or ['controller_id/controller']
+    days = pd.date_range(pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize(), freq='D')
+
+    for path_idx, path in enumerate(paths):
+        metric_cols = all_paths[path]
+        for part, first in enumerate(range(0, networks, chunk_networks)):
+            count = min(chunk_networks, networks - first)
+            ids = network_ids(first, count)
+            baselines = chunk_baselines(count, metric_cols, np.random.default_rng([seed, path_idx, part]))
+
+            for day_idx, day in enumerate(days):
+                rng = np.random.default_rng([seed, path_idx, part, day_idx + 1])
+                samples = make_samples(count, bands, metric_cols, baselines, rng)
+                hourly, daily = rollup_chunk(samples, metric_cols)
+                yield (path, day, part, len(samples),
+                       to_partition_frame(hourly, day, ids, bands, metric_cols, True),
+                       to_partition_frame(daily, day, ids, bands, metric_cols, False))
+            logging.info(f"{path}: generated networks {first}-{first + count - 1} for {len(days)} days.")
+
+
+def generate(output, networks, start_date, end_date, paths=None, bands=BANDS, chunk_networks=CHUNK_NETWORKS, seed=0):
+    """
+    生成 [start_date, end_date] 内每天的 hourly/ 和 daily/ 分区
+    :param paths: 要生成的路径，默认只生成 controller_id/controller
+    :return: {'samples': 15 分钟采样数, 'hourly_rows', 'daily_rows', 'files', 'bytes'}
+    """
+    paths = paths or ['controller_id/controller']
+    days = pd.date_range(pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize(), freq='D')
+    stats = {'samples': 0, 'hourly_rows': 0, 'daily_rows': 0, 'files': 0, 'bytes': 0}
+
+    for path, day, part, samples, hourly, daily in iter_partitions(networks, start_date, end_date, paths, bands,
+                                                                   chunk_networks, seed):
+        stats['samples'] += samples
+        stats['hourly_rows'] += len(hourly)
+        stats['daily_rows'] += len(daily)
+        for granularity, frame in [('hourly', hourly), ('daily', daily)]:
+            stats['bytes'] += write_partition(output, granularity, path, day, part, frame)
+            stats['files'] += 1
+
+    # 与 Spark 的输出一致，每个分区写一个 _SUCCESS 标记
+    for path in paths:
+        for granularity in ['hourly', 'daily']:
+            for day in days:
+                directory = os.path.join(output, granularity, path, f"dt={day:%Y-%m-%d}")
+                if os.path.isdir(directory):
+                    open(os.path.join(directory, '_SUCCESS'), 'w').close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='mock_data', help='输出目录')
+    parser.add_argument('--networks', type=int, default=10)
+    parser.add_argument('--start-date', default=str((pd.Timestamp.now() - pd.Timedelta(days=15)).date()))
+    parser.add_argument('--end-date', default=str(pd.Timestamp.now().date()))
+    parser.add_argument('--paths', nargs='+', default=None, choices=sorted(metric_paths()),
+                        help='要生成的路径，默认只生成 controller_id/controller')
+    parser.add_argument('--chunk-networks', type=int, default=CHUNK_NETWORKS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    stats = generate(args.output, args.networks, args.start_date, args.end_date, args.paths,
+                     chunk_networks=args.chunk_networks, seed=args.seed)
+    logging.info(f"Wrote {stats['files']} files ({stats['bytes']} bytes): {stats['samples']} samples, "
+                 f"{stats['hourly_rows']} hourly rows, {stats['daily_rows']} daily rows.")
+
 
+if __name__ == '__main__':
+    main()
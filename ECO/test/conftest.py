@@ -0,0 +1,16 @@
+import pytest
+
+from data import datasets, s3_utils
+
+
+@pytest.fixture(autouse=True)
+def cache_dirs(tmp_path, monkeypatch):
+    """
+    本地缓存写到每个测试自己的临时目录，计算进程通过 ECO_CACHE_DIR 继承同样的目录
+    """
+    cache_root = tmp_path / 'eco_cache'
+    monkeypatch.setenv('ECO_CACHE_DIR', str(cache_root))
+    monkeypatch.setattr(datasets.result_store, 'shared_dir', str(cache_root / 'results'))
+    monkeypatch.setattr(datasets._single_flight, 'lock_dir', str(cache_root / 'results' / 'locks'))
+    if s3_utils.parquet_cache is not None:
+        monkeypatch.setattr(s3_utils.parquet_cache, 'cache_dir', str(cache_root / 'parquet'))
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from callbacks import charts
+from data import datasets
+from data.ttl_cache import TTLCache
+
+
+def test_panels_track_open_state():
+    panels = charts.metric_panels('controller')
+    assert [panel.open for panel in panels][:3] == [True, True, False]
+
+    # 点击奇数次切换展开状态，重新渲染时保留
+    ids = [panel.id for panel in panels]
+    opens = [panel.open for panel in panels]
+    clicks = [None, 1, 3] + [2] * (len(panels) - 3)
+    assert charts.open_panel_metrics(ids, opens, clicks) == ['average_rx_rate', 'congestion_score']
+    assert charts.open_panel_metrics([], [], []) is None
+
+
+def test_metric_figures_are_computed_per_metric_and_memoized(monkeypatch):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'collection_time_agg': np.repeat(['2024-09-01 00:00:00', '2024-09-01 01:00:00'], 50),
+        'average_rx_rate': rng.normal(100, 10, 100),
+        'noise': rng.normal(-80, 5, 100),
+    })
+    loads = []
+
+    def get_dataset(query):
+        loads.append(query)
+        return 'handle', data
+
+    monkeypatch.setattr(datasets, 'get_dataset', get_dataset)
+    monkeypatch.setattr(charts, '_metric_charts', TTLCache(ttl=60))
+    params = {
+        'query': {'band': '2.4GHz', 'mode': 'exact'},
+        'metric_granularity': 'controller',
+        'sort_indicator': 'average_rx_rate',
+        'percents': [40, 60],
+        'agg_dimension': 'time',
+    }
+
+    figure = charts.metric_figure(params, 'noise')
+    assert figure['data'][0]['name'] == 'Noise'
+    assert sum(figure['data'][0]['y']) == 20
+    assert charts.metric_figure(params, 'noise') == figure
+    assert len(loads) == 1
+
+    charts.metric_figure({**params, 'percents': [0, 10]}, 'noise')
+    assert len(loads) == 2
+
+
+def test_sketch_falls_back_for_sort_indicators_not_in_sketch(monkeypatch):
+    from data.percentile_index import PercentileIndex
+    from data.sketch import build_sketch
+
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'collection_time_agg': np.repeat(['2024-09-01 00:00:00', '2024-09-01 01:00:00'], 50),
+        'band': '2.4GHz',
+        'average_rx_rate': rng.normal(100, 10, 100),
+        'noise': rng.normal(-80, 5, 100),
+    })
+    sketch = build_sketch(data, ['average_rx_rate'], ['average_rx_rate', 'noise'])
+    modes = []
+
+    def get_dataset(query):
+        modes.append(query['mode'])
+        return 'handle', sketch if query['mode'] == 'sketch' else data
+
+    monkeypatch.setattr(datasets, 'get_dataset', get_dataset)
+    monkeypatch.setattr(datasets, 'get_percentile_index', lambda handle, data, metric_granularity: PercentileIndex(
+        data, 'collection_time_agg', ['average_rx_rate', 'noise']))
+    params = {
+        'query': {'band': '2.4GHz', 'mode': 'sketch'},
+        'metric_granularity': 'controller',
+        'sort_indicator': 'average_rx_rate',
+        'percents': [40, 60],
+        'agg_dimension': 'network',
+    }
+    charts.compute_metric_figure(params, 'noise')
+    assert modes == ['sketch']
+
+    charts.compute_metric_figure({**params, 'sort_indicator': 'noise'}, 'noise')
+    assert modes == ['sketch', 'sketch', 'exact']
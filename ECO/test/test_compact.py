@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from callbacks.percentile import grouped_weighted_percentile
+from data.compact import compact_frame, compact_numeric
+
+
+def make_data(rows=5000):
+    rng = np.random.default_rng(0)
+    collection_time = 1725148800 + rng.integers(0, 24, rows) * 3600
+    return pd.DataFrame({
+        'controller_id': [f'c{i}' for i in rng.integers(0, rows, rows)],
+        'band': rng.choice(['2.4GHz', '5GHz', '6GHz'], rows).astype(object),
+        'collection_time': collection_time.astype(np.int64),
+        'collection_time_agg': pd.to_datetime(collection_time, unit='s').strftime('%Y-%m-%d %H:00:00').astype(object),
+        'noise': rng.uniform(-100, 0, rows),
+        'average_rx_rate': rng.uniform(0, 1000, rows),
+    })
+
+
+def test_compact_dtypes_and_savings():
+    data, saved = compact_frame(make_data())
+    assert isinstance(data['band'].dtype, pd.CategoricalDtype)
+    assert isinstance(data['collection_time_agg'].dtype, pd.CategoricalDtype)
+    assert not isinstance(data['controller_id'].dtype, pd.CategoricalDtype)  # 取值几乎不重复
+    assert data['collection_time'].dtype == np.int32
+    assert data['noise'].dtype == np.float64  # 默认保留 float64
+    assert saved > 0
+
+    data, _ = compact_frame(make_data(), float32=True)
+    assert data['noise'].dtype == np.float32
+
+
+def test_compact_numeric_dtypes():
+    data = pd.DataFrame({
+        'small': np.array([0, 1, 2], dtype=np.int64),
+        'timestamp': np.array([1725148800, 1725152400, 1725156000], dtype=np.int64),
+        'large': np.array([0, 1, 2 ** 40], dtype=np.int64),
+        'int16': np.array([0, 1, 2], dtype=np.int16),
+        'noise': np.array([-90.0, -80.0, -70.0]),
+    })
+    compact_numeric(data)
+    # 8 字节整数最多降到 int32，更窄的整数列保持原样
+    assert data['small'].dtype == np.int32
+    assert data['timestamp'].dtype == np.int32
+    assert data['large'].dtype == np.int64
+    assert data['int16'].dtype == np.int16
+    assert data['noise'].dtype == np.float64
+
+    compact_numeric(data, float32=True)
+    assert data['noise'].dtype == np.float32
+
+
+def test_percentiles_on_compact_data():
+    data = make_data()
+    compact, _ = compact_frame(data.copy())
+    metrics = ['noise', 'average_rx_rate']
+    expected = grouped_weighted_percentile(data, 'collection_time_agg', 'noise', metrics, [25, 75])
+    result = grouped_weighted_percentile(compact, 'collection_time_agg', 'noise', metrics, [25, 75])
+    assert list(result.index) == list(expected.index)
+    np.testing.assert_array_equal(result.values, expected.values)
+
+    compact, _ = compact_frame(data.copy(), float32=True)
+    result = grouped_weighted_percentile(compact, 'collection_time_agg', 'noise', metrics, [25, 75])
+    np.testing.assert_allclose(result.values, expected.values, rtol=1e-5)
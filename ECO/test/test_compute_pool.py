@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from callbacks import charts
+from callbacks.compute_pool import Cancelled, ComputePool, check_cancelled
+from data import datasets
+from data.result_store import make_handle
+
+
+def wait_for_cancel(marker, seconds=10):
+    """
+    写入 marker 表示已经开始，然后在检查点上等待被取消
+    """
+    open(marker, 'w').close()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        check_cancelled()
+        time.sleep(0.01)
+    return 'finished'
+
+
+def wait_for_file(path, seconds=30):
+    deadline = time.monotonic() + seconds
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert os.path.exists(path)
+
+
+@pytest.mark.parametrize('backend', ['inline', 'process'])
+def test_new_task_supersedes_running_task(backend, tmp_path):
+    pool = ComputePool(backend, workers=2, max_tasks=4)
+    marker = str(tmp_path / 'started')
+    outcome = {}
+
+    def first():
+        try:
+            outcome['first'] = pool.run(('session', 'noise'), wait_for_cancel, marker)
+        except Cancelled:
+            outcome['first'] = 'cancelled'
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    try:
+        wait_for_file(marker)
+        start = time.monotonic()
+        assert pool.run(('session', 'noise'), len, 'abc') == 3
+        thread.join(10)
+        assert outcome['first'] == 'cancelled'
+        assert time.monotonic() - start < 5
+        # 其他 key 的任务不受影响，标记位置被回收
+        assert pool.run(('session', 'rssi'), len, 'ab') == 2
+        assert len(pool._free_slots) == 4
+    finally:
+        pool.shutdown()
+
+
+def test_process_backend_reads_dataset_from_shared_store():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'collection_time_agg': np.repeat(['2024-09-01 00:00:00', '2024-09-01 01:00:00'], 50)})
+    for opt in charts.granularity_options['controller']['options']:
+        data[opt['value']] = rng.normal(100, 10, 100)
+    query = {'band': '2.4GHz', 'mode': 'exact', 'test': 'compute_pool'}
+    datasets.result_store.put(make_handle(query), data)
+    params = {
+        'query': query,
+        'metric_granularity': 'controller',
+        'sort_indicator': 'average_rx_rate',
+        'percents': [40, 60],
+        'agg_dimension': 'network',
+    }
+
+    pool = ComputePool('process', workers=1)
+    try:
+        for agg_dimension in ['network', 'time']:
+            expected = charts.compute_metric_figure({**params, 'agg_dimension': agg_dimension}, 'noise')
+            figure = pool.run(None, charts.compute_metric_figure, {**params, 'agg_dimension': agg_dimension}, 'noise')
+            assert figure['layout'] == expected['layout']
+            np.testing.assert_allclose(np.asarray(figure['data'][0]['y'], dtype=float),
+                                       np.asarray(expected['data'][0]['y'], dtype=float))
+    finally:
+        pool.shutdown()
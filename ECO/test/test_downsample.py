@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from callbacks.downsample import downsample_series, lttb, relayout_x_range
+
+
+def make_series(n=10000):
+    x = pd.Index(pd.date_range('2024-09-01', periods=n, freq='h').strftime('%Y-%m-%d %H:00:00'),
+                 name='collection_time_agg')
+    y = pd.Series(np.sin(np.arange(n) / 50.0), index=x)
+    y.iloc[1234] = 5.0  # 尖峰需要被保留
+    y.iloc[4000:4010] = np.nan
+    return x, y
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[500] = 10.0
+    selected = lttb(x, y, 50)
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert 500 in selected
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_downsample_budget_window_and_gaps():
+    x, y = make_series()
+    small_x, small_y = downsample_series(x[:100], y[:100], 2000)
+    assert len(small_x) == 100
+
+    dx, dy = downsample_series(x, y, 500)
+    assert len(dx) <= 510
+    assert dy.max() == 5.0
+    # 空缺处保留一个 NaN，折线在空缺处断开
+    assert dy.isna().sum() == 1
+
+    # 缩放窗口内点数不超过预算时为全分辨率
+    changed, x_range = relayout_x_range({'xaxis.range[0]': '2024-09-10 00:00:00',
+                                         'xaxis.range[1]': '2024-09-12 00:00:00'})
+    assert changed
+    wx, wy = downsample_series(x, y, 500, x_range)
+    assert wx[0] == '2024-09-09 23:00:00' and wx[-1] == '2024-09-12 01:00:00'
+    assert len(wx) == 51
+
+    assert relayout_x_range({'xaxis.autorange': True}) == (True, None)
+    assert relayout_x_range({'autosize': True}) == (False, None)
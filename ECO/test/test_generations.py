@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from callbacks.compute_pool import Cancelled, ComputePool, check_cancelled
+from callbacks.generations import Generations
+
+
+def test_newer_generation_supersedes_older():
+    generations = Generations(ttl=60)
+    first = generations.start('s1', 'graphs')
+    second = generations.start('s1', 'graphs')
+    assert second > first
+
+    generations.check('s1', 'graphs', second)
+    with pytest.raises(Cancelled):
+        generations.check('s1', 'graphs', first)
+    # 其他会话、其他范围以及没有会话的计算互不影响
+    generations.check('s2', 'graphs', first)
+    assert generations.is_current('s1', 'data', first)
+    assert generations.is_current(None, 'graphs', first)
+
+    # 其他 worker 分配的更新代数
+    assert generations.observe('s1', 'graphs', second + 1)
+    assert not generations.is_current('s1', 'graphs', second)
+
+
+def test_supersede_cancels_older_tasks_of_the_session():
+    pool = ComputePool('inline', max_tasks=4)
+    started = threading.Event()
+    outcome = {}
+
+    def wait_for_cancel():
+        started.set()
+        for _ in range(1000):
+            check_cancelled()
+            threading.Event().wait(0.01)
+        return 'finished'
+
+    def first():
+        try:
+            outcome['first'] = pool.run(('graph', 's1', 'noise'), wait_for_cancel, session='s1', generation=1)
+        except Cancelled:
+            outcome['first'] = 'cancelled'
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    started.wait(10)
+    pool.supersede('s2', 5)
+    pool.supersede('s1', 1)
+    assert thread.is_alive()
+    pool.supersede('s1', 2)
+    thread.join(10)
+    assert outcome['first'] == 'cancelled'
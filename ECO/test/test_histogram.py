@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from callbacks.histogram import percentile_histograms
+
+METRICS = ['average_rx_rate', 'noise', 'errors_rate', 'wan_bandwidth']
+
+
+def reference(data, sort_indicator, percents):
+    """
+    update_graphs 原有的 sort_values + iloc + pd.cut 实现
+    """
+    data = data.sort_values(by=sort_indicator)
+    lower_idx = int(np.floor(len(data) * (percents[0] / 100.0)))
+    upper_idx = int(np.ceil(len(data) * (percents[1] / 100.0)))
+    sliced_data = data.iloc[lower_idx:upper_idx].copy()
+
+    result = {}
+    for col in METRICS:
+        sliced_data[col] = sliced_data[col].astype(float)
+        min_val = np.floor(sliced_data[col].min())
+        max_val = np.ceil(sliced_data[col].max())
+        if min_val + 10e-8 > max_val:
+            intervals = [min_val - 1, min_val, min_val + 1]
+        else:
+            intervals = np.linspace(min_val, max_val, num=11)
+        counts = pd.cut(sliced_data[col], bins=intervals, right=True, include_lowest=True).value_counts().sort_index()
+        labels = []
+        for idx, interval in enumerate(counts.index):
+            if idx == 0:
+                labels.append(f"[{int(interval.left)}, {int(interval.right)}]")
+            else:
+                labels.append(f"({int(interval.left)}, {int(interval.right)}]")
+        result[col] = (labels, list(counts.values))
+    return result
+
+
+def make_data(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'average_rx_rate': rng.uniform(0, 1000, n),
+        'noise': rng.uniform(-100, 0, n),
+        'errors_rate': rng.integers(0, 20, n),
+        'wan_bandwidth': np.full(n, 300.0),
+    })
+
+
+@pytest.mark.parametrize('percents', [[0, 100], [50, 60], [0, 1], [99, 100], [33.3, 33.4], [50, 50]])
+def test_matches_reference(percents):
+    data = make_data(5003, 3)
+    expected = reference(data, 'average_rx_rate', percents)
+    assert percentile_histograms([data], 'average_rx_rate', METRICS, percents) == expected
+
+
+def test_chunks_match_single_frame():
+    data = make_data(4000, 5)
+    data['average_rx_rate'] = data['average_rx_rate'].round()  # 排序指标存在大量相等值
+    chunks = [data.iloc[i:i + 700] for i in range(0, len(data), 700)]
+
+    whole = percentile_histograms([data], 'average_rx_rate', METRICS, [20, 70])
+    assert percentile_histograms(chunks, 'average_rx_rate', METRICS, [20, 70]) == whole
+    assert sum(whole['noise'][1]) == 2000
@@ -0,0 +1,49 @@
+import json
+
+import dash
+from dash import html
+
+import instrumentation
+from instrumentation import record, stage, traced
+
+
+def test_disabled_returns_the_callback_unchanged(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'ECO_INSTRUMENTATION', False)
+
+    def callback():
+        with stage('load'):
+            record(rows=1)
+        return 'ok'
+
+    assert traced('callback')(callback) is callback
+    assert callback() == 'ok'
+
+
+def test_trace_is_logged_and_exported(monkeypatch, caplog):
+    monkeypatch.setattr(instrumentation, 'ECO_INSTRUMENTATION', True)
+    monkeypatch.setattr(instrumentation, 'metrics', instrumentation.Metrics())
+
+    @traced('update_graphs')
+    def callback():
+        with stage('fetch'):
+            record(rows=10, files=2, result_store_hit=False)
+        with stage('fetch'):
+            record(rows=5)
+        return 'ok'
+
+    with caplog.at_level('INFO', logger='eco.trace'):
+        assert callback() == 'ok'
+
+    trace = json.loads(caplog.records[-1].getMessage())
+    assert trace['callback'] == 'update_graphs'
+    assert trace['rows'] == 15
+    assert trace['result_store_hit'] is False
+    assert set(trace['stages']) == {'fetch'}
+
+    app = dash.Dash(__name__)
+    app.layout = html.Div()
+    instrumentation.init_app(app)
+    body = app.server.test_client().get('/metrics').get_data(as_text=True)
+    assert 'eco_callback_seconds_count{callback="update_graphs"} 1' in body
+    assert 'eco_stage_seconds_count{callback="update_graphs",stage="fetch"} 1' in body
+    assert 'eco_rows_total{callback="update_graphs"} 15' in body
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+import mock15
+from config.granularity_config import granularity_options
+
+
+def test_generate_partitions(tmp_path):
+    stats = mock15.generate(str(tmp_path), networks=5, start_date='2024-09-01', end_date='2024-09-02',
+                            chunk_networks=2)
+    # 5 个网络分 3 块，2 天，每块每天写 hourly/ 和 daily/ 各一个文件
+    assert stats['files'] == 3 * 2 * 2
+    assert stats['samples'] == 5 * 3 * 96 * 2
+
+    prefix = tmp_path / 'hourly' / 'controller_id' / 'controller' / 'dt=2024-09-01'
+    assert (prefix / '_SUCCESS').exists()
+    hourly = pd.read_parquet(prefix)
+    metric_cols = [opt['value'] for opt in granularity_options['controller']['options']]
+    assert list(hourly.columns) == ['controller_id', 'band', 'collection_time', 'collection_time_agg'] + metric_cols
+    assert len(hourly) == 5 * 3 * 24
+    assert hourly['controller_id'].nunique() == 5
+    first = hourly.iloc[1]
+    assert first['collection_time'] == int(pd.Timestamp('2024-09-01 01:00').timestamp())
+    assert first['collection_time_agg'] == '2024-09-01 01:00:00'
+
+    daily = pd.read_parquet(tmp_path / 'daily' / 'controller_id' / 'controller' / 'dt=2024-09-01')
+    expected = hourly.groupby(['controller_id', 'band'])[metric_cols].mean()
+    np.testing.assert_allclose(daily.set_index(['controller_id', 'band']).loc[expected.index, metric_cols],
+                               expected)
+    assert (daily['collection_time_agg'] == '2024-09-01').all()
+
+
+def test_rollup_chunk_matches_resample():
+    metric_cols = ['noise', 'errors_rate']
+    rng = np.random.default_rng(0)
+    baselines = mock15.chunk_baselines(3, metric_cols, rng)
+    samples = mock15.make_samples(3, ['2.4GHz', '5GHz'], metric_cols, baselines, rng)
+    hourly, daily = mock15.rollup_chunk(samples, metric_cols)
+
+    group = samples[(samples['network'] == 1) & (samples['band'] == 0)]
+    times = pd.date_range('2024-09-01', periods=len(group), freq='15min')
+    expected = group[metric_cols].set_index(times).resample('1h').mean()
+    actual = hourly[(hourly['network'] == 1) & (hourly['band'] == 0)]
+    np.testing.assert_allclose(actual[metric_cols].to_numpy(), expected.to_numpy())
+    assert len(daily) == 3 * 2
@@ -0,0 +1,53 @@
+import io
+import os
+
+import pandas as pd
+
+from data.parquet_cache import ParquetDiskCache
+
+
+def _parquet_bytes(n):
+    buffer = io.BytesIO()
+    pd.DataFrame({'value': range(n)}).to_parquet(buffer, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+def test_hit_miss_and_etag(tmp_path):
+    cache = ParquetDiskCache(str(tmp_path), max_bytes=10 * 1024 ** 2)
+    assert cache.get('bucket', 'a.parquet', '"v1"') is None
+
+    path = cache.put('bucket', 'a.parquet', '"v1"', _parquet_bytes(10))
+    assert cache.get('bucket', 'a.parquet', '"v1"') == path
+    assert cache.get('bucket', 'a.parquet', '"v2"') is None
+    assert cache.read_table(path).num_rows == 10
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['bytes_downloaded'] == os.path.getsize(path)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ParquetDiskCache(str(tmp_path), max_bytes=10 * 1024 ** 2)
+    paths = [cache.put('bucket', f'{i}.parquet', 'etag', _parquet_bytes(100)) for i in range(3)]
+    for i, path in enumerate(paths):
+        os.utime(path, (1000 + i, 1000 + i))
+    cache.get('bucket', '0.parquet', 'etag')
+
+    cache.max_bytes = 2 * os.path.getsize(paths[0])
+    cache.evict()
+
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+    assert os.path.exists(paths[2])
+
+
+def test_cache_dir_is_created_on_first_write(tmp_path):
+    cache_dir = tmp_path / 'parquet'
+    cache = ParquetDiskCache(str(cache_dir), max_bytes=10 * 1024 ** 2)
+    assert cache.get('bucket', 'a.parquet', 'etag') is None
+    cache.evict()
+    assert not cache_dir.exists()
+
+    assert os.path.exists(cache.put('bucket', 'a.parquet', 'etag', _parquet_bytes(10)))
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from callbacks.percentile import grouped_weighted_percentile, weighted_percentile
+
+METRICS = ['average_rx_rate', 'noise', 'errors_rate']
+
+
+def reference(data, sort_indicator, percents):
+    """
+    update_graphs 原有的 groupby().apply() 实现
+    """
+    def get_percentile_row(group):
+        sorter = np.argsort(group[sort_indicator].values)
+        if len(sorter) <= 2:
+            return pd.Series({col: np.nan for col in METRICS})
+        return pd.Series({col: weighted_percentile(group[col].values, percents, sorter) for col in METRICS})
+
+    return data.groupby('collection_time_agg').apply(get_percentile_row)
+
+
+def make_data(seed):
+    rng = np.random.default_rng(seed)
+    sizes = [1, 2, 3, 4, 7, 10, 57, 200]
+    keys = np.repeat([f'2024-09-07 {h:02d}:00:00' for h in range(len(sizes))], sizes)
+    n = len(keys)
+    data = pd.DataFrame({
+        'collection_time_agg': keys,
+        'average_rx_rate': rng.uniform(0, 1000, n),
+        'noise': rng.uniform(-100, 0, n),
+        'errors_rate': rng.integers(0, 5, n),
+    })
+    return data.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('percents', [
+    [0, 0], [0, 100], [50, 60], [50, 50], [10, 10.5], [33.3, 33.4], [99, 100], [0, 1], [25, 75], [100, 100],
+])
+def test_matches_reference(percents):
+    data = make_data(7)
+    expected = reference(data, 'average_rx_rate', percents)
+    result = grouped_weighted_percentile(data, 'collection_time_agg', 'average_rx_rate', METRICS, percents)
+
+    assert list(result.index) == list(expected.index)
+    np.testing.assert_allclose(result[METRICS].to_numpy(), expected[METRICS].to_numpy(dtype=float), rtol=1e-12, atol=1e-9)
+
+
+def test_nan_outside_window_does_not_leak():
+    data = make_data(11)
+    data.loc[data['collection_time_agg'] == data['collection_time_agg'].iloc[0], 'noise'] = np.nan
+    data.loc[5, 'errors_rate'] = np.nan
+    expected = reference(data, 'average_rx_rate', [40, 60])
+    result = grouped_weighted_percentile(data, 'collection_time_agg', 'average_rx_rate', METRICS, [40, 60])
+
+    np.testing.assert_allclose(result[METRICS].to_numpy(), expected[METRICS].to_numpy(dtype=float), rtol=1e-12, atol=1e-9)
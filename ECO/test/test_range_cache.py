@@ -0,0 +1,50 @@
+import pandas as pd
+
+from data.range_cache import RangeCache
+
+
+def make_loader(calls):
+    def loader(date_strs):
+        calls.append(list(date_strs))
+        return {date_str: pd.DataFrame({'dt': [date_str] * 2}) for date_str in date_strs if date_str != '2024-09-05'}
+    return loader
+
+
+def test_only_missing_partitions_are_loaded():
+    cache = RangeCache(ttl=60)
+    calls = []
+    loader = make_loader(calls)
+
+    data = cache.load('path', ['2024-09-01', '2024-09-02', '2024-09-03'], loader)
+    assert list(data['dt'].unique()) == ['2024-09-01', '2024-09-02', '2024-09-03']
+
+    # 向后平移一天：只读取新的一天，并修剪掉移出范围的分区
+    data = cache.load('path', ['2024-09-02', '2024-09-03', '2024-09-04'], loader)
+    assert calls == [['2024-09-01', '2024-09-02', '2024-09-03'], ['2024-09-04']]
+    assert list(data['dt'].unique()) == ['2024-09-02', '2024-09-03', '2024-09-04']
+    assert cache.covered('path') == ['2024-09-02', '2024-09-03', '2024-09-04']
+
+    # 缩小范围不需要读取
+    data = cache.load('path', ['2024-09-03'], loader)
+    assert len(calls) == 2
+    assert len(data) == 2
+
+
+def test_failed_partitions_are_retried():
+    cache = RangeCache(ttl=60)
+    calls = []
+    loader = make_loader(calls)
+
+    cache.load('path', ['2024-09-04', '2024-09-05'], loader)
+    cache.load('path', ['2024-09-04', '2024-09-05'], loader)
+    assert calls == [['2024-09-04', '2024-09-05'], ['2024-09-05']]
+
+
+def test_expired_partitions_are_reloaded():
+    cache = RangeCache(ttl=0)
+    calls = []
+    loader = make_loader(calls)
+
+    cache.load('path', ['2024-09-01'], loader)
+    cache.load('path', ['2024-09-01'], loader)
+    assert calls == [['2024-09-01'], ['2024-09-01']]
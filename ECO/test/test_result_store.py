@@ -0,0 +1,28 @@
+import pandas as pd
+
+from data.result_store import ResultStore, make_handle
+
+
+def test_handle_is_stable():
+    assert make_handle({'a': 1, 'b': 2}) == make_handle({'b': 2, 'a': 1})
+    assert make_handle({'a': 1}) != make_handle({'a': 2})
+
+
+def test_shared_dir_survives_process_cache_loss(tmp_path):
+    df = pd.DataFrame({'band': ['2.4GHz', '5GHz'], 'noise': [-50.0, -60.0]})
+    writer = ResultStore(ttl=60, maxsize=2, shared_dir=str(tmp_path), shared_max_bytes=10 * 1024 ** 2)
+    writer.put('h1', df)
+
+    reader = ResultStore(ttl=60, maxsize=2, shared_dir=str(tmp_path), shared_max_bytes=10 * 1024 ** 2)
+    pd.testing.assert_frame_equal(reader.get('h1'), df)
+    assert reader.get('missing') is None
+
+
+def test_shared_dir_is_created_on_first_write(tmp_path):
+    shared_dir = tmp_path / 'results'
+    store = ResultStore(ttl=60, maxsize=2, shared_dir=str(shared_dir), shared_max_bytes=10 * 1024 ** 2)
+    assert store.get('h1') is None
+    assert not shared_dir.exists()
+
+    store.put('h1', pd.DataFrame({'noise': [-50.0]}))
+    assert (shared_dir / 'h1.arrow').exists()
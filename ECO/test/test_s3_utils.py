@@ -0,0 +1,279 @@
+import pytest
+
+moto = pytest.importorskip('moto')
+
+from config.aws_config import get_s3_client
+from data.async_s3 import AsyncS3
+from data import s3_utils
+
+BUCKET = 'eco-test'
+PREFIX = 'eco/hourly/controller_id/controller'
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        client = get_s3_client()
+        client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr(s3_utils, 's3_client', client)
+        # moto 只拦截同步 client，这里固定使用线程池路径；原生异步路径见 FakeAioClient
+        async_s3 = AsyncS3(client, native=False)
+        monkeypatch.setattr(s3_utils, 'async_s3', async_s3)
+        s3_utils._listing_cache.clear()
+        yield client
+        s3_utils._listing_cache.clear()
+        async_s3.close()
+
+
+class FakeAioStream:
+    def __init__(self, data):
+        self.data = data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def read(self):
+        return self.data
+
+
+class FakeAioPaginator:
+    def __init__(self, paginator):
+        self.paginator = paginator
+
+    async def _pages(self, kwargs):
+        for page in self.paginator.paginate(**kwargs):
+            yield page
+
+    def paginate(self, **kwargs):
+        return self._pages(kwargs)
+
+
+class FakeAioClient:
+    """
+    按 aiobotocore client 的接口包装 moto 拦截的同步 client，用于测试 AsyncS3 的原生异步路径
+    """
+
+    def __init__(self, sync_client):
+        self.sync_client = sync_client
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get_paginator(self, name):
+        self.calls.append(name)
+        return FakeAioPaginator(self.sync_client.get_paginator(name))
+
+    async def get_object(self, **kwargs):
+        self.calls.append('get_object')
+        response = self.sync_client.get_object(**kwargs)
+        return {'Body': FakeAioStream(response['Body'].read()), 'ETag': response['ETag']}
+
+    async def head_object(self, **kwargs):
+        self.calls.append('head_object')
+        return self.sync_client.head_object(**kwargs)
+
+
+def test_listing_follows_continuation_token(s3):
+    for i in range(1005):
+        s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}/dt=2024-09-07/part-{i:05d}.parquet", Body=b'')
+
+    files = s3_utils.list_s3_files_by_date(BUCKET, PREFIX, '2024-09-07')
+    assert len(files) == 1005
+
+
+def test_iter_keys_by_dates(s3):
+    for date_str in ['2024-09-07', '2024-09-08']:
+        s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}/dt={date_str}/part-00000.parquet", Body=b'')
+
+    keys = list(s3_utils.iter_s3_keys_by_dates(BUCKET, PREFIX, ['2024-09-07', '2024-09-08', '2024-09-09']))
+    assert [date_str for date_str, _ in keys] == ['2024-09-07', '2024-09-08']
+
+
+def test_listing_is_cached(s3):
+    s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}/dt=2024-09-07/part-00000.parquet", Body=b'')
+    assert len(s3_utils.list_s3_files_by_date(BUCKET, PREFIX, '2024-09-07')) == 1
+
+    s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}/dt=2024-09-07/part-00001.parquet", Body=b'')
+    assert len(s3_utils.list_s3_files_by_date(BUCKET, PREFIX, '2024-09-07')) == 1
+
+    s3_utils._listing_cache.clear()
+    assert len(s3_utils.list_s3_files_by_date(BUCKET, PREFIX, '2024-09-07')) == 2
+
+
+def test_read_with_projection_and_pushdown(s3, monkeypatch, tmp_path):
+    import io
+    import pandas as pd
+    from data.parquet_cache import ParquetDiskCache
+
+    df = pd.DataFrame({
+        'collection_time': range(1000),
+        'band': ['2.4GHz', '5GHz'] * 500,
+        'noise': [-50.0] * 1000,
+        'unused': ['x'] * 1000,
+    })
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, row_group_size=100)
+    key = f"{PREFIX}/dt=2024-09-07/part-00000.parquet"
+    s3.put_object(Bucket=BUCKET, Key=key, Body=buffer.getvalue())
+
+    filters = [('collection_time', '>=', 200), ('collection_time', '<=', 299), ('band', '=', '5GHz')]
+    for cache in [None, ParquetDiskCache(str(tmp_path), 10 * 1024 ** 2)]:
+        monkeypatch.setattr(s3_utils, 'parquet_cache', cache)
+        result = s3_utils.read_s3_parquet(BUCKET, key, columns=['collection_time', 'band', 'noise', 'missing'], filters=filters)
+        assert list(result.columns) == ['collection_time', 'band', 'noise']
+        assert len(result) == 50
+        assert (result['band'] == '5GHz').all()
+
+
+def test_monthly_view_rolls_up_daily_partitions(s3, monkeypatch):
+    import io
+    import pandas as pd
+
+    monkeypatch.setenv('S3_BUCKET', BUCKET)
+    monkeypatch.setenv('S3_FIRST_LEVEL_PREFIX', 'eco/')
+    monkeypatch.setattr(s3_utils, 'parquet_cache', None)
+    monkeypatch.setattr(s3_utils, 'ROLLUP_WRITE_BACK', True)
+    s3_utils._rollup_cache.clear()
+
+    daily_prefix = 'eco/daily/controller_id/controller'
+    for day in pd.date_range('2024-08-01', '2024-09-02'):
+        df = pd.DataFrame({
+            'controller_id': ['c1', 'c2'],
+            'band': ['5GHz', '5GHz'],
+            'collection_time': [int(day.timestamp())] * 2,
+            'collection_time_agg': [day.strftime('%Y-%m-%d')] * 2,
+            'noise': [float(day.day), 10.0 * day.day],
+        })
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        s3.put_object(Bucket=BUCKET, Key=f"{daily_prefix}/dt={day:%Y-%m-%d}/part-00000.parquet", Body=buffer.getvalue())
+
+    start, end = pd.Timestamp('2024-08-15'), pd.Timestamp('2024-09-30 23:59:59')
+    data = s3_utils.get_s3_data(start, end, '1m', 'controller_id/controller', columns=['collection_time_agg', 'noise'])
+    assert list(data['collection_time_agg']) == ['2024-08-01', '2024-08-01', '2024-09-01', '2024-09-01']
+    assert list(data['noise']) == [16.0, 160.0, 1.5, 15.0]
+
+    # 已结束的周期写回为汇总分区，之后直接读取
+    rolled_keys = s3_utils.list_s3_files_by_date(BUCKET, 'eco/monthly/controller_id/controller', '2024-08')
+    assert rolled_keys == ['eco/monthly/controller_id/controller/dt=2024-08/part-00000.parquet']
+    s3_utils._rollup_cache.clear()
+    again = s3_utils.get_s3_data(start, end, '1m', 'controller_id/controller', columns=['collection_time_agg', 'noise'])
+    pd.testing.assert_frame_equal(again, data)
+    # 9 月还有没有数据的日期，不写回
+    assert s3_utils.list_s3_files_by_date(BUCKET, 'eco/monthly/controller_id/controller', '2024-09') == []
+
+
+def test_rollup_skips_period_with_corrupt_daily_partition(s3, monkeypatch):
+    import io
+    import pandas as pd
+
+    monkeypatch.setenv('S3_BUCKET', BUCKET)
+    monkeypatch.setenv('S3_FIRST_LEVEL_PREFIX', 'eco/')
+    monkeypatch.setattr(s3_utils, 'parquet_cache', None)
+    monkeypatch.setattr(s3_utils, 'ROLLUP_WRITE_BACK', True)
+    s3_utils._rollup_cache.clear()
+
+    daily_prefix = 'eco/daily/controller_id/controller'
+    for day in pd.date_range('2024-08-01', '2024-08-31'):
+        df = pd.DataFrame({
+            'controller_id': ['c1'],
+            'band': ['5GHz'],
+            'collection_time': [int(day.timestamp())],
+            'collection_time_agg': [day.strftime('%Y-%m-%d')],
+            'noise': [float(day.day)],
+        })
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        body = b'not parquet' if day.day == 15 else buffer.getvalue()
+        s3.put_object(Bucket=BUCKET, Key=f"{daily_prefix}/dt={day:%Y-%m-%d}/part-00000.parquet", Body=body)
+
+    start, end = pd.Timestamp('2024-08-01'), pd.Timestamp('2024-08-31 23:59:59')
+    data = s3_utils.get_s3_data(start, end, '1m', 'controller_id/controller', columns=['collection_time_agg', 'noise'])
+    assert data.empty
+    assert s3_utils.list_s3_files_by_date(BUCKET, 'eco/monthly/controller_id/controller', '2024-08') == []
+    assert len(s3_utils._rollup_cache) == 0
+    with pytest.raises(s3_utils.IncompletePeriodError):
+        s3_utils.rollup_s3_period(BUCKET, '1m', 'controller_id/controller', '2024-08')
+
+
+def test_rollup_collection_time_is_seconds():
+    import pandas as pd
+    from data.rollup import rollup_frame
+
+    df = pd.DataFrame({
+        'controller_id': ['c1', 'c1'],
+        'collection_time': [int(pd.Timestamp('2024-09-02').timestamp()), int(pd.Timestamp('2024-09-03').timestamp())],
+        'collection_time_agg': ['2024-09-02', '2024-09-03'],
+        'noise': [1.0, 3.0],
+    })
+    rolled = rollup_frame(df, '1w', ['controller_id', 'band'])
+    assert list(rolled['collection_time']) == [int(pd.Timestamp('2024-09-02').timestamp())]
+    assert list(rolled['noise']) == [2.0]
+
+
+def test_rollup_keeps_numeric_ids_as_keys():
+    import pandas as pd
+    from data.rollup import rollup_frame
+
+    df = pd.DataFrame({
+        'controller_id': [1, 2, 1, 2],
+        'band': ['5GHz'] * 4,
+        'collection_time': [int(pd.Timestamp('2024-09-02').timestamp())] * 2
+                           + [int(pd.Timestamp('2024-09-03').timestamp())] * 2,
+        'collection_time_agg': ['2024-09-02'] * 2 + ['2024-09-03'] * 2,
+        'noise': [1.0, 10.0, 3.0, 30.0],
+    })
+    rolled = rollup_frame(df, '1w', ['controller_id', 'band'])
+    assert list(rolled['controller_id']) == [1, 2]
+    assert list(rolled['noise']) == [2.0, 20.0]
+
+
+@pytest.mark.parametrize('native', [False, True])
+def test_async_reads_match_sync_reads(s3, tmp_path, native):
+    import io
+    import numpy as np
+    import pandas as pd
+    from data.parquet_cache import ParquetDiskCache
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'collection_time': np.arange(20000),
+        'band': rng.choice(['2.4GHz', '5GHz'], 20000),
+        'noise': rng.uniform(-100, 0, 20000),
+        'unused': rng.uniform(0, 1, 20000),
+    })
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, row_group_size=2000)
+    key = f"{PREFIX}/dt=2024-09-07/part-00000.parquet"
+    s3.put_object(Bucket=BUCKET, Key=key, Body=buffer.getvalue())
+    s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}/dt=2024-09-07/broken.parquet", Body=b'not parquet')
+
+    aio_client = FakeAioClient(s3)
+    async_s3 = AsyncS3(s3, native=True, aio_client_factory=lambda _: aio_client) if native else s3_utils.async_s3
+    objects = async_s3.list_objects_many(BUCKET, [f"{PREFIX}/dt=2024-09-07/"])[0]
+    assert sorted(obj['Key'] for obj in objects) == sorted([key, f"{PREFIX}/dt=2024-09-07/broken.parquet"])
+
+    columns = ['collection_time', 'noise']
+    filters = [('collection_time', '>=', 4500), ('collection_time', '<=', 9999), ('band', '=', '5GHz')]
+    expected = df[(df['collection_time'] >= 4500) & (df['collection_time'] <= 9999) & (df['band'] == '5GHz')][columns]
+    for cache in [None, ParquetDiskCache(str(tmp_path), 10 * 1024 ** 2)]:
+        results = async_s3.read_parquet_many(BUCKET, sorted(objects, key=lambda obj: obj['Key']), cache, columns, filters)
+        assert results[0] is None
+        pd.testing.assert_frame_equal(results[1], expected.reset_index(drop=True))
+
+        # 不经 head_object 读取大小和 ETag 时同样一致
+        results = async_s3.read_parquet_many(BUCKET, [{'Key': key}], cache, columns, filters)
+        pd.testing.assert_frame_equal(results[0], expected.reset_index(drop=True))
+    if native:
+        assert {'list_objects_v2', 'get_object', 'head_object'} <= set(aio_client.calls)
+        async_s3.close()
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from data.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_load():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.2)
+        return object()
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('query', load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+
+def test_errors_reach_waiters_and_are_not_cached():
+    flight = SingleFlight()
+    errors = []
+
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError('S3 unavailable')
+
+    def call():
+        try:
+            flight.do('query', fail)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 4
+    assert flight.do('query', lambda: 'loaded') == 'loaded'
+
+
+def _worker(lock_dir, shared_path, counter_path):
+    def load():
+        with open(counter_path, 'a') as f:
+            f.write('x')
+        time.sleep(0.3)
+        with open(shared_path, 'w') as f:
+            f.write('dataset')
+        return 'dataset'
+
+    def check():
+        return open(shared_path).read() if os.path.exists(shared_path) else None
+
+    SingleFlight(lock_dir).do('query', load, check)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='需要 fork')
+def test_workers_on_one_host_share_one_load(tmp_path):
+    ctx = multiprocessing.get_context('fork')
+    args = (str(tmp_path / 'locks'), str(tmp_path / 'shared'), str(tmp_path / 'counter'))
+    processes = [ctx.Process(target=_worker, args=args) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert all(process.exitcode == 0 for process in processes)
+    assert (tmp_path / 'counter').read_text() == 'x'
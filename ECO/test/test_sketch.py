@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from callbacks.percentile import grouped_weighted_percentile
+from data.sketch import ALL_BANDS, build_sketch, query_sketch
+
+METRICS = ['average_rx_rate', 'noise']
+
+
+def make_data(seed):
+    rng = np.random.default_rng(seed)
+    n = 600
+    return pd.DataFrame({
+        'collection_time_agg': rng.choice([f'2024-09-07 {h:02d}:00:00' for h in range(5)], n),
+        'band': rng.choice(['2.4GHz', '5GHz'], n),
+        'average_rx_rate': rng.uniform(0, 1000, n),
+        'noise': rng.uniform(-100, 0, n),
+    })
+
+
+@pytest.mark.parametrize('percents', [[0, 100], [25, 75], [10, 11], [0, 1], [99, 100]])
+def test_integer_percentiles_match_exact(percents):
+    data = make_data(0)
+    sketch = build_sketch(data, ['noise'], METRICS)
+    for band in [None, '5GHz']:
+        subset = data if band is None else data[data['band'] == band]
+        expected = grouped_weighted_percentile(subset, 'collection_time_agg', 'noise', METRICS, percents)
+        result = query_sketch(sketch, 'noise', METRICS, percents, band=band)
+        pd.testing.assert_frame_equal(result, expected, check_names=False, check_index_type=False, rtol=1e-9)
+
+
+def test_all_bands_group_without_band_column():
+    data = make_data(1).drop(columns='band')
+    sketch = build_sketch(data, ['noise'], METRICS)
+    assert set(sketch['band']) == {ALL_BANDS}
+    assert sketch['n'].sum() == len(data) * len(METRICS)
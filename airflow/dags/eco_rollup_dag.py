@@ -0,0 +1,35 @@
+from airflow import DAG
+from airflow.operators.bash_operator import BashOperator
+from airflow.utils.dates import days_ago
+from datetime import timedelta
+import os
+
+default_args = {
+    'owner': 'airflow',
+    'depends_on_past': False,
+    'email_on_failure': False,
+    'email_on_retry': False,
+    'retries': 1,
+    'retry_delay': timedelta(minutes=5),
+}
+
+# ECO 项目目录，需要在 Airflow worker 上可访问，并已安装 ECO/requirements.txt
+eco_home = os.getenv('ECO_HOME', '/opt/eco')
+
+dag = DAG(
+    'eco_rollups',
+    default_args=default_args,
+    description='Build weekly/monthly/quarterly/yearly roll-ups from the ECO daily partitions',
+    schedule_interval='@daily',
+    start_date=days_ago(1),
+    catchup=False,
+)
+
+# 每天重建包含调度日期的各周期汇总，{{ ds }} 为调度日期
+build_rollups = BashOperator(
+    task_id='build_rollups',
+    bash_command=f'cd {eco_home} && python -m jobs.build_rollups --date {{{{ ds }}}}',
+    dag=dag,
+)
+
+build_rollups
@@ -0,0 +1,35 @@
+from airflow import DAG
+from airflow.operators.bash_operator import BashOperator
+from airflow.utils.dates import days_ago
+from datetime import timedelta
+import os
+
+default_args = {
+    'owner': 'airflow',
+    'depends_on_past': False,
+    'email_on_failure': False,
+    'email_on_retry': False,
+    'retries': 1,
+    'retry_delay': timedelta(minutes=5),
+}
+
+# ECO 项目目录，需要在 Airflow worker 上可访问，并已安装 ECO/requirements.txt
+eco_home = os.getenv('ECO_HOME', '/opt/eco')
+
+dag = DAG(
+    'eco_percentile_sketch',
+    default_args=default_args,
+    description='Build percentile sketches next to the ECO hourly/daily partitions',
+    schedule_interval='@daily',
+    start_date=days_ago(1),
+    catchup=False,
+)
+
+# 每天为前一天的分区生成草图，{{ ds }} 为调度日期
+build_sketches = BashOperator(
+    task_id='build_sketches',
+    bash_command=f'cd {eco_home} && python -m jobs.build_sketches --date {{{{ ds }}}}',
+    dag=dag,
+)
+
+build_sketches
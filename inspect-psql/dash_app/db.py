@@ -0,0 +1,314 @@
+import os
+
+import pandas as pd
+from eco_percentile import bucket_ids, percentile_bands
+from sqlalchemy import column, create_engine, select, table, text
+from sqlalchemy.engine import URL
+
+# 连接配置，与 compose.yml 中的环境变量一致
+POSTGRES_USER = os.getenv("POSTGRES_USER", "superset")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "superset")
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "superset-postgres-1")
+POSTGRES_PORT = int(os.getenv("POSTGRES_PORT", "5432"))
+POSTGRES_DB = os.getenv("POSTGRES_DB", "qoe")
+
+# 连接池配置：每个 Dash 进程最多 POOL_SIZE + MAX_OVERFLOW 个连接，取用前检查连接是否仍然可用
+POSTGRES_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "5"))
+POSTGRES_MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW", "10"))
+POSTGRES_POOL_RECYCLE = int(os.getenv("POSTGRES_POOL_RECYCLE", "1800"))
+POSTGRES_STATEMENT_TIMEOUT_MS = int(os.getenv("POSTGRES_STATEMENT_TIMEOUT_MS", "60000"))
+
+# 服务端游标每次取回的行数
+QUERY_CHUNK_ROWS = int(os.getenv("QUERY_CHUNK_ROWS", "50000"))
+
+# 行数少于该值的时间桶结果为空。默认 1：与原来逐桶 resample 的结果一致，只有一两行的桶也照常绘制；
+# 设为 3 时与 inspect 和 eco_percentile.MIN_COUNT 一致，行数太少的桶不绘制
+BAND_MIN_COUNT = int(os.getenv("BAND_MIN_COUNT", "1"))
+
+# 根据时间粒度选择对应的表
+TABLE_MAP = {
+    '15min': ('qoe', 'ap_data_15min_avg'),
+    '1h': ('qoe', 'ap_data_1h_avg'),
+    '1d': ('qoe', 'ap_data_1d_avg'),
+    '7d': ('qoe', 'ap_data_7d_avg')
+}
+
+# 可以查询的数值指标列；bandwidth 为 '20MHz' 这样的文本，不属于指标
+METRIC_COLUMNS = [
+    'wan_throughput',
+    'client_online',
+    'airtime_utilization',
+    'congestion_rate',
+    'noise',
+    'packet_error_rate'
+]
+
+
+def make_engine():
+    """
+    创建带连接池的 engine，连接参数来自 POSTGRES_* 环境变量
+    """
+    url = URL.create(
+        'postgresql+psycopg2',
+        username=POSTGRES_USER,
+        password=POSTGRES_PASSWORD,
+        host=POSTGRES_HOST,
+        port=POSTGRES_PORT,
+        database=POSTGRES_DB,
+    )
+    return create_engine(
+        url,
+        pool_size=POSTGRES_POOL_SIZE,
+        max_overflow=POSTGRES_MAX_OVERFLOW,
+        pool_recycle=POSTGRES_POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args={'options': f'-c statement_timeout={POSTGRES_STATEMENT_TIMEOUT_MS}'},
+    )
+
+
+def build_window_query(granularity, start_datetime, end_datetime, region='all', band='all', metrics=None,
+                       ordered=False):
+    """
+    构造时间窗口查询：表名和列名只能取白名单中的值，其余条件都通过绑定参数传入
+    :param metrics: 需要的指标列，默认全部
+    :param ordered: 是否按 utc_time 排序返回
+    """
+    if granularity not in TABLE_MAP:
+        raise ValueError(f"Invalid granularity: {granularity}")
+    metrics = list(metrics or METRIC_COLUMNS)
+    unknown = [metric for metric in metrics if metric not in METRIC_COLUMNS]
+    if unknown:
+        raise ValueError(f"Invalid metrics: {unknown}")
+
+    schema, name = TABLE_MAP[granularity]
+    utc_time = column('utc_time')
+    source = table(name, utc_time, column('region'), column('band'), *[column(metric) for metric in metrics],
+                   schema=schema)
+    query = select(source.c.utc_time, *[source.c[metric] for metric in metrics]).where(
+        source.c.utc_time.between(start_datetime, end_datetime)
+    )
+    if region != 'all':
+        query = query.where(source.c.region == region)
+    if band != 'all':
+        query = query.where(source.c.band == band)
+    if ordered:
+        query = query.order_by(source.c.utc_time)
+    return query
+
+
+def iter_query_chunks(engine, query, chunksize=QUERY_CHUNK_ROWS):
+    """
+    用服务端游标分块读取查询结果，驱动层每次只缓存 chunksize 行
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        for chunk in pd.read_sql(query, conn, chunksize=chunksize):
+            yield chunk
+
+
+def to_float_metrics(data):
+    """
+    把指标列转为 float64，其余列保持原样
+    NUMERIC 列会以 Decimal 返回，全为 NULL 的块会被推断为 object，统一类型后拼接结果才一致
+    """
+    for col in data.columns:
+        if col in METRIC_COLUMNS:
+            data[col] = pd.to_numeric(data[col]).astype('float64')
+    return data
+
+
+def read_window(engine, granularity, start_datetime, end_datetime, region='all', band='all', metrics=None,
+                chunksize=QUERY_CHUNK_ROWS):
+    """
+    读取时间窗口内的全部行，内存随窗口大小增长，只用于小窗口和测试；页面上按块归约见 read_window_bands
+    :return: 以 utc_time 为索引、指标为列的 DataFrame
+    """
+    metrics = list(metrics or METRIC_COLUMNS)
+    query = build_window_query(granularity, start_datetime, end_datetime, region, band, metrics)
+    chunks = []
+    for chunk in iter_query_chunks(engine, query, chunksize):
+        chunk['utc_time'] = pd.to_datetime(chunk['utc_time'])
+        chunks.append(to_float_metrics(chunk.set_index('utc_time')))
+    if not chunks:
+        return pd.DataFrame(columns=metrics, index=pd.DatetimeIndex([], name='utc_time'), dtype='float64')
+    return pd.concat(chunks)
+
+
+def read_window_bands(engine, granularity, start_datetime, end_datetime, sort_indicator, percents, region='all',
+                      band='all', metrics=None, origin=None, min_count=BAND_MIN_COUNT, decimals=2,
+                      chunksize=QUERY_CHUNK_ROWS):
+    """
+    在 pandas 中计算百分位带，但不保留整个时间窗口：按 utc_time 顺序分块读取，
+    每块到达后立即把已经完整的时间桶归约为一行，只有最后一个可能还未读完的桶留到下一块，
+    内存上限约为 chunksize 行加一个时间桶的行数
+    :param metrics: 需要的指标列，默认全部；排序指标不在其中时也会一并读取
+    :param origin: 分桶的起点，默认取起始时间当天 00:00，与 read_percentile_bands 一致
+    :return: 与 read_percentile_bands 相同的 DataFrame
+    """
+    metrics = list(metrics or METRIC_COLUMNS)
+    columns = metrics if sort_indicator in metrics else metrics + [sort_indicator]
+    origin = pd.Timestamp(origin if origin is not None else pd.Timestamp(start_datetime).normalize())
+    query = build_window_query(granularity, start_datetime, end_datetime, region, band, columns, ordered=True)
+
+    def reduce(rows):
+        return percentile_bands(rows, granularity, sort_indicator, percents, metrics, origin, min_count)
+
+    reduced = []
+    pending = None
+    for chunk in iter_query_chunks(engine, query, chunksize):
+        chunk['utc_time'] = pd.to_datetime(chunk['utc_time'])
+        chunk = to_float_metrics(chunk.set_index('utc_time'))
+        if pending is not None:
+            chunk = pd.concat([pending, chunk])
+        buckets, _, _ = bucket_ids(chunk.index, granularity, origin)
+        # 结果按时间排序，除最后一个桶外都已读完
+        complete = buckets < buckets[-1]
+        if complete.any():
+            reduced.append(reduce(chunk[complete]))
+        pending = chunk[~complete]
+    if pending is not None:
+        reduced.append(reduce(pending))
+
+    if not reduced:
+        return pd.DataFrame(columns=metrics, index=pd.DatetimeIndex([], name='utc_time'), dtype='float64')
+    data = pd.concat(reduced)
+    # 相邻两块之间没有数据的桶补为 NaN 行
+    buckets = pd.date_range(data.index.min(), data.index.max(), freq=pd.Timedelta(BUCKET_STRIDES[granularity]),
+                            name='utc_time')
+    data = data.reindex(buckets)
+    return data if decimals is None else data.round(decimals)
+
+
+# 各时间粒度的分桶宽度，与 pandas resample 的粒度一致
+BUCKET_STRIDES = {
+    '15min': pd.Timedelta(minutes=15).to_pytimedelta(),
+    '1h': pd.Timedelta(hours=1).to_pytimedelta(),
+    '1d': pd.Timedelta(days=1).to_pytimedelta(),
+    '7d': pd.Timedelta(days=7).to_pytimedelta()
+}
+
+# 每个时间桶内按排序指标编号，再按 eco_percentile.weighted_percentile 的规则给每一行分配权重：
+# 补边后的第 i 个值对应第 clamp(i, 1, n) 行，两端的非完整段按覆盖比例加权，中间整段权重为 1，
+# 区间退化为单个点时取对应的一行（或相邻两行的均值），最终每个时间桶每个指标只返回一个值。
+# 与 pandas 一样，被引用到的行（包括权重为 0 的端点）中有 NULL 时结果为 NULL
+PERCENTILE_BANDS_SQL = """
+WITH ranked AS (
+    SELECT date_bin(:stride, utc_time, :origin) AS bucket,
+           {metric_cols},
+           ROW_NUMBER() OVER w AS r,
+           COUNT(*) OVER (PARTITION BY date_bin(:stride, utc_time, :origin)) AS n
+    FROM {table_name}
+    WHERE {conditions}
+    WINDOW w AS (PARTITION BY date_bin(:stride, utc_time, :origin) ORDER BY {sort_indicator} ASC NULLS LAST)
+),
+bounds AS (
+    SELECT *,
+           CAST(:p0 AS double precision) / 100 * n AS lo,
+           CAST(:p1 AS double precision) / 100 * n AS hi
+    FROM ranked
+),
+positions AS (
+    SELECT *,
+           floor(lo) AS lo_floor,
+           floor(hi) AS hi_floor,
+           ceil(lo) AS lo_ceil
+    FROM bounds
+),
+weighted AS (
+    SELECT *,
+           CASE
+               WHEN lo_floor = hi_floor AND hi - lo < 10e-8 THEN
+                   0.5 * (CASE WHEN LEAST(GREATEST(lo_floor, 1), n) = r THEN 1 ELSE 0 END)
+                   + 0.5 * (CASE WHEN LEAST(GREATEST(lo_floor + 1, 1), n) = r THEN 1 ELSE 0 END)
+               WHEN lo_floor = hi_floor THEN
+                   CASE WHEN LEAST(GREATEST(lo_ceil, 1), n) = r THEN 1 ELSE 0 END
+               ELSE
+                   (lo_ceil - lo) * (CASE WHEN LEAST(GREATEST(lo_ceil, 1), n) = r THEN 1 ELSE 0 END)
+                   + (hi - hi_floor) * (CASE WHEN LEAST(GREATEST(hi_floor + 1, 1), n) = r THEN 1 ELSE 0 END)
+                   + (CASE WHEN r BETWEEN lo_ceil + 1 AND hi_floor THEN 1 ELSE 0 END)
+           END AS weight,
+           CASE
+               WHEN lo_floor = hi_floor AND hi - lo < 10e-8 THEN
+                   r IN (LEAST(GREATEST(lo_floor, 1), n), LEAST(GREATEST(lo_floor + 1, 1), n))
+               WHEN lo_floor = hi_floor THEN
+                   r = LEAST(GREATEST(lo_ceil, 1), n)
+               ELSE
+                   r IN (LEAST(GREATEST(lo_ceil, 1), n), LEAST(GREATEST(hi_floor + 1, 1), n))
+                   OR r BETWEEN lo_ceil + 1 AND hi_floor
+           END AS touched,
+           CASE WHEN lo_floor = hi_floor THEN 1 ELSE hi - lo END AS width
+    FROM positions
+)
+SELECT bucket AS utc_time,
+       {band_values}
+FROM weighted
+WHERE touched
+GROUP BY bucket
+ORDER BY bucket
+"""
+
+# 与 pandas 一致：行数少于 min_count 的时间桶、区间内有 NULL 时结果为 NULL
+BAND_VALUE_SQL = ("CASE WHEN MAX(n) < :min_count OR bool_or({metric} IS NULL) THEN NULL "
+                  "ELSE SUM(weight * {metric}) / MAX(width) END AS {metric}")
+
+
+def build_percentile_bands_query(granularity, start_datetime, end_datetime, sort_indicator, percents, region='all',
+                                 band='all', metrics=None, origin=None, min_count=BAND_MIN_COUNT):
+    """
+    构造在 PostgreSQL 中计算百分位带的查询，每个时间桶返回一行
+    :param origin: 分桶的起点，默认取起始时间当天 00:00；起始当天有数据时与 pandas resample 的 origin='start_day' 一致
+    :param min_count: 行数少于该值的时间桶结果为 NULL，默认 BAND_MIN_COUNT
+    """
+    metrics = list(metrics or METRIC_COLUMNS)
+    for name in metrics + [sort_indicator]:
+        if name not in METRIC_COLUMNS:
+            raise ValueError(f"Invalid metric: {name}")
+    if granularity not in TABLE_MAP:
+        raise ValueError(f"Invalid granularity: {granularity}")
+
+    conditions = ['utc_time BETWEEN :start_datetime AND :end_datetime']
+    params = {
+        'stride': BUCKET_STRIDES[granularity],
+        'origin': pd.Timestamp(origin if origin is not None else pd.Timestamp(start_datetime).normalize()).to_pydatetime(),
+        'start_datetime': pd.Timestamp(start_datetime).to_pydatetime(),
+        'end_datetime': pd.Timestamp(end_datetime).to_pydatetime(),
+        'p0': float(percents[0]),
+        'p1': float(percents[1]),
+        'min_count': int(min_count),
+    }
+    if region != 'all':
+        conditions.append('region = :region')
+        params['region'] = region
+    if band != 'all':
+        conditions.append('band = :band')
+        params['band'] = band
+
+    sql = PERCENTILE_BANDS_SQL.format(
+        metric_cols=', '.join(metrics),
+        table_name='.'.join(TABLE_MAP[granularity]),
+        conditions=' AND '.join(conditions),
+        sort_indicator=sort_indicator,
+        band_values=',\n       '.join(BAND_VALUE_SQL.format(metric=metric) for metric in metrics),
+    )
+    return text(sql), params
+
+
+def read_percentile_bands(engine, granularity, start_datetime, end_datetime, sort_indicator, percents, region='all',
+                          band='all', metrics=None, origin=None, min_count=BAND_MIN_COUNT, decimals=2):
+    """
+    在数据库中计算百分位带，只取回每个时间桶一行
+    :return: 以 utc_time 为索引、指标为列的 DataFrame，与 eco_percentile.percentile_bands 的结果一致，
+             首尾两个有数据的时间桶之间没有数据的桶为 NaN 行
+    """
+    query, params = build_percentile_bands_query(granularity, start_datetime, end_datetime, sort_indicator, percents,
+                                                 region, band, metrics, origin, min_count)
+    with engine.connect() as conn:
+        data = pd.read_sql(query, conn, params=params)
+    data['utc_time'] = pd.to_datetime(data['utc_time'])
+    data = to_float_metrics(data.set_index('utc_time'))
+    if not data.empty:
+        # SQL 只返回有数据的桶，补齐中间的空桶
+        buckets = pd.date_range(data.index.min(), data.index.max(), freq=pd.Timedelta(BUCKET_STRIDES[granularity]),
+                                name='utc_time')
+        data = data.reindex(buckets)
+    return data if decimals is None else data.round(decimals)
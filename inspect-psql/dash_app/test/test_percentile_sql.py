@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from eco_percentile import percentile_bands
+
+import db
+
+POSTGRES_TEST_DSN = os.getenv("POSTGRES_TEST_DSN")
+TEST_SCHEMA = f"qoe_test_{os.getpid()}"
+
+pytestmark = pytest.mark.skipif(not POSTGRES_TEST_DSN, reason="需要设置 POSTGRES_TEST_DSN 指向本地 PostgreSQL（14 及以上）")
+
+
+@pytest.fixture(scope='module')
+def engine():
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(POSTGRES_TEST_DSN)
+    rng = np.random.default_rng(0)
+    rows = 8000
+    # 与线上表相同的列：bandwidth 为文本，部分指标为 NULL
+    data = pd.DataFrame({
+        'utc_time': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 96 * 6, rows) * 15, unit='min'),
+        'region': rng.choice(['use1', 'aps1'], rows),
+        'band': rng.choice(['2.4g', '5g'], rows),
+        'ap_id': rng.choice([f'ap{i}' for i in range(50)], rows),
+        'bandwidth': rng.choice(['20MHz', '40MHz', '80MHz', '160MHz'], rows),
+    })
+    for col in db.METRIC_COLUMNS:
+        data[col] = rng.normal(100, 30, rows)
+    for col, count in [('noise', 40), ('client_online', 40), ('packet_error_rate', 10)]:
+        data.loc[rng.choice(rows, count, replace=False), col] = np.nan
+    # 2024-01-03 整天没有数据，各粒度都有空的时间桶
+    data = data[data['utc_time'].dt.floor('D') != pd.Timestamp('2024-01-03')]
+
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+    for granularity in db.TABLE_MAP:
+        data.to_sql(f"ap_data_{granularity}_avg", engine, schema=TEST_SCHEMA, index=False)
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {TEST_SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def test_tables(monkeypatch):
+    monkeypatch.setattr(db, 'TABLE_MAP', {granularity: (TEST_SCHEMA, f"ap_data_{granularity}_avg")
+                                          for granularity in db.TABLE_MAP})
+
+
+@pytest.mark.parametrize('granularity', ['15min', '1h', '1d', '7d'])
+@pytest.mark.parametrize('percents', [[50, 60], [0, 100], [33.3, 33.31], [10, 10], [99.5, 100]])
+def test_sql_bands_match_pandas(engine, granularity, percents):
+    start, end = pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-05 12:00')
+    data = db.read_window(engine, granularity, start, end, 'use1', '5g')
+    expected = percentile_bands(data, granularity, 'wan_throughput', percents, db.METRIC_COLUMNS,
+                                min_count=db.BAND_MIN_COUNT, decimals=None)
+
+    result = db.read_percentile_bands(engine, granularity, start, end, 'wan_throughput', percents, 'use1', '5g',
+                                      decimals=None)
+    assert list(result.index) == list(expected.index)
+    if granularity != '7d':
+        # 空的时间桶作为 NaN 行保留
+        assert expected.isna().all(axis=1).any()
+    np.testing.assert_allclose(result[db.METRIC_COLUMNS].to_numpy(), expected[db.METRIC_COLUMNS].to_numpy(),
+                               rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('granularity', ['15min', '1h', '1d', '7d'])
+@pytest.mark.parametrize('chunksize', [7, 500, 100000])
+def test_chunked_bands_match_full_window(engine, granularity, chunksize):
+    start, end = pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-05 12:00')
+    metrics = ['noise', 'packet_error_rate']
+    data = db.read_window(engine, granularity, start, end, 'use1', '5g')
+    expected = percentile_bands(data, granularity, 'wan_throughput', [20, 80], metrics,
+                                min_count=db.BAND_MIN_COUNT, decimals=None)
+
+    result = db.read_window_bands(engine, granularity, start, end, 'wan_throughput', [20, 80], 'use1', '5g',
+                                  metrics=metrics, decimals=None, chunksize=chunksize)
+    assert list(result.columns) == metrics
+    assert list(result.index) == list(expected.index)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-9)
+
+
+def test_sparse_buckets_are_kept_by_default(engine):
+    start, end = pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-05 12:00')
+    data = db.read_window(engine, '15min', start, end, 'use1', '5g')
+    counts = data.groupby(data.index).size()
+    sparse = counts.index[counts < 3]
+    assert len(sparse) > 0
+
+    # 默认与原来逐桶 resample 一样，只有一两行的桶也有结果
+    for read in (db.read_percentile_bands, db.read_window_bands):
+        result = read(engine, '15min', start, end, 'wan_throughput', [50, 60], 'use1', '5g')
+        assert result.loc[sparse, 'wan_throughput'].notna().all()
+
+        result = read(engine, '15min', start, end, 'wan_throughput', [50, 60], 'use1', '5g', min_count=3)
+        assert result.loc[sparse, 'wan_throughput'].isna().all()
@@ -1,14 +1,21 @@
+import logging
+
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Input, Output, State
 import pandas as pd
 import numpy as np
+from eco_percentile import percentile_bands
+
+from store import TimeSeriesStore
 
-# 读取CSV数据
-df_15min = pd.read_csv('data_15min.csv')
-df_1h = pd.read_csv('data_1h_avg.csv')
-df_1d = pd.read_csv('data_1d_avg.csv')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# 读取CSV数据：首次启动时转换为按 (region, band, utc_time) 排序的 Feather 文件，之后直接内存映射
+store_15min = TimeSeriesStore('data_15min.csv')
+store_1h = TimeSeriesStore('data_1h_avg.csv')
+store_1d = TimeSeriesStore('data_1d_avg.csv')
 
 # 创建 Dash 应用
 app = dash.Dash(__name__)
@@ -168,21 +175,14 @@ def update_graphs(region, band, start_date, start_time, groups, granularity, sor
 
     # 根据时间粒度选择对应的数据源
     if granularity == '15min':
-        data = df_15min.copy()
+        store = store_15min
     elif granularity == '1h':
-        data = df_1h.copy()
+        store = store_1h
     elif granularity == '1d' or granularity == '7d':
-        data = df_1d.copy()
-
-    # 过滤数据
-    data['utc_time'] = pd.to_datetime(data['utc_time'])
-    data = data[(data['utc_time'] >= start_datetime) & (data['utc_time'] <= end_datetime)]
+        store = store_1d
 
-    if region:
-        data = data[data['region'] == region]
-
-    if band:
-        data = data[data['band'] == band]
+    # 过滤数据：按 region、band 和时间窗口定位行范围，只取出窗口内的行
+    data = store.window(start_datetime, end_datetime, region, band)
 
     if data.empty:
         return [[], "", time_input_style]
@@ -195,47 +195,8 @@ def update_graphs(region, band, start_date, start_time, groups, granularity, sor
     numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
     data = data.set_index('utc_time')
 
-    # 计算加权平均
-    def weighted_percentile(data, percents, sorter):
-        print(f"Data: {data}")
-        print(f"Percents: {percents}")
-
-        num_points = len(data)
-        pad_data = np.pad(data[sorter], pad_width=(1, 1), mode='edge')
-
-        lower_percentile = percents[0] / 100 * num_points
-        upper_percentile = percents[1] / 100 * num_points
-
-        lower_floor = int(np.floor(lower_percentile))
-        upper_floor = int(np.floor(upper_percentile))
-        lower_ceil = int(np.ceil(lower_percentile))
-        upper_ceil = int(np.ceil(upper_percentile))
-
-        if lower_floor == upper_floor:
-            if upper_percentile - lower_percentile < 10e-8:
-                return (pad_data[lower_floor] + pad_data[lower_floor + 1]) / 2
-            return pad_data[lower_ceil]
-
-        lower_weight = lower_ceil - lower_percentile
-        upper_weight = upper_percentile - upper_floor
-        all_value = lower_weight * pad_data[lower_ceil] + upper_weight * pad_data[upper_floor + 1]
-
-        for index in range(lower_ceil + 1, upper_floor + 1):
-            all_value = all_value + pad_data[index]
-
-        weighted_data = all_value / (upper_percentile - lower_percentile)
-
-        return weighted_data
-
-    # 按时间粒度聚合数据
-    def get_percentile_row(x, sort_indicator, percentiles):
-        sorter = np.argsort(x[sort_indicator].values)
-        if len(sorter) <= 2:
-            return pd.Series({col: np.nan for col in numeric_cols})
-        weighted_values = {col: weighted_percentile(x[col].values, percentiles, sorter) for col in numeric_cols}
-        return pd.Series(weighted_values)
-
-    grouped = data.resample(granularity).apply(lambda x: get_percentile_row(x, sort_indicator, [percentile_start, percentile_end]))
+    # 按时间桶计算百分位带：一次 lexsort 和一次 cumsum 得到所有桶、所有指标的结果，行数不超过 2 的桶为 NaN
+    grouped = percentile_bands(data, granularity, sort_indicator, [percentile_start, percentile_end], numeric_cols)
 
     # 创建多个图表
     graphs = []
@@ -1,85 +1,105 @@
-import random
-import csv
+"""
+生成 inspect 使用的模拟数据：data_15min.csv、data_1h_avg.csv、data_1d_avg.csv
+
+每个设备、每个频段每 15 分钟一条数据，按天、按设备分块向量化生成并追加写入 CSV，
+每小时、每天的均值在每块内用 groupby().agg 计算，内存占用只与 --chunk-devices 有关。
+    python mock15.py --devices 10 --days 15
+"""
+import argparse
+import os
 from datetime import datetime, timedelta
+
+import numpy as np
 import pandas as pd
 
 # 定义数据生成的范围和规律
 regions = ['aps1', 'use1', 'euw1']
 bands = ['2.4g', '5g', '6g']
-deviceids = [f'd{i}' for i in range(1, 11)]  # 生成d1到d10
-start_date = datetime.now() - timedelta(days=15)
-end_date = datetime.now()
-interval = timedelta(minutes=15)  # 每15分钟生成一条数据
-
-# 生成数据
-data_15min = []
-current_date = start_date
-while current_date <= end_date:
-    for deviceid in deviceids:
-        current_time = current_date
-        for _ in range(96):  # 每天生成96条数据
-            for band in bands:
-                region = regions[(int(deviceid[1]) - 1) % 3]  # 根据deviceid分配region
-                client_online = random.randint(1, 100)
-                wan_throughput = random.randint(50, 1000)
-                airtime_utilization = random.uniform(0, 1)
-                congestion_rate = random.uniform(0, 1)
-                noise = random.uniform(-100, 0)
-
-                data_15min.append([
-                    region, current_time.strftime('%Y-%m-%d %H:%M:%S'), deviceid, client_online, band,
-                    wan_throughput, airtime_utilization, congestion_rate, noise
-                ])
-            current_time += interval
-    current_date += timedelta(days=1)
-
-# 写入15分钟间隔数据的CSV文件
-with open('data_15min.csv', mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow([
-        "region", "utc_time", "deviceid", "client_online", "band", "wan_throughput",
-        "airtime_utilization", "congestion_rate", "noise"
-    ])
-    writer.writerows(data_15min)
-
-print("CSV file 'data_15min.csv' has been created with 15-minute interval data.")
-
-
-# 读取15分钟间隔数据的CSV文件
-df_15min = pd.read_csv('data_15min.csv')
-
-# 转换utc_time列为datetime类型
-df_15min['utc_time'] = pd.to_datetime(df_15min['utc_time'])
-
-# 定义聚合函数
+
+COLUMNS = ["region", "utc_time", "deviceid", "client_online", "band", "wan_throughput",
+           "airtime_utilization", "congestion_rate", "noise"]
+METRIC_COLUMNS = ['client_online', 'wan_throughput', 'airtime_utilization', 'congestion_rate', 'noise']
+
+# 每块生成的设备数
+CHUNK_DEVICES = 5000
+
+
+def make_chunk(day_start, first_device, count, rng):
+    """
+    一块设备一天的 15 分钟数据：count × 96 × bands 行，deviceid 从 d{first_device + 1} 开始
+    """
+    slots = 96  # 每天生成96条数据
+    device = np.repeat(np.arange(first_device, first_device + count), slots * len(bands))
+    slot = np.tile(np.repeat(np.arange(slots), len(bands)), count)
+    band = np.tile(np.arange(len(bands)), count * slots)
+    rows = len(device)
+
+    return pd.DataFrame({
+        'region': np.asarray(regions, dtype=object)[device % len(regions)],  # 根据deviceid分配region
+        'utc_time': pd.Timestamp(day_start) + pd.to_timedelta(slot * 15, unit='min'),
+        'deviceid': np.char.add('d', (device + 1).astype(str)).astype(object),
+        'client_online': rng.integers(1, 101, rows),
+        'band': np.asarray(bands, dtype=object)[band],
+        'wan_throughput': rng.integers(50, 1001, rows),
+        'airtime_utilization': rng.uniform(0, 1, rows),
+        'congestion_rate': rng.uniform(0, 1, rows),
+        'noise': rng.uniform(-100, 0, rows),
+    }, columns=COLUMNS)
+
+
 def aggregate_data(df, freq):
-    aggregation = {
-        'client_online': 'mean',
-        'wan_throughput': 'mean',
-        'airtime_utilization': 'mean',
-        'congestion_rate': 'mean',
-        'noise': 'mean'
-    }
-    df_resampled = df.resample(freq, on='utc_time').agg(aggregation)
-    df_resampled = df_resampled.dropna(how='all')  # 删除所有列均为NaN的行
-    df_resampled['region'] = df['region'].iloc[0]
-    df_resampled['deviceid'] = df['deviceid'].iloc[0]
-    df_resampled['band'] = df['band'].iloc[0]
-    return df_resampled.reset_index()
-
-# 计算每小时和每天的平均数据
-df_1h = df_15min.groupby(['region', 'deviceid', 'band']).apply(aggregate_data, 'H').reset_index(drop=True)
-df_1d = df_15min.groupby(['region', 'deviceid', 'band']).apply(aggregate_data, 'D').reset_index(drop=True)
-
-# 调整列顺序
-df_1h = df_1h[['region', 'utc_time', 'deviceid', 'client_online', 'band', 'wan_throughput',
-               'airtime_utilization', 'congestion_rate', 'noise']]
-df_1d = df_1d[['region', 'utc_time', 'deviceid', 'client_online', 'band', 'wan_throughput',
-               'airtime_utilization', 'congestion_rate', 'noise']]
-
-# 写入聚合数据的CSV文件
-df_1h.to_csv('data_1h_avg.csv', index=False)
-df_1d.to_csv('data_1d_avg.csv', index=False)
-
-print("CSV files 'data_1h_avg.csv' and 'data_1d_avg.csv' have been created with aggregated data.")
+    """
+    每个 (region, deviceid, band) 在每个时间段内的均值
+    """
+    keys = ['region', 'deviceid', 'band', df['utc_time'].dt.floor(freq)]
+    df_resampled = df.groupby(keys, sort=False)[METRIC_COLUMNS].agg('mean').reset_index()
+    return df_resampled[COLUMNS]
+
+
+def append_csv(df, file_name, header):
+    df.to_csv(file_name, mode='w' if header else 'a', header=header, index=False,
+              date_format='%Y-%m-%d %H:%M:%S')
+
+
+def generate(devices, start_date, days, chunk_devices=CHUNK_DEVICES, seed=None, output_dir='.'):
+    """
+    从 start_date 当天 00:00 开始生成 days 天的数据
+    :return: 15 分钟数据的行数
+    """
+    rng = np.random.default_rng(seed)
+    # 每块恰好是一个自然日，天均值在块内算出的才是完整的一天
+    start_date = pd.Timestamp(start_date).normalize()
+    files = {name: os.path.join(output_dir, name)
+             for name in ['data_15min.csv', 'data_1h_avg.csv', 'data_1d_avg.csv']}
+    rows = 0
+    header = True
+    for day in range(days):
+        day_start = start_date + timedelta(days=day)
+        for first in range(0, devices, chunk_devices):
+            df_15min = make_chunk(day_start, first, min(chunk_devices, devices - first), rng)
+            append_csv(df_15min, files['data_15min.csv'], header)
+            # 每块包含所选设备一整天的数据，小时和天的均值在块内即可算出
+            append_csv(aggregate_data(df_15min, 'h'), files['data_1h_avg.csv'], header)
+            append_csv(aggregate_data(df_15min, 'D'), files['data_1d_avg.csv'], header)
+            rows += len(df_15min)
+            header = False
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=10)  # 生成d1到d10
+    parser.add_argument('--days', type=int, default=16)
+    parser.add_argument('--start-date', default=str((datetime.now() - timedelta(days=15)).date()))
+    parser.add_argument('--chunk-devices', type=int, default=CHUNK_DEVICES)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    rows = generate(args.devices, args.start_date, args.days, args.chunk_devices, args.seed)
+
+    print(f"CSV file 'data_15min.csv' has been created with {rows} rows of 15-minute interval data.")
+    print("CSV files 'data_1h_avg.csv' and 'data_1d_avg.csv' have been created with aggregated data.")
+
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+# 预处理后的 Feather 文件目录，默认与 CSV 放在一起
+INSPECT_STORE_DIR = os.getenv("INSPECT_STORE_DIR", "")
+
+# 排序键：同一 (region, band) 的行连续存放，组内按时间递增
+SORT_KEYS = ['region', 'band', 'utc_time']
+
+# 转为字典编码的字符串列
+CATEGORY_COLUMNS = ['region', 'band', 'deviceid', 'bandwidth']
+
+
+def build_store(csv_path, store_path):
+    """
+    读取 CSV，只解析一次时间，按 (region, band, utc_time) 排序后写成未压缩的 Feather 文件，便于内存映射
+    先写到同一目录下的临时文件再替换，其他进程不会读到写了一半的文件
+    """
+    data = pd.read_csv(csv_path)
+    data['utc_time'] = pd.to_datetime(data['utc_time'])
+    for col in CATEGORY_COLUMNS:
+        if col in data.columns:
+            data[col] = data[col].astype('category')
+    data = data.sort_values(SORT_KEYS, kind='mergesort').reset_index(drop=True)
+    # 整个文件只有一个记录批次，读取时时间列可以零拷贝地转为 numpy
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(store_path) or '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        feather.write_feather(data, tmp_path, compression='uncompressed', chunksize=max(len(data), 1))
+        os.replace(tmp_path, store_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    logging.info(f"Built {store_path} from {csv_path}: {len(data)} rows")
+
+
+class TimeSeriesStore:
+    """
+    一个 CSV 表的只读存储：数据以内存映射的 Feather 文件保存，按 (region, band, utc_time) 排序，
+    按 region、band 和时间窗口查询时用 searchsorted 定位行范围，只转换窗口内的行
+    """
+
+    def __init__(self, csv_path, store_dir=INSPECT_STORE_DIR):
+        name = os.path.splitext(os.path.basename(csv_path))[0]
+        self.store_path = os.path.join(store_dir or os.path.dirname(csv_path) or '.', f"{name}.feather")
+        # CSV 比 Feather 文件新时重新生成
+        if not os.path.exists(self.store_path) or os.path.getmtime(self.store_path) < os.path.getmtime(csv_path):
+            build_store(csv_path, self.store_path)
+
+        self.table = feather.read_table(self.store_path, memory_map=True)
+        self.times = self.table.column('utc_time').to_numpy()
+        self.ranges = self._group_ranges()
+
+    def _group_ranges(self):
+        """
+        每个 (region, band) 在表中的行范围 [start, stop)
+        """
+        if self.table.num_rows == 0:
+            return {}
+        region = self.table.column('region').to_pandas().astype(str).to_numpy()
+        band = self.table.column('band').to_pandas().astype(str).to_numpy()
+        changes = np.flatnonzero((region[1:] != region[:-1]) | (band[1:] != band[:-1])) + 1
+        starts = np.concatenate([[0], changes])
+        stops = np.concatenate([changes, [len(region)]])
+        return {(region[start], band[start]): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+    def window_slices(self, start_datetime, end_datetime, region=None, band=None):
+        """
+        时间在 [start_datetime, end_datetime] 内的行范围，region、band 为空表示不过滤
+        """
+        start = np.datetime64(pd.Timestamp(start_datetime))
+        end = np.datetime64(pd.Timestamp(end_datetime))
+        slices = []
+        for (key_region, key_band), (group_start, group_stop) in self.ranges.items():
+            if (region and key_region != region) or (band and key_band != band):
+                continue
+            times = self.times[group_start:group_stop]
+            lo = group_start + int(np.searchsorted(times, start, side='left'))
+            hi = group_start + int(np.searchsorted(times, end, side='right'))
+            if hi > lo:
+                slices.append((lo, hi))
+        return slices
+
+    def window(self, start_datetime, end_datetime, region=None, band=None):
+        """
+        返回窗口内的 DataFrame：Arrow 表的切片不复制数据，只有窗口内的行被转换为 pandas
+        """
+        slices = self.window_slices(start_datetime, end_datetime, region, band)
+        if not slices:
+            return self.table.schema.empty_table().to_pandas()
+        tables = [self.table.slice(lo, hi - lo) for lo, hi in slices]
+        return pa.concat_tables(tables).to_pandas()
@@ -0,0 +1,23 @@
+import pandas as pd
+
+import mock15
+
+
+def test_generate_rollups(tmp_path):
+    rows = mock15.generate(5, '2024-09-01 10:30', 2, chunk_devices=2, seed=0, output_dir=str(tmp_path))
+    assert rows == 5 * 96 * 3 * 2
+
+    df_15min = pd.read_csv(tmp_path / 'data_15min.csv', parse_dates=['utc_time'])
+    df_1h = pd.read_csv(tmp_path / 'data_1h_avg.csv', parse_dates=['utc_time'])
+    df_1d = pd.read_csv(tmp_path / 'data_1d_avg.csv', parse_dates=['utc_time'])
+    assert list(df_15min.columns) == mock15.COLUMNS == list(df_1h.columns) == list(df_1d.columns)
+    assert df_15min['utc_time'].min() == pd.Timestamp('2024-09-01')
+    assert df_15min['deviceid'].nunique() == 5
+
+    keys = ['region', 'deviceid', 'band', 'utc_time']
+    for freq, rolled in [('h', df_1h), ('D', df_1d)]:
+        expected = (df_15min.set_index('utc_time').groupby(['region', 'deviceid', 'band'])[mock15.METRIC_COLUMNS]
+                    .resample(freq).mean().reset_index())
+        pd.testing.assert_frame_equal(rolled.sort_values(keys).reset_index(drop=True)[expected.columns],
+                                      expected.sort_values(keys).reset_index(drop=True), check_dtype=False)
+    assert len(df_1d) == 5 * 3 * 2
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from eco_percentile import percentile_bands, weighted_percentile
+
+import weighted
+
+
+@pytest.mark.parametrize('percents', weighted.test_cases + [[95, 99], [95, 95], [100, 100], [90, 90], [80, 90],
+                                                            [0, 0], [0, 100]])
+def test_matches_weighted_cases(percents):
+    data = pd.DataFrame({'value': weighted.data},
+                        index=pd.DatetimeIndex(['2024-01-01 00:05'] * len(weighted.data), name='utc_time'))
+    grouped = percentile_bands(data, '15min', 'value', percents, ['value'], min_count=1)
+    assert len(grouped) == 1
+    assert grouped['value'].iloc[0] == pytest.approx(weighted.weighted_percentile(weighted.data, percents))
+
+
+@pytest.mark.parametrize('granularity', ['15min', '1h', '1d', '7d'])
+def test_matches_resample_apply(granularity):
+    rng = np.random.default_rng(0)
+    rows = 3000
+    times = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 96 * 20, rows) * 15, unit='min')
+    data = pd.DataFrame({'a': rng.normal(100, 30, rows), 'b': rng.integers(0, 50, rows).astype(float)},
+                        index=pd.DatetimeIndex(times, name='utc_time')).sort_index()
+    # 人为留出一段没有数据的时间，以及只有两行的时间桶
+    data = data[(data.index < '2024-01-05') | (data.index >= '2024-01-06 00:30')]
+    data.loc[data.index[:40], 'b'] = np.nan
+
+    # 原先 app.py 中逐桶 apply 的实现
+    def get_percentile_row(x, percents):
+        sorter = np.argsort(x['a'].values)
+        if len(sorter) <= 2:
+            return pd.Series({col: np.nan for col in ['a', 'b']})
+        return pd.Series({col: weighted_percentile(x[col].values, percents, sorter) for col in ['a', 'b']})
+
+    for percents in [[0, 100], [25, 75], [90, 100], [50, 50], [33.3, 34.1]]:
+        expected = data.resample(granularity).apply(lambda x: get_percentile_row(x, percents))
+        grouped = percentile_bands(data, granularity, 'a', percents, ['a', 'b'])
+        pd.testing.assert_frame_equal(grouped, expected, check_freq=False, check_index_type=False, atol=1e-9)
@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pytest
+
+import store
+
+
+def write_csv(path, rows=6):
+    pd.DataFrame({
+        'utc_time': pd.date_range('2024-01-01', periods=rows, freq='15min').astype(str),
+        'region': ['use1', 'aps1'] * (rows // 2),
+        'band': '5g',
+        'noise': range(rows),
+    }).to_csv(path, index=False)
+
+
+def test_build_store_replaces_file(tmp_path):
+    csv_path = tmp_path / 'data.csv'
+    write_csv(csv_path)
+    data = store.TimeSeriesStore(str(csv_path))
+    assert data.table.num_rows == 6
+    assert data.window('2024-01-01', '2024-01-01 00:30', region='use1')['noise'].tolist() == [0, 2]
+    assert sorted(os.listdir(tmp_path)) == ['data.csv', 'data.feather']
+
+
+def test_failed_build_keeps_previous_file(tmp_path, monkeypatch):
+    csv_path = tmp_path / 'data.csv'
+    store_path = tmp_path / 'data.feather'
+    write_csv(csv_path)
+    store.build_store(str(csv_path), str(store_path))
+    before = store_path.read_bytes()
+
+    def fail(data, path, **kwargs):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+        raise OSError('disk full')
+
+    write_csv(csv_path, rows=8)
+    monkeypatch.setattr(store.feather, 'write_feather', fail)
+    with pytest.raises(OSError):
+        store.build_store(str(csv_path), str(store_path))
+    # 写入失败时原文件不变，也不留下临时文件
+    assert store_path.read_bytes() == before
+    assert sorted(os.listdir(tmp_path)) == ['data.csv', 'data.feather']
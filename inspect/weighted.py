@@ -16,8 +16,8 @@ def weighted_percentile(data, percents):
     # 在数组的前后各补一个与起止相同的数
     pad_data = np.pad(data, pad_width=(1, 1), mode='edge')
 
-    lower_percentile = percents[0] / num_points
-    upper_percentile = percents[1] / num_points
+    lower_percentile = percents[0] / 100 * num_points
+    upper_percentile = percents[1] / 100 * num_points
 
 
     lower_floor = int(np.floor(lower_percentile))
@@ -63,6 +63,7 @@ test_cases = [
 ]
 
 # 计算并打印结果
-for percents in test_cases:
-    result = weighted_percentile(data, percents)
-    print(f"Percentile range {percents}: {result:.2f}")
+if __name__ == '__main__':
+    for percents in test_cases:
+        result = weighted_percentile(data, percents)
+        print(f"Percentile range {percents}: {result:.2f}")
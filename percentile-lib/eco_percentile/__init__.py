@@ -0,0 +1,3 @@
+from eco_percentile.bands import bucket_ids, percentile_bands
+from eco_percentile.core import (MIN_COUNT, prefix_sums, sort_by_group, take_sorted, weighted_percentile,
+                                 window_means)
@@ -0,0 +1,159 @@
+"""
+截尾加权均值的参照实现和基于前缀和的批量实现
+
+weighted_percentile 对单个分组排序后在首尾各补一个相同的值，取 [p0, p1] 百分位区间的加权均值；
+window_means 对按 (分组, 排序指标) 排好序的数据用前缀和一次求出所有分组、所有指标的结果，两者一致
+"""
+import numpy as np
+import pandas as pd
+
+# 行数少于该值的分组结果为 NaN，与原先 groupby.apply 中 len(sorter) <= 2 返回 NaN 一致
+MIN_COUNT = 3
+
+
+def weighted_percentile(data, percents, sorter):
+    """
+    单个分组的参照实现
+    :param data: 分组内某个指标的取值
+    :param sorter: 按排序指标排序的下标，例如 np.argsort(group[sort_indicator].values)
+    """
+    num_points = len(data)
+    # 在数组的前后各补一个与起止相同的数
+    pad_data = np.array(np.pad(data[sorter], pad_width=(1, 1), mode='edge'), dtype=np.float64)
+
+    lower_percentile = percents[0] / 100 * num_points
+    upper_percentile = percents[1] / 100 * num_points
+
+    lower_floor = int(np.floor(lower_percentile))
+    upper_floor = int(np.floor(upper_percentile))
+    lower_ceil = int(np.ceil(lower_percentile))
+
+    # 洛必达
+    if lower_floor == upper_floor:
+        if upper_percentile - lower_percentile < 10e-8:
+            return (pad_data[lower_floor] + pad_data[lower_floor + 1]) / 2
+        return pad_data[lower_ceil]
+
+    # 两边的非完整段
+    lower_weight = lower_ceil - lower_percentile
+    upper_weight = upper_percentile - upper_floor
+    all_value = lower_weight * pad_data[lower_ceil] + upper_weight * pad_data[upper_floor + 1]
+
+    for index in range(lower_ceil + 1, upper_floor + 1):
+        all_value = all_value + pad_data[index]
+
+    return all_value / (upper_percentile - lower_percentile)
+
+
+def sort_by_group(group_keys, sort_values):
+    """
+    按 (分组, 排序指标) 排序：先对排序指标做一次快速排序，再按分组编码做稳定排序
+    分组编码使用最小的整数类型，分组数较少时 numpy 会走基数排序
+    :return: (order, keys, starts, counts)
+        order: 排序后的行号，组内按排序指标升序，NaN 排在组尾
+        keys: 排好序的分组键
+        starts/counts: 每个分组在 order 中的起始位置和行数
+    """
+    codes, keys = pd.factorize(group_keys, sort=True)
+    keys = np.asarray(keys)  # categorical 分组键直接使用其编码，结果转回普通数组
+    order = np.argsort(np.asarray(sort_values))
+    order = order[codes[order] >= 0]  # 与 groupby 一致，丢弃分组键为空的行
+    sorted_codes = codes[order].astype(np.min_scalar_type(max(len(keys) - 1, 0)), copy=False)
+    order = order[np.argsort(sorted_codes, kind='stable')]
+
+    counts = np.bincount(codes[order], minlength=len(keys))
+    starts = np.zeros(len(keys), dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    return order, keys, starts, counts
+
+
+def _column(data, col):
+    """
+    指标列的 numpy 数组，浮点列（float64 或压缩后的 float32）直接返回，不复制
+    """
+    values = data[col].to_numpy()
+    return values if values.dtype.kind == 'f' else values.astype(np.float64)
+
+
+def take_sorted(data, value_cols, rows):
+    """
+    取出各指标列在 rows 行上的值，返回 float64 矩阵 (metrics × len(rows))
+    直接在原列（可能是 float32）上取值，只转换取出的部分，不复制整列
+    """
+    taken = np.empty((len(value_cols), len(rows)), dtype=np.float64)
+    for i, col in enumerate(value_cols):
+        taken[i] = _column(data, col)[rows]
+    return taken
+
+
+def prefix_sums(data, value_cols, order):
+    """
+    按 order 逐个指标计算前缀和，不保留排好序的数值矩阵
+    NaN 单独计数以便和逐元素累加的结果一致，没有 NaN 时 nan_counts 为 None
+    :return: (sums, nan_counts)，均为 (metrics × (rows + 1))，首列全零
+    """
+    sums = np.zeros((len(value_cols), len(order) + 1), dtype=np.float64)
+    nan_counts = None
+    for i, col in enumerate(value_cols):
+        values = _column(data, col)[order]
+        nan_mask = np.isnan(values)
+        if not nan_mask.any():
+            np.cumsum(values, dtype=np.float64, out=sums[i, 1:])
+            continue
+        np.cumsum(np.where(nan_mask, 0.0, values), dtype=np.float64, out=sums[i, 1:])
+        if nan_counts is None:
+            nan_counts = np.zeros(sums.shape, dtype=np.min_scalar_type(len(order)))
+        np.cumsum(nan_mask, dtype=nan_counts.dtype, out=nan_counts[i, 1:])
+    return sums, nan_counts
+
+
+def window_means(take, sums, nan_counts, starts, counts, percents, min_count=MIN_COUNT):
+    """
+    基于前缀和计算每个分组、每个指标的截尾加权均值，结果与 weighted_percentile 一致
+    :param take: take(positions) 返回排序后第 positions 个位置上各指标的值 (metrics × len(positions))，
+        只在每个分组的区间两端取值
+    :param sums/nan_counts: prefix_sums 的结果
+    :param starts/counts: 每个分组的起始行和行数
+    :param percents: [起始百分位, 结束百分位]
+    :param min_count: 行数少于该值的分组（包括没有数据的分组）结果为 NaN
+    :return: (groups × metrics) 的结果矩阵
+    """
+    n = counts.astype(np.float64)
+    last = np.maximum(counts - 1, 0)
+
+    lower_percentile = percents[0] / 100 * n
+    upper_percentile = percents[1] / 100 * n
+    lower_floor = np.floor(lower_percentile).astype(np.int64)
+    upper_floor = np.floor(upper_percentile).astype(np.int64)
+    lower_ceil = np.ceil(lower_percentile).astype(np.int64)
+
+    # 补边后的第 i 个值对应组内第 clip(i - 1, 0, n - 1) 个值；没有数据的分组取任意一行，结果随后置为 NaN
+    rows = sums.shape[1] - 1
+
+    def pad_value(index):
+        return take(np.minimum(starts + np.clip(index - 1, 0, last), max(rows - 1, 0)))
+
+    # 区间退化为单个点：与原实现的两种特殊情况一致
+    degenerate = lower_floor == upper_floor
+    zero_width = (upper_percentile - lower_percentile) < 10e-8
+    point = np.where(
+        zero_width,
+        (pad_value(lower_floor) + pad_value(lower_floor + 1)) / 2,
+        pad_value(lower_ceil),
+    )
+
+    # 一般情况：两端按覆盖比例加权，中间整段用前缀和一次求出
+    lower_weight = lower_ceil - lower_percentile
+    upper_weight = upper_percentile - upper_floor
+    inner_lo = starts + lower_ceil
+    inner_hi = starts + np.maximum(upper_floor, lower_ceil)
+    inner = sums[:, inner_hi] - sums[:, inner_lo]
+    if nan_counts is not None:
+        inner[(nan_counts[:, inner_hi] - nan_counts[:, inner_lo]) > 0] = np.nan
+    all_value = lower_weight * pad_value(lower_ceil) + upper_weight * pad_value(upper_floor + 1) + inner
+    with np.errstate(divide='ignore', invalid='ignore'):
+        general = all_value / (upper_percentile - lower_percentile)
+
+    result = np.where(degenerate, point, general)
+    result[:, counts < max(min_count, 1)] = np.nan
+    return result.T
@@ -0,0 +1,11 @@
+from setuptools import setup
+
+# ECO、inspect、inspect-psql 共用的截尾加权均值（百分位带）计算
+# 在仓库中开发时执行 pip install -e percentile-lib；各应用的镜像在构建时安装
+setup(
+    name='eco-percentile',
+    version='0.1.0',
+    packages=['eco_percentile'],
+    python_requires='>=3.8',
+    install_requires=['numpy', 'pandas'],
+)